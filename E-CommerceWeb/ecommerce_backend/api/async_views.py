@@ -0,0 +1,148 @@
+"""
+Async variants of the password-checking endpoints, for ASGI deployments.
+
+    POST /api/async/login/     email + password   (as CustomTokenObtainPairView)
+    POST /api/async/register/  registration form  (as RegisterView)
+    POST /api/async/token/     username + password (as GetTokenView)
+
+Request and response bodies match the DRF views. Hashing and verification
+run in the password pool (api/password_pool.py); when it is saturated the
+views answer 503 with Retry-After instead of queueing more CPU work. Login
+attempts draw on the same token buckets as the sync views (api/throttling.py)
+and get 429 before anything is hashed.
+"""
+
+import json
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+from django.db import IntegrityError
+from django.http import JsonResponse
+from django.utils.crypto import get_random_string
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .backends import hasher_params, users_by_email
+from .password_pool import PoolSaturated, password_pool
+from .serializers import RegisterSerializer
+from .throttling import client_ip, login_throttle, throttled_response
+
+_dummy = {}
+
+
+def _overloaded():
+    response = JsonResponse({'detail': 'Too many concurrent password checks, retry shortly'}, status=503)
+    response['Retry-After'] = '1'
+    return response
+
+
+def _body(request):
+    try:
+        data = json.loads(request.body or b'{}')
+    except ValueError:
+        return None
+    return data if isinstance(data, dict) else None
+
+
+async def _dummy_encoded():
+    # Hashed in the pool once per process and hasher setup; verifying against it costs a real check
+    params = hasher_params()
+    if params not in _dummy:
+        _dummy[params] = await password_pool.make_password(get_random_string(32))
+    return _dummy[params]
+
+
+async def _verify(user, password):
+    """check_password for `user` (None: spend one dummy check) in the pool; True if valid."""
+    if user is None or not user.is_active:
+        await password_pool.check_password(password, await _dummy_encoded())
+        return False
+    valid, upgraded = await password_pool.check_password(password, user.password)
+    if upgraded:
+        # Outdated hasher parameters: store the new hash, as check_password's setter would
+        user.password = upgraded
+        await User.objects.filter(pk=user.pk).aupdate(password=upgraded)
+    return valid
+
+
+async def _tokens(user):
+    refresh = await sync_to_async(RefreshToken.for_user)(user)
+    return {'refresh': str(refresh), 'access': str(refresh.access_token)}
+
+
+@csrf_exempt
+@require_POST
+async def login(request):
+    data = _body(request)
+    email = data.get('email') if data else None
+    password = data.get('password') if data else None
+    if not email or not password:
+        return JsonResponse({'detail': 'Invalid email or password'}, status=400)
+    wait = await sync_to_async(login_throttle.check)(client_ip(request), email if isinstance(email, str) else None)
+    if wait is not None:
+        return throttled_response(wait)
+
+    user = await users_by_email(email).afirst()
+    try:
+        valid = await _verify(user, password)
+    except PoolSaturated:
+        return _overloaded()
+    if not valid:
+        return JsonResponse({'detail': 'Invalid email or password'}, status=401)
+
+    return JsonResponse({
+        **await _tokens(user),
+        'user': {
+            'id': user.id,
+            'username': user.username,
+            'email': user.email,
+            'first_name': user.first_name,
+            'last_name': user.last_name
+        }
+    })
+
+
+@csrf_exempt
+@require_POST
+async def token(request):
+    data = _body(request)
+    username = data.get('username') if data else None
+    password = data.get('password') if data else None
+    if not username or password is None:
+        return JsonResponse({'error': 'Invalid credentials'}, status=400)
+    wait = await sync_to_async(login_throttle.check)(client_ip(request), username if isinstance(username, str) else None)
+    if wait is not None:
+        return throttled_response(wait)
+
+    user = await User.objects.filter(username=username).afirst()
+    try:
+        valid = await _verify(user, password)
+    except PoolSaturated:
+        return _overloaded()
+    if not valid:
+        return JsonResponse({'error': 'Invalid credentials'}, status=400)
+    return JsonResponse(await _tokens(user))
+
+
+@csrf_exempt
+@require_POST
+async def register(request):
+    data = _body(request)
+    if data is None:
+        return JsonResponse({'detail': 'Expected a JSON object'}, status=400)
+
+    serializer = RegisterSerializer(data=data)
+    if not await sync_to_async(serializer.is_valid)():
+        return JsonResponse(serializer.errors, status=400)
+
+    try:
+        encoded = await password_pool.make_password(serializer.validated_data['password'])
+    except PoolSaturated:
+        return _overloaded()
+    try:
+        await sync_to_async(serializer.save)(password_hash=encoded)
+    except IntegrityError:
+        return JsonResponse({'non_field_errors': ['An account with this email or username already exists.']},
+                            status=400)
+    return JsonResponse({'message': 'User registered successfully!'}, status=201)
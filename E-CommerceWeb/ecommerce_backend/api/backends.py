@@ -0,0 +1,69 @@
+"""
+Email login for the JWT endpoints.
+
+`EmailBackend` resolves the account and verifies the password from a single
+query on the case-insensitive email index (migration 0006):
+
+    WHERE NULLIF(LOWER(email), '') = LOWER(%s)
+
+When no active account matches, the password is still checked once against a
+dummy hash made with the current default hasher, so a miss costs the same
+hashing time as a wrong password and response timing does not reveal which
+emails are registered. The dummy hash matches no password, and is remade
+whenever the default hasher's cost or the current pepper id changes.
+"""
+
+from functools import lru_cache
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.hashers import check_password, get_hasher, make_password
+from django.db.models import Value
+from django.db.models.functions import Lower, NullIf
+from django.utils.crypto import get_random_string
+
+# Same expression as the unique index, so lookups can use it
+EMAIL_KEY = NullIf(Lower('email'), Value(''))
+
+
+def users_by_email(email):
+    """Users whose email equals `email` ignoring case (at most one, see migration 0006)."""
+    return get_user_model()._default_manager.alias(email_key=EMAIL_KEY).filter(email_key=Lower(Value(email)))
+
+
+@lru_cache(maxsize=8)
+def _dummy_encoded(params):
+    return make_password(get_random_string(32))
+
+
+def hasher_params():
+    """What a hash made now depends on: the default hasher, its cost and the pepper id."""
+    hasher = get_hasher()
+    return (
+        hasher.algorithm,
+        getattr(hasher, 'rounds', None),
+        getattr(hasher, 'iterations', None),
+        getattr(settings, 'PASSWORD_PEPPER_ID', ''),
+    )
+
+
+def dummy_check(password):
+    """Spend one verification with the default hasher; always False."""
+    check_password(password, _dummy_encoded(hasher_params()))
+    return False
+
+
+class EmailBackend(ModelBackend):
+    """Authenticates `authenticate(request, email=..., password=...)`."""
+
+    def authenticate(self, request, email=None, password=None, **kwargs):
+        if not email or password is None:
+            return None
+        user = users_by_email(email).first()
+        if user is None or not self.user_can_authenticate(user):
+            dummy_check(password)
+            return None
+        if user.check_password(password):
+            return user
+        return None
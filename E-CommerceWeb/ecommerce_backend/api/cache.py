@@ -0,0 +1,375 @@
+"""
+Read-through caching for catalog reads.
+
+Two tiers:
+- a bounded in-process LRU (per worker, microsecond hits)
+- the shared Django cache backend (settings.CACHES, shared between workers)
+
+Local entries expire after OBJECT_CACHE['LOCAL_TTL'] seconds, and are dropped
+as soon as another worker's write is seen through the catalog generation, so
+that an invalidation handled by another worker is picked up quickly; the
+shared tier is invalidated directly by the model signals in api/signals.py.
+
+Search results are cached per catalog generation: a counter in the shared
+cache that is bumped on every catalog write, so stale result sets simply stop
+being addressed instead of being deleted key by key. The generation and the
+time of its last bump also back the ETag/Last-Modified validators of the
+catalog read endpoints (api/conditional.py).
+"""
+
+import hashlib
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+
+from . import metrics
+
+_MISSING = object()
+
+
+def _object_cache_setting(name, default):
+    return getattr(settings, 'OBJECT_CACHE', {}).get(name, default)
+
+
+def _search_cache_setting(name, default):
+    return getattr(settings, 'SEARCH_CACHE', {}).get(name, default)
+
+
+class LRUCache:
+    """Thread-safe bounded LRU with per-entry expiry."""
+
+    def __init__(self, maxsize, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING:
+                return default
+            value, expires = entry
+            if expires is not None and expires < time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        expires = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            self._data[key] = (value, expires)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class ObjectCache:
+    """
+    Read-through cache of serialized payloads keyed by primary key.
+
+    Shared entries are addressed by a per-object version kept in the shared
+    cache next to them. Invalidation drops the version, and the next reader
+    starts a fresh one, so a payload loaded before a write committed but stored
+    after its invalidation lands under a version nobody reads again instead of
+    being served for TIMEOUT seconds. The local tier gets the same guarantee
+    from a per-process invalidation counter checked before storing.
+
+    Usage:
+        payload = product_cache.get_or_load(pdt_id, lambda: serialize(...))
+    """
+
+    def __init__(self, namespace):
+        self.namespace = namespace
+        self.local = LRUCache(
+            maxsize=_object_cache_setting('LRU_SIZE', 10000),
+            ttl=_object_cache_setting('LOCAL_TTL', 5),
+        )
+        self.timeout = _object_cache_setting('TIMEOUT', 300)
+        self._lock = threading.Lock()
+        self._invalidations = 0
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+
+    @property
+    def shared(self):
+        return caches[_object_cache_setting('CACHE_ALIAS', 'default')]
+
+    def _key(self, pk):
+        return f"obj:{self.namespace}:{pk}"
+
+    def _version(self, key):
+        version_key = f"{key}:version"
+        version = self.shared.get(version_key)
+        if version is None:
+            # Never reuse a number an evicted or invalidated version had
+            version = time.time_ns()
+            if not self.shared.add(version_key, version, None):
+                version = self.shared.get(version_key, version)
+        return version
+
+    def _count(self, counter):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def get_or_load(self, pk, loader):
+        key = self._key(pk)
+        value = self.local.get(key, _MISSING)
+        if value is not _MISSING:
+            self._count('hits')
+            return value
+
+        invalidations = self._invalidations
+        versioned_key = f"{key}:{self._version(key)}"
+        value = self.shared.get(versioned_key, _MISSING)
+        if value is not _MISSING:
+            self._count('shared_hits')
+        else:
+            self._count('misses')
+            value = loader()
+            self.shared.set(versioned_key, value, self.timeout)
+        with self._lock:
+            if self._invalidations == invalidations:
+                self.local.set(key, value)
+        return value
+
+    def invalidate(self, pks):
+        keys = [self._key(pk) for pk in pks]
+        with self._lock:
+            self._invalidations += 1
+            for key in keys:
+                self.local.delete(key)
+        if keys:
+            self.shared.delete_many([f"{key}:version" for key in keys])
+
+    def clear(self):
+        self.local.clear()
+
+    def stats(self):
+        lookups = self.hits + self.shared_hits + self.misses
+        return {
+            'local_hits': self.hits,
+            'shared_hits': self.shared_hits,
+            'misses': self.misses,
+            'evictions': self.local.evictions,
+            'local_size': len(self.local),
+            'local_maxsize': self.local.maxsize,
+            'hit_ratio': round((self.hits + self.shared_hits) / lookups, 4) if lookups else None,
+        }
+
+
+class CatalogGeneration:
+    """
+    Monotonic catalog version shared between workers through the cache,
+    together with the time of the last bump (whole seconds, never ahead of
+    the clock, so several bumps within one second share it).
+
+    The counter lives under an epoch: a random id stored next to it and
+    replaced whenever the counter has to be restarted (first use, eviction,
+    a flushed cache). `version()` combines the two, so a restarted counter,
+    or one kept per process by a local-memory cache, never repeats a version
+    handed out for different catalog contents.
+
+    Reads are served from a per-process copy refreshed at most every
+    SEARCH_CACHE['GENERATION_CHECK_INTERVAL'] seconds, which bounds how long
+    another worker's write can go unnoticed without a cache round trip per
+    request. Bumps made by this process are visible immediately; callbacks
+    passed to `subscribe()` run when a bump made elsewhere is noticed.
+    """
+
+    key = 'catalog:generation'
+    modified_key = 'catalog:generation:modified'
+    epoch_key = 'catalog:generation:epoch'
+    changes_key = 'catalog:generation:changes:{}:{}'
+
+    def __init__(self):
+        self._value = None
+        self._modified = None
+        self._epoch = None
+        self._checked = 0.0
+        self._lock = threading.Lock()
+        self._subscribers = []
+
+    @property
+    def shared(self):
+        return caches[_search_cache_setting('CACHE_ALIAS', 'default')]
+
+    def subscribe(self, callback):
+        self._subscribers.append(callback)
+
+    def _refresh(self):
+        now = time.monotonic()
+        if self._value is None or now - self._checked > _search_cache_setting('GENERATION_CHECK_INTERVAL', 1.0):
+            with self._lock:
+                previous = (self._value, self._epoch)
+                keys = [self.key, self.modified_key, self.epoch_key]
+                state = self.shared.get_many(keys)
+                if len(state) != len(keys):
+                    # Above anything seen locally, so per-process derived data never sees it go back
+                    self._restart((self._value or 0) + 1)
+                    state = self.shared.get_many(keys)
+                self._value = state.get(self.key, self._value or 1)
+                self._modified = state.get(self.modified_key, int(time.time()))
+                self._epoch = state.get(self.epoch_key, self._epoch)
+                self._checked = now
+            if previous[0] is not None and (self._value, self._epoch) != previous:
+                for callback in self._subscribers:
+                    callback()
+
+    def _new_epoch(self):
+        epoch = uuid.uuid4().hex[:16]
+        self.shared.set(self.epoch_key, epoch, None)
+        return epoch
+
+    def _restart(self, start):
+        """Start a new epoch, keeping any counter and time that survived."""
+        self._new_epoch()
+        self.shared.add(self.key, start, None)
+        self.shared.add(self.modified_key, int(time.time()), None)
+
+    def current(self):
+        self._refresh()
+        return self._value
+
+    def version(self):
+        """'<epoch>-<generation>': unique to the catalog contents, for validators and cache keys."""
+        self._refresh()
+        return f"{self._epoch}-{self._value}"
+
+    def last_modified(self):
+        """Unix time (seconds) of the current generation."""
+        self._refresh()
+        return self._modified
+
+    def bump(self, product_ids=(), category_ids=()):
+        """
+        Start a new generation, recording which rows it changed so per-process
+        derived data (api/inverted_index.py) can catch up without a rebuild.
+        """
+        try:
+            value = self.shared.incr(self.key)
+        except ValueError:
+            # Key evicted or never set: numbers from here on may repeat, so new epoch
+            with self._lock:
+                self._restart(self._value or 0)
+            value = self.shared.incr(self.key)
+        epoch = self.shared.get(self.epoch_key) or self._new_epoch()
+        modified = int(time.time())
+        self.shared.set(self.modified_key, modified, None)
+        self.shared.set(self.changes_key.format(epoch, value), (list(product_ids), list(category_ids)),
+                        _search_cache_setting('CHANGES_TIMEOUT', 3600))
+        with self._lock:
+            self._value = value
+            self._modified = modified
+            self._epoch = epoch
+            self._checked = time.monotonic()
+        return value
+
+    def changes(self, since, until):
+        """
+        (product_ids, category_ids) changed by generations since+1 .. until of
+        the current epoch, or None when any of them is no longer recorded
+        (expired, evicted, not written yet or from an earlier epoch) and the
+        caller has to start over from the database.
+        """
+        keys = [self.changes_key.format(self._epoch, n) for n in range(since + 1, until + 1)]
+        recorded = self.shared.get_many(keys)
+        if len(recorded) != len(keys):
+            return None
+        product_ids, category_ids = set(), set()
+        for products, categories in recorded.values():
+            product_ids.update(products)
+            category_ids.update(categories)
+        return product_ids, category_ids
+
+
+class SearchResultCache:
+    """
+    TTL'd cache of search responses keyed by the parsed query and the catalog
+    generation. Hits are served from the in-process LRU without touching the
+    shared backend.
+    """
+
+    def __init__(self, generation):
+        self.generation = generation
+        ttl = _search_cache_setting('TTL', 60)
+        self.local = LRUCache(maxsize=_search_cache_setting('LRU_SIZE', 2048), ttl=ttl)
+        self.timeout = ttl
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+
+    @property
+    def shared(self):
+        return caches[_search_cache_setting('CACHE_ALIAS', 'default')]
+
+    def _key(self, namespace, parts):
+        digest = hashlib.blake2b(repr(parts).encode('utf-8'), digest_size=16).hexdigest()
+        return f"search:{namespace}:{self.generation.version()}:{digest}"
+
+    def get(self, namespace, parts):
+        key = self._key(namespace, parts)
+        value = self.local.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+        value = self.shared.get(key)
+        if value is not None:
+            self.shared_hits += 1
+            self.local.set(key, value)
+            return value
+        self.misses += 1
+        return None
+
+    def set(self, namespace, parts, value):
+        key = self._key(namespace, parts)
+        self.local.set(key, value)
+        self.shared.set(key, value, self.timeout)
+
+    def stats(self):
+        lookups = self.hits + self.shared_hits + self.misses
+        return {
+            'generation': self.generation.current(),
+            'local_hits': self.hits,
+            'shared_hits': self.shared_hits,
+            'misses': self.misses,
+            'evictions': self.local.evictions,
+            'local_size': len(self.local),
+            'hit_ratio': round((self.hits + self.shared_hits) / lookups, 4) if lookups else None,
+        }
+
+
+product_cache = ObjectCache('product')
+category_cache = ObjectCache('category')
+catalog_generation = CatalogGeneration()
+search_cache = SearchResultCache(catalog_generation)
+
+# Another worker's write: drop local copies now rather than after LOCAL_TTL, so
+# nothing older than the generation (and the ETags derived from it) is served
+catalog_generation.subscribe(product_cache.clear)
+catalog_generation.subscribe(category_cache.clear)
+
+metrics.register('object_cache', lambda: {
+    'product': product_cache.stats(),
+    'category': category_cache.stats(),
+})
+metrics.register('search_cache', search_cache.stats)
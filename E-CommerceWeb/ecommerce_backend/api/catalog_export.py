@@ -0,0 +1,94 @@
+"""
+Streaming export of the full catalog as NDJSON or CSV.
+
+Rows are read as `values_list` tuples (no model instances, no serializers,
+no COUNT) in keyset-paginated chunks of CHUNK_SIZE ordered by pdt_id, and
+each chunk is formatted and handed out as one block of bytes. Keyset chunks
+rather than a single `.iterator()` keep memory flat on MySQL too, where the
+driver buffers a whole result set client-side.
+
+The columns match the import format (api/catalog_import.py), so an export
+can be fed back to `import_products`; ct_name is informational.
+"""
+
+import csv
+import io
+import json
+import zlib
+
+from django.conf import settings
+
+from .models import Product
+
+COLUMNS = ('pdt_id', 'pdt_name', 'pdt_mrp', 'pdt_dis_price', 'pdt_qty', 'ct_id', 'ct_name')
+_FIELDS = ('pdt_id', 'pdt_name', 'pdt_mrp', 'pdt_dis_price', 'pdt_qty', 'ct_id', 'ct__ct_name')
+
+CONTENT_TYPES = {'ndjson': 'application/x-ndjson', 'csv': 'text/csv'}
+
+
+def export_setting(name, default):
+    return getattr(settings, 'CATALOG_EXPORT', {}).get(name, default)
+
+
+def iter_product_chunks(chunk_size=None):
+    """Yield lists of product tuples (COLUMNS order), chunk_size rows at a time."""
+    chunk_size = chunk_size or export_setting('CHUNK_SIZE', 2000)
+    queryset = Product.objects.order_by('pdt_id').values_list(*_FIELDS)
+    last_id = 0
+    while True:
+        rows = list(queryset.filter(pdt_id__gt=last_id)[:chunk_size])
+        if not rows:
+            return
+        yield rows
+        last_id = rows[-1][0]
+
+
+def _price(value):
+    # Same representation as the API (DRF renders decimals as strings)
+    return None if value is None else str(value)
+
+
+def ndjson_chunks(chunks):
+    dumps = json.JSONEncoder(ensure_ascii=False).encode
+    for rows in chunks:
+        yield ''.join(
+            dumps({
+                'pdt_id': pdt_id,
+                'pdt_name': pdt_name,
+                'pdt_mrp': _price(mrp),
+                'pdt_dis_price': _price(dis_price),
+                'pdt_qty': qty,
+                'ct_id': ct_id,
+                'ct_name': ct_name,
+            }) + '\n'
+            for pdt_id, pdt_name, mrp, dis_price, qty, ct_id, ct_name in rows
+        ).encode('utf-8')
+
+
+def csv_chunks(chunks):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator='\n')
+    writer.writerow(COLUMNS)
+    for rows in chunks:
+        writer.writerows(rows)
+        yield buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+
+
+WRITERS = {'ndjson': ndjson_chunks, 'csv': csv_chunks}
+
+
+def gzip_chunks(chunks, level=6):
+    compressor = zlib.compressobj(level, zlib.DEFLATED, zlib.MAX_WBITS | 16)  # gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export_products(fmt, compressed=False, chunk_size=None):
+    """Bytes blocks of the whole catalog in `fmt` ('ndjson' or 'csv'), optionally gzipped."""
+    chunks = WRITERS[fmt](iter_product_chunks(chunk_size))
+    return gzip_chunks(chunks) if compressed else chunks
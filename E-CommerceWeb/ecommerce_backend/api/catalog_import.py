@@ -0,0 +1,312 @@
+"""
+Validation and batched upsert of product rows.
+
+Shared by bulk_create_products and the streaming import paths. A batch is
+validated in one pass that reports every problem of every row, with
+categories resolved by a single `in_bulk` query. Valid rows are then written
+with one `bulk_create(update_conflicts=True)` per batch, so existing pdt_ids
+are updated in place. Each written batch goes through catalog_changed()
+(stats, caches, generation) and is indexed in Elasticsearch once committed.
+
+Rows are dicts with pdt_id, pdt_name, pdt_mrp, pdt_qty, ct_id and an optional
+pdt_dis_price. Values may be JSON numbers or strings (CSV).
+
+For feeds, `read_rows()` turns a binary stream of NDJSON or CSV (optionally
+gzipped) into (line_number, row) pairs incrementally, so memory is bounded by
+the batch size rather than the file size.
+"""
+
+import csv
+import gzip
+import json
+import logging
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.db import DatabaseError, connection, transaction
+
+from .models import Category, Product
+from .search_indexing import bulk_index_products
+from .signals import catalog_changed
+
+logger = logging.getLogger(__name__)
+
+REQUIRED_FIELDS = ("pdt_id", "pdt_name", "pdt_mrp", "pdt_qty", "ct_id")
+UPDATE_FIELDS = ["pdt_name", "pdt_mrp", "pdt_dis_price", "pdt_qty", "ct"]
+
+_NAME_MAX_LENGTH = Product._meta.get_field('pdt_name').max_length
+_PRICE_LIMIT = Decimal(10) ** (Product._meta.get_field('pdt_mrp').max_digits - 2)
+_CENT = Decimal('0.01')
+
+
+def import_setting(name, default):
+    return getattr(settings, 'CATALOG_IMPORT', {}).get(name, default)
+
+
+def _integer(value, field, problems, minimum=None):
+    if isinstance(value, bool) or value is None or value == '':
+        problems.append(f"{field} must be an integer")
+        return None
+    try:
+        number = int(value)
+    except (TypeError, ValueError):
+        problems.append(f"{field} must be an integer")
+        return None
+    if isinstance(value, float) and value != number:
+        problems.append(f"{field} must be an integer")
+        return None
+    if minimum is not None and number < minimum:
+        problems.append(f"{field} must be >= {minimum}")
+        return None
+    return number
+
+
+def _price(value, field, problems, required=True):
+    if value is None or value == '':
+        if required:
+            problems.append(f"{field} is required")
+        return None
+    if isinstance(value, bool):
+        problems.append(f"{field} must be a number")
+        return None
+    try:
+        price = Decimal(str(value))
+    except InvalidOperation:
+        problems.append(f"{field} must be a number")
+        return None
+    if not price.is_finite() or price < 0 or price >= _PRICE_LIMIT:
+        problems.append(f"{field} must be between 0 and {_PRICE_LIMIT}")
+        return None
+    return price.quantize(_CENT)
+
+
+class MalformedRow(ValueError):
+    """Stands in for a line the reader could not parse; reported as that line's error."""
+
+
+def iter_lines(stream, chunk_size=64 * 1024):
+    """Yield decoded lines (with their newline) from a binary stream, reading fixed-size chunks."""
+    pending = b''
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        pending += chunk
+        *lines, pending = pending.split(b'\n')
+        for line in lines:
+            yield line.decode('utf-8', errors='replace') + '\n'
+    if pending:
+        yield pending.decode('utf-8', errors='replace')
+
+
+def read_ndjson(lines):
+    for number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            yield number, json.loads(line)
+        except ValueError as e:
+            yield number, MalformedRow(f"Invalid JSON: {e}")
+
+
+def read_csv(lines):
+    """CSV with a header row naming the product fields; values stay strings."""
+    reader = csv.reader(lines)
+    header = [name.strip().lstrip('\ufeff') for name in next(reader, [])]
+    for values in reader:
+        if not any(value.strip() for value in values):
+            continue
+        if len(values) != len(header):
+            yield reader.line_num, MalformedRow(f"Expected {len(header)} columns, got {len(values)}")
+            continue
+        yield reader.line_num, dict(zip(header, values))
+
+
+READERS = {'ndjson': read_ndjson, 'csv': read_csv}
+
+
+def read_rows(stream, fmt, compressed=False):
+    """(line_number, row) pairs from a binary NDJSON/CSV stream."""
+    if compressed:
+        stream = gzip.GzipFile(fileobj=stream, mode='rb')
+    return READERS[fmt](iter_lines(stream))
+
+
+def validate_rows(rows):
+    """
+    Validate (line_number, item) pairs.
+
+    Returns (products, errors): unsaved Product instances for the valid rows
+    and {"index", "error", "item"} entries listing every problem of every
+    invalid row.
+    """
+    rows = list(rows)
+    ct_ids = set()
+    for _, item in rows:
+        if isinstance(item, dict):
+            ct_id = item.get("ct_id")
+            if isinstance(ct_id, int) or (isinstance(ct_id, str) and ct_id.strip().isdigit()):
+                ct_ids.add(int(ct_id))
+    categories = Category.objects.in_bulk(ct_ids) if ct_ids else {}
+
+    products, errors, seen = [], [], set()
+    for index, item in rows:
+        if isinstance(item, MalformedRow):
+            errors.append({"index": index, "error": str(item), "item": None})
+            continue
+        if not isinstance(item, dict):
+            errors.append({"index": index, "error": "Expected an object", "item": item})
+            continue
+
+        problems = [f"Missing field: {f}" for f in REQUIRED_FIELDS if f not in item]
+        pdt_id = _integer(item["pdt_id"], "pdt_id", problems, minimum=1) if "pdt_id" in item else None
+        if pdt_id is not None:
+            if pdt_id in seen:
+                problems.append(f"Duplicate pdt_id={pdt_id} in this import")
+            seen.add(pdt_id)
+
+        name = item.get("pdt_name")
+        if "pdt_name" in item:
+            if not isinstance(name, str) or not name.strip():
+                problems.append("pdt_name must be a non-empty string")
+            elif len(name) > _NAME_MAX_LENGTH:
+                problems.append(f"pdt_name must be at most {_NAME_MAX_LENGTH} characters")
+
+        mrp = _price(item["pdt_mrp"], "pdt_mrp", problems) if "pdt_mrp" in item else None
+        dis_price = _price(item.get("pdt_dis_price"), "pdt_dis_price", problems, required=False)
+        qty = _integer(item["pdt_qty"], "pdt_qty", problems) if "pdt_qty" in item else None
+
+        category = None
+        if "ct_id" in item:
+            ct_id = _integer(item["ct_id"], "ct_id", problems)
+            if ct_id is not None:
+                category = categories.get(ct_id)
+                if category is None:
+                    problems.append(f"Category ct_id={ct_id} does not exist")
+
+        if problems:
+            errors.append({"index": index, "error": "; ".join(problems), "item": item})
+            continue
+
+        products.append(Product(
+            pdt_id=pdt_id,
+            pdt_name=name,
+            pdt_mrp=mrp,
+            pdt_dis_price=dis_price,
+            pdt_qty=qty,
+            ct=category,
+        ))
+    return products, errors
+
+
+def write_products(products, upsert=True, batch_size=None):
+    """
+    Insert (or, with `upsert`, insert-or-update by pdt_id) within the current
+    transaction and schedule catalog_changed() for the touched rows.
+    """
+    ids = [p.pdt_id for p in products]
+    category_ids = {p.ct_id for p in products}
+    options = {}
+    if upsert:
+        # Existing rows may be moving between categories; refresh both sides
+        category_ids.update(
+            Product.objects.filter(pdt_id__in=ids).values_list('ct_id', flat=True).distinct()
+        )
+        options = {'update_conflicts': True, 'update_fields': UPDATE_FIELDS}
+        if connection.features.supports_update_conflicts_with_target:
+            options['unique_fields'] = ['pdt_id']
+    Product.objects.bulk_create(products, batch_size=batch_size, **options)
+    # bulk_create skips model signals, so propagate the change explicitly
+    catalog_changed(product_ids=ids, category_ids=category_ids)
+    return ids
+
+
+def index_products(ids):
+    """Index written rows in Elasticsearch; failures are reported, not raised."""
+    try:
+        return bulk_index_products(Product.objects.filter(pdt_id__in=ids), total=len(ids))
+    except Exception as e:
+        logger.warning("Bulk indexing of imported products failed: %s", e)
+        return {"indexed": 0, "failed": len(ids), "error": str(e)}
+
+
+def _batches(rows, size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def iter_import_batches(rows, batch_size=None, upsert=True):
+    """
+    Validate and commit (line_number, item) pairs batch by batch, skipping
+    invalid rows. Yields one progress dict per batch:
+
+        {"batch": 3, "rows": 1000, "written": 998, "errors": [...], "indexing": {...}}
+
+    A batch rejected by the database is rolled back and reported with
+    "database_error"; later batches still run.
+    """
+    batch_size = batch_size or import_setting('BATCH_SIZE', 1000)
+    for number, batch in enumerate(_batches(rows, batch_size), start=1):
+        products, errors = validate_rows(batch)
+        progress = {"batch": number, "rows": len(batch), "written": 0, "errors": errors}
+        if products:
+            try:
+                with transaction.atomic():
+                    ids = write_products(products, upsert=upsert)
+            except DatabaseError as e:
+                progress["database_error"] = str(e)
+            else:
+                progress["written"] = len(ids)
+                indexing = index_products(ids)
+                progress["indexing"] = {"indexed": indexing["indexed"], "failed": indexing["failed"]}
+        yield progress
+
+
+def import_products(items, batch_size=None, partial=False, upsert=True):
+    """
+    Import a list of product dicts.
+
+    partial=False: all or nothing. Every row is validated first; any error
+    rejects the whole import. Otherwise all batches are written in one
+    transaction.
+    partial=True: batches commit independently (see iter_import_batches) and
+    invalid rows are skipped.
+
+    Returns {"created", "batches", "errors", "indexing"}.
+    """
+    batch_size = batch_size or import_setting('BATCH_SIZE', 1000)
+    rows = list(enumerate(items, start=1))
+
+    if partial:
+        result = {"created": 0, "batches": 0, "errors": [], "indexing": {"indexed": 0, "failed": 0}}
+        for progress in iter_import_batches(rows, batch_size, upsert):
+            result["created"] += progress["written"]
+            result["batches"] += 1
+            result["errors"].extend(progress["errors"])
+            if "database_error" in progress:
+                result["errors"].append({"batch": progress["batch"], "error": progress["database_error"]})
+            for key in ("indexed", "failed"):
+                result["indexing"][key] += progress.get("indexing", {}).get(key, 0)
+        return result
+
+    products, errors = validate_rows(rows)
+    if errors:
+        return {"created": 0, "batches": 0, "errors": errors}
+
+    written = []
+    with transaction.atomic():
+        for batch in _batches(products, batch_size):
+            written.append(write_products(batch, upsert=upsert, batch_size=batch_size))
+
+    indexing = {"indexed": 0, "failed": 0}
+    for ids in written:
+        summary = index_products(ids)
+        for key in ("indexed", "failed"):
+            indexing[key] += summary.get(key, 0)
+    return {"created": len(products), "batches": len(written), "errors": [], "indexing": indexing}
@@ -0,0 +1,62 @@
+"""
+System checks for settings that only work with a cache shared between workers,
+and for database features the api app relies on.
+"""
+
+from django.conf import settings
+from django.core.checks import Error, Tags, Warning, register
+from django.db import connections
+
+_LOCAL_BACKENDS = ('django.core.cache.backends.locmem.LocMemCache',)
+
+
+def is_local_cache(alias):
+    """True when `alias` is a per-process cache (nothing is shared between workers)."""
+    return settings.CACHES.get(alias, {}).get('BACKEND') in _LOCAL_BACKENDS
+
+
+@register(Tags.caches)
+def check_shared_caches(app_configs, **kwargs):
+    errors = []
+    alias = getattr(settings, 'SEARCH_CACHE', {}).get('CACHE_ALIAS', 'default')
+    if is_local_cache(alias):
+        errors.append(Warning(
+            f"SEARCH_CACHE['CACHE_ALIAS'] ({alias!r}) is a local-memory cache.",
+            hint=(
+                "Each worker then keeps its own catalog generation and never notices another "
+                "worker's writes: its search results, cached objects and 304 answers can stay stale. "
+                "Point it at a cache shared by all workers (e.g. Redis or Memcached)."
+            ),
+            id='api.W001',
+        ))
+    throttle = getattr(settings, 'LOGIN_THROTTLE', {})
+    alias = throttle.get('CACHE_ALIAS', 'default')
+    if throttle.get('ENABLED', True) and is_local_cache(alias):
+        errors.append(Warning(
+            f"LOGIN_THROTTLE['CACHE_ALIAS'] ({alias!r}) is a local-memory cache.",
+            hint=(
+                "Every worker process keeps its own login buckets, so the IP, account and global "
+                "limits are multiplied by the number of workers. Point it at a cache shared by all "
+                "workers (e.g. Redis or Memcached)."
+            ),
+            id='api.W002',
+        ))
+    return errors
+
+
+@register(Tags.database)
+def check_expression_indexes(app_configs, databases=None, **kwargs):
+    errors = []
+    for alias in databases or ():
+        connection = connections[alias]
+        if not connection.features.supports_expression_indexes:
+            errors.append(Error(
+                f"Database {alias!r} ({connection.vendor}) does not support expression indexes.",
+                hint=(
+                    "The case-insensitive unique email constraint (api migration 0006) is a functional "
+                    "index, which Django skips on such backends (MariaDB, MySQL before 8.0.13), so "
+                    "duplicate emails could be registered. Use MySQL 8.0.13+ or PostgreSQL."
+                ),
+                id='api.E001',
+            ))
+    return errors
@@ -0,0 +1,161 @@
+"""
+Circuit breaker for calls to Elasticsearch.
+
+States:
+- closed:    calls go through; outcomes are recorded in a sliding window.
+- open:      calls are rejected immediately (callers use their fallback).
+             Entered when the failure rate over the window - where calls
+             slower than SLOW_CALL_SECONDS count as failures - reaches
+             FAILURE_RATE_THRESHOLD.
+- half_open: OPEN_SECONDS after opening, a single background probe checks
+             the backend. Calls are still rejected while it runs; success
+             closes the circuit, failure re-opens it.
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+
+from django.conf import settings
+from elasticsearch import ApiError, TransportError
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitBreaker:
+
+    def __init__(self, name, probe, failure_rate_threshold=0.5, slow_call_seconds=1.0,
+                 window_size=20, minimum_calls=5, open_seconds=10.0):
+        self.name = name
+        self.probe = probe
+        self.failure_rate_threshold = failure_rate_threshold
+        self.slow_call_seconds = slow_call_seconds
+        self.minimum_calls = minimum_calls
+        self.open_seconds = open_seconds
+
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._window = deque(maxlen=window_size)  # True = failed or slow call
+        self._lock = threading.Lock()
+
+        self.rejected = 0
+        self.failures = 0
+        self.slow_calls = 0
+        self.successes = 0
+        self.times_opened = 0
+
+    @property
+    def state(self):
+        return self._state
+
+    def allow_request(self):
+        """Return True if the protected call may be attempted right now."""
+        if self._state == CLOSED:
+            return True
+        with self._lock:
+            if self._state == OPEN and time.monotonic() - self._opened_at >= self.open_seconds:
+                self._transition(HALF_OPEN)
+                threading.Thread(target=self._run_probe, name=f"{self.name}-probe", daemon=True).start()
+            self.rejected += 1
+        return False
+
+    def record_success(self, elapsed):
+        slow = elapsed >= self.slow_call_seconds
+        with self._lock:
+            if slow:
+                self.slow_calls += 1
+            else:
+                self.successes += 1
+            self._record(slow)
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._record(True)
+
+    def _record(self, failed):
+        if self._state != CLOSED:
+            return
+        self._window.append(failed)
+        if len(self._window) >= self.minimum_calls:
+            failure_rate = sum(self._window) / len(self._window)
+            if failure_rate >= self.failure_rate_threshold:
+                self._transition(OPEN)
+
+    def _run_probe(self):
+        try:
+            healthy = bool(self.probe())
+        except Exception as e:
+            logger.debug("%s probe failed: %s", self.name, e)
+            healthy = False
+        with self._lock:
+            self._transition(CLOSED if healthy else OPEN)
+
+    def _transition(self, state):
+        if state == self._state:
+            return
+        logger.warning("%s circuit %s -> %s", self.name, self._state, state)
+        self._state = state
+        if state == OPEN:
+            self._opened_at = time.monotonic()
+            self.times_opened += 1
+        elif state == CLOSED:
+            self._window.clear()
+
+    def stats(self):
+        return {
+            'state': self._state,
+            'window_failure_rate': round(sum(self._window) / len(self._window), 4) if self._window else 0.0,
+            'successes': self.successes,
+            'failures': self.failures,
+            'slow_calls': self.slow_calls,
+            'rejected': self.rejected,
+            'times_opened': self.times_opened,
+        }
+
+
+def _breaker_setting(name, default):
+    return getattr(settings, 'ELASTICSEARCH_CIRCUIT_BREAKER', {}).get(name, default)
+
+
+def elasticsearch_request_timeout():
+    """Per-request time budget (seconds) for search calls to Elasticsearch."""
+    return _breaker_setting('REQUEST_TIMEOUT', 2.0)
+
+
+def is_elasticsearch_outage(exc):
+    """
+    Whether an exception from a search call means Elasticsearch itself is
+    unhealthy: connection errors, timeouts, 5xx and 429 responses. Only these
+    count against the breaker; a rejected query or a bug in handling the
+    results says nothing about the backend.
+    """
+    if isinstance(exc, TransportError):
+        return True
+    return isinstance(exc, ApiError) and (exc.status >= 500 or exc.status == 429)
+
+
+def _ping_elasticsearch():
+    from .documents import ProductDocument
+    client = ProductDocument._get_connection()
+    return client.options(request_timeout=_breaker_setting('PROBE_TIMEOUT', 1.0)).ping()
+
+
+elasticsearch_breaker = CircuitBreaker(
+    'elasticsearch',
+    probe=_ping_elasticsearch,
+    failure_rate_threshold=_breaker_setting('FAILURE_RATE_THRESHOLD', 0.5),
+    slow_call_seconds=_breaker_setting('SLOW_CALL_SECONDS', 1.0),
+    window_size=_breaker_setting('WINDOW_SIZE', 20),
+    minimum_calls=_breaker_setting('MINIMUM_CALLS', 5),
+    open_seconds=_breaker_setting('OPEN_SECONDS', 10.0),
+)
+
+metrics.register('elasticsearch_breaker', elasticsearch_breaker.stats)
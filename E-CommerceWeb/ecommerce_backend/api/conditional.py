@@ -0,0 +1,114 @@
+"""
+Conditional GET for catalog reads.
+
+Every response of a catalog read endpoint is a function of the request
+(path, query string, Accept) and of the catalog contents, and the catalog
+contents only change together with the catalog generation (api/cache.py),
+which every Product/Category write bumps. So
+
+    ETag: "<epoch>-<generation>-<hash of path, query and Accept>"
+    Last-Modified: <time of the generation's bump>
+
+validate a response without computing it: a request whose If-None-Match (or,
+without one, If-Modified-Since) still matches gets a 304 before DRF
+authentication, the database or Elasticsearch are touched. Any write moves
+the generation on and the next request is served in full. The epoch changes
+whenever the counter restarts, so ETags stay unique after the cache loses it
+and between workers that each count on their own (a local-memory cache; see
+the api.W001 check).
+
+Last-Modified has one-second resolution, and another write can still start a
+generation within the second of the current one. So it is only sent once
+that second is over; until then the ETag alone validates.
+
+Only 200 responses are tagged; a view can opt a response out (e.g. a
+degraded search result) with `Cache-Control: no-store`. Tagged responses
+carry `Cache-Control: no-cache` so browsers revalidate instead of reusing
+them heuristically. Like the search cache, another worker's write is noticed
+within SEARCH_CACHE['GENERATION_CHECK_INTERVAL'].
+"""
+
+import hashlib
+import threading
+import time
+from functools import wraps
+
+from django.http import HttpResponseNotModified
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+
+from . import metrics
+from .cache import catalog_generation
+
+_SAFE_METHODS = ('GET', 'HEAD')
+
+
+class _Counters:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.not_modified = 0
+        self.tagged = 0
+        self.untagged = 0
+
+    def add(self, name):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def stats(self):
+        revalidations = self.not_modified + self.tagged
+        return {
+            'not_modified': self.not_modified,
+            'tagged': self.tagged,
+            'untagged': self.untagged,
+            'not_modified_ratio': round(self.not_modified / revalidations, 4) if revalidations else None,
+        }
+
+
+_counters = _Counters()
+metrics.register('conditional_get', _counters.stats)
+
+
+def catalog_etag(request):
+    """Strong ETag for `request` at the current catalog generation."""
+    variant = f"{request.get_full_path()}\n{request.META.get('HTTP_ACCEPT', '')}"
+    digest = hashlib.blake2b(variant.encode('utf-8'), digest_size=8).hexdigest()
+    return f'"{catalog_generation.version()}-{digest}"'
+
+
+def _set_validators(response, etag, last_modified):
+    response.headers['ETag'] = etag
+    if last_modified is not None:
+        response.headers['Last-Modified'] = http_date(last_modified)
+    patch_cache_control(response, no_cache=True)
+
+
+def catalog_conditional(view):
+    """
+    Wrap a catalog read view (function or `as_view()` result) with
+    generation-based ETag/Last-Modified handling.
+    """
+    @wraps(view)
+    def wrapped(request, *args, **kwargs):
+        if request.method not in _SAFE_METHODS:
+            return view(request, *args, **kwargs)
+
+        etag = catalog_etag(request)
+        last_modified = catalog_generation.last_modified()
+        if last_modified >= int(time.time()):
+            last_modified = None  # same-second writes could not be told apart
+        if isinstance(get_conditional_response(request, etag=etag, last_modified=last_modified),
+                      HttpResponseNotModified):
+            _counters.add('not_modified')
+            response = HttpResponseNotModified()
+            _set_validators(response, etag, last_modified)
+            return response
+
+        response = view(request, *args, **kwargs)
+        # DRF responses are rendered lazily; headers can be set before that
+        if response.status_code != 200 or 'no-store' in response.get('Cache-Control', ''):
+            _counters.add('untagged')
+            return response
+        _counters.add('tagged')
+        _set_validators(response, etag, last_modified)
+        return response
+    return wrapped
@@ -1,3 +1,4 @@
+from django.conf import settings
 from django_elasticsearch_dsl import Document, Index, fields
 from django_elasticsearch_dsl.registries import registry
 from elasticsearch_dsl import analyzer
@@ -26,6 +27,35 @@ categories_index.settings(
     }
 )
 
+# 🔹 Synonym groups shared by the ES analyzer and the in-process fallback index
+PRODUCT_SYNONYMS = [
+    # Electronics synonyms
+    "mobile, phone, smartphone, cellphone, mobiles, phones",
+    "laptop, notebook, ultrabook, laptops, computer",
+    "tv, television, smart tv, televisions",
+    "headphone, earphone, earphones, headphones, earbuds, headset",
+    "tablet, ipad, tabs",
+    "watch, smartwatch, wearable",
+    "camera, dslr, camcorder",
+
+    # Clothing synonyms
+    "clothing, clothes, apparel, wear, garment, garments, dress, attire",
+    "shirt, tshirt, t-shirt, top, blouse",
+    "pant, pants, trouser, trousers, jeans, bottom",
+    "shoe, shoes, footwear, sneaker, sneakers",
+    "jacket, coat, hoodie, sweatshirt",
+    "dress, gown, frock",
+
+    # Accessories
+    "bag, backpack, handbag, purse",
+    "belt, belts, strap",
+    "wallet, purse",
+
+    # Home & Kitchen
+    "furniture, furnishing",
+    "appliance, appliances, device, devices",
+]
+
 # 🔹 Create and configure the index with synonym analyzer for better semantic search
 products_index = Index('products')
 products_index.settings(
@@ -35,33 +65,13 @@ products_index.settings(
         "filter": {
             "synonym_filter": {
                 "type": "synonym",
-                "synonyms": [
-                    # Electronics synonyms
-                    "mobile, phone, smartphone, cellphone, mobiles, phones",
-                    "laptop, notebook, ultrabook, laptops, computer",
-                    "tv, television, smart tv, televisions",
-                    "headphone, earphone, earphones, headphones, earbuds, headset",
-                    "tablet, ipad, tabs",
-                    "watch, smartwatch, wearable",
-                    "camera, dslr, camcorder",
-                    
-                    # Clothing synonyms
-                    "clothing, clothes, apparel, wear, garment, garments, dress, attire",
-                    "shirt, tshirt, t-shirt, top, blouse",
-                    "pant, pants, trouser, trousers, jeans, bottom",
-                    "shoe, shoes, footwear, sneaker, sneakers",
-                    "jacket, coat, hoodie, sweatshirt",
-                    "dress, gown, frock",
-                    
-                    # Accessories
-                    "bag, backpack, handbag, purse",
-                    "belt, belts, strap",
-                    "wallet, purse",
-                    
-                    # Home & Kitchen
-                    "furniture, furnishing",
-                    "appliance, appliances, device, devices",
-                ]
+                "synonyms": PRODUCT_SYNONYMS
+            },
+            # 2-3 character grams for partial (infix) matching without wildcards
+            "ngram_filter": {
+                "type": "ngram",
+                "min_gram": 2,
+                "max_gram": 3
             }
         },
         "analyzer": {
@@ -74,6 +84,11 @@ products_index.settings(
                 "type": "custom",
                 "tokenizer": "standard",
                 "filter": ["lowercase", "synonym_filter"]
+            },
+            "ngram_analyzer": {
+                "type": "custom",
+                "tokenizer": "standard",
+                "filter": ["lowercase", "ngram_filter"]
             }
         }
     }
@@ -86,23 +101,30 @@ class ProductDocument(Document):
         'ct_id': fields.IntegerField(),
         'ct_name': fields.TextField(
             analyzer='synonym_analyzer',
-            fields={'raw': fields.KeywordField()}
+            fields={
+                'raw': fields.KeywordField(),
+                'ngram': fields.TextField(analyzer='ngram_analyzer'),
+            }
         ),
         'ct_description': fields.TextField(analyzer='synonym_analyzer'),
     })
 
     # 🔹 Define product fields with synonym support
     pdt_id = fields.IntegerField()
+    # 🔹 .ngram subfields serve partial matches as term lookups (no leading wildcards)
     pdt_name = fields.TextField(
         analyzer='synonym_analyzer',
-        fields={'raw': fields.KeywordField()}
+        fields={
+            'raw': fields.KeywordField(),
+            'ngram': fields.TextField(analyzer='ngram_analyzer'),
+        }
     )
     pdt_mrp = fields.FloatField()
     pdt_dis_price = fields.FloatField()
     pdt_qty = fields.IntegerField()
 
     class Index:
-        name = 'products'
+        name = 'products'  # alias once `manage.py reindex_search` has run
         settings = products_index._settings
 
     class Django:
@@ -111,19 +133,47 @@ class ProductDocument(Document):
         related_models = [Category]
 
     # 🔹 Prepare category data for indexing
+    @staticmethod
+    def category_source(category):
+        return {
+            'ct_id': category.ct_id,
+            'ct_name': category.ct_name,
+            'ct_description': category.ct_description or '',
+        }
+
     def prepare_ct(self, instance):
         if instance.ct:
-            return {
-                'ct_id': instance.ct.ct_id,
-                'ct_name': instance.ct.ct_name,
-                'ct_description': instance.ct.ct_description or '',
-            }
+            return self.category_source(instance.ct)
         return None
 
-    # 🔁 Reindex products when a related category changes
+    # 🔹 Embedded category is read for every product; fetch it in the same query
+    def get_queryset(self):
+        return super().get_queryset().select_related('ct')
+
+    # 🔁 The queued signal processor pushes a category change with
+    # update_from_related(), which rewrites only `ct`; the stock processors
+    # re-index the category's products from here
     def get_instances_from_related(self, related_instance):
         if isinstance(related_instance, Category):
-            return related_instance.products.all()
+            return related_instance.products.select_related('ct')
+        return None
+
+    def update_from_related(self, related_instance, index=None):
+        """Push a category's fields into every product embedding it, in one update-by-query."""
+        if not isinstance(related_instance, Category):
+            return None
+        timeout = getattr(settings, 'SEARCH_BULK_INDEXING', {}).get('RELATED_UPDATE_TIMEOUT', 300)
+        return self._get_connection().options(request_timeout=timeout).update_by_query(
+            index=index or self._index._name,
+            query={'term': {'ct.ct_id': related_instance.ct_id}},
+            script={
+                'source': 'ctx._source.ct = params.ct',
+                'lang': 'painless',
+                'params': {'ct': self.category_source(related_instance)},
+            },
+            conflicts='proceed',
+            slices='auto',
+        )
 
 
 # 🔹 Category document for ES search
@@ -134,7 +184,7 @@ class CategoryDocument(Document):
     ct_description = fields.TextField(analyzer=lowercase_analyzer)
 
     class Index:
-        name = 'categories'
+        name = 'categories'  # alias once `manage.py reindex_search` has run
         settings = categories_index._settings
 
     class Django:
@@ -0,0 +1,135 @@
+"""
+Read-only fast path for catalog reads.
+
+A `FastSerializer` is derived from an existing ModelSerializer: it reads the
+serializer's declared fields once, selects exactly those columns with
+`.values()` and turns each row dict straight into the output dict with a
+precomputed converter per field. No model instances, no per-row field binding,
+and decimals/datetimes are formatted without DRF's generic machinery, while
+the JSON stays identical to the ModelSerializer's (see api/tests.py).
+
+Field types without a dedicated converter (or with options such as
+`localize`) fall back to the DRF field's own to_representation.
+"""
+
+import decimal
+
+from django.db.models import ForeignKey
+from rest_framework import serializers
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+from .serializers import CategorySerializer, ProductSerializer
+
+
+def _decimal_converter(field):
+    coerce_to_string = getattr(field, 'coerce_to_string', api_settings.COERCE_DECIMAL_TO_STRING)
+    if field.localize or field.normalize_output or not coerce_to_string or field.decimal_places is None:
+        return field.to_representation
+
+    exponent = decimal.Decimal('.1') ** field.decimal_places
+    context = decimal.getcontext().copy()
+    if field.max_digits is not None:
+        context.prec = field.max_digits
+    rounding = field.rounding
+    Decimal = decimal.Decimal
+
+    def convert(value):
+        if not isinstance(value, Decimal):
+            value = Decimal(str(value).strip())
+        return f'{value.quantize(exponent, rounding=rounding, context=context):f}'
+    return convert
+
+
+def _datetime_converter(field):
+    output_format = getattr(field, 'format', api_settings.DATETIME_FORMAT)
+    if output_format is None or output_format.lower() != 'iso-8601' or hasattr(field, 'timezone'):
+        return field.to_representation
+
+    def convert(value):
+        if isinstance(value, str):
+            return value
+        value = field.enforce_timezone(value)
+        value = value.isoformat()
+        if value.endswith('+00:00'):
+            value = value[:-6] + 'Z'
+        return value
+    return convert
+
+
+def _converter(field):
+    if isinstance(field, serializers.DecimalField):
+        return _decimal_converter(field)
+    if isinstance(field, serializers.DateTimeField):
+        return _datetime_converter(field)
+    if type(field) is serializers.IntegerField:
+        return int
+    if type(field) is serializers.CharField:
+        return str
+    return field.to_representation
+
+
+def _lookup(model, source_attrs):
+    """values() lookup for a serializer source; `fk.pk` reads the local FK column."""
+    if len(source_attrs) == 2:
+        try:
+            model_field = model._meta.get_field(source_attrs[0])
+        except Exception:
+            model_field = None
+        if isinstance(model_field, ForeignKey) and model_field.target_field.name == source_attrs[1]:
+            return model_field.attname
+    return '__'.join(source_attrs)
+
+
+class FastSerializer:
+    """Serializes `.values()` rows exactly like `serializer_class` serializes instances."""
+
+    def __init__(self, serializer_class):
+        self.serializer_class = serializer_class
+        self._columns = None
+
+    @property
+    def columns(self):
+        # Built lazily: binding serializer fields needs the app registry ready
+        if self._columns is None:
+            model = self.serializer_class.Meta.model
+            self._columns = [
+                (name, _lookup(model, field.source_attrs), _converter(field))
+                for name, field in self.serializer_class().fields.items()
+            ]
+        return self._columns
+
+    def values(self, queryset):
+        return queryset.values(*dict.fromkeys(lookup for _, lookup, _ in self.columns))
+
+    def to_representation(self, row):
+        return {
+            name: None if row[lookup] is None else convert(row[lookup])
+            for name, lookup, convert in self.columns
+        }
+
+    def many(self, rows):
+        columns = self.columns
+        return [
+            {name: None if row[lookup] is None else convert(row[lookup]) for name, lookup, convert in columns}
+            for row in rows
+        ]
+
+
+product_fast_serializer = FastSerializer(ProductSerializer)
+category_fast_serializer = FastSerializer(CategorySerializer)
+
+
+class FastListMixin:
+    """
+    `list()` through `fast_serializer` over `.values()` rows; filtering and
+    pagination (page number or cursor) work as before.
+    """
+    fast_serializer = None
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.fast_serializer.values(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(self.fast_serializer.many(page))
+        return Response(self.fast_serializer.many(queryset))
@@ -0,0 +1,63 @@
+"""
+MySQL FULLTEXT search over product names.
+
+The `products_pdt_name_ft` FULLTEXT index (migration 0005, MySQL only) lets
+`MATCH (pdt_name) AGAINST (...)` find candidate rows through the index
+instead of the `LIKE '%q%'` scan behind `icontains`. Queries run in BOOLEAN
+MODE with every term required and prefix-matched:
+
+    "wireless head"  ->  +wireless* +head*
+
+so results are close to the word-prefix matches of the icontains fallback.
+Unlike icontains, FULLTEXT matches whole words only ("phone" does not match
+"smartphone") and ignores terms shorter than the server's
+innodb_ft_min_token_size (FULLTEXT_SEARCH['MIN_TOKEN_SIZE'] mirrors it) and
+InnoDB stopwords; a query with no usable term is left to the icontains path.
+"""
+
+import re
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import BooleanField, ExpressionWrapper, FloatField, Func, Value
+
+INDEX_NAME = 'products_pdt_name_ft'
+
+# Characters with a meaning in BOOLEAN MODE
+_OPERATORS = re.compile(r'[+\-<>()~*"@]+')
+
+
+def fulltext_setting(name, default):
+    return getattr(settings, 'FULLTEXT_SEARCH', {}).get(name, default)
+
+
+def available():
+    return connection.vendor == 'mysql'
+
+
+def boolean_query(text):
+    """BOOLEAN MODE query requiring every usable term as a word prefix, or '' if none."""
+    min_size = fulltext_setting('MIN_TOKEN_SIZE', 3)
+    terms = [term for term in _OPERATORS.sub(' ', text.lower()).split() if len(term) >= min_size]
+    return ' '.join(f'+{term}*' for term in dict.fromkeys(terms))
+
+
+class MatchAgainst(Func):
+    """MATCH (column) AGAINST (query IN BOOLEAN MODE); the relevance score."""
+    output_field = FloatField()
+
+    def __init__(self, column, query):
+        super().__init__(column, Value(query))
+
+    def as_sql(self, compiler, connection):
+        column_sql, column_params = compiler.compile(self.source_expressions[0])
+        query_sql, query_params = compiler.compile(self.source_expressions[1])
+        return (
+            f'MATCH ({column_sql}) AGAINST ({query_sql} IN BOOLEAN MODE)',
+            [*column_params, *query_params],
+        )
+
+
+def matches(column, query):
+    """Filter expression for rows matching `query` (usable in `.filter()`)."""
+    return ExpressionWrapper(MatchAgainst(column, query), output_field=BooleanField())
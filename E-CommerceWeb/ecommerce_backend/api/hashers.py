@@ -2,76 +2,146 @@
 Custom Password Hasher with Pepper Support
 This adds an extra layer of security by combining a secret pepper key with the password
 before hashing. The pepper is stored separately from the database.
+
+Peppers live in a keyring (settings.PASSWORD_PEPPERS, id -> pepper) and every hash
+records the id of the pepper it was made with:
+
+    bcrypt_sha256_peppered$<pepper id>$2b$12$<salt><checksum>
+
+Hashes made before the keyring have an empty id and use the legacy PASSWORD_PEPPER.
+New hashes use settings.PASSWORD_PEPPER_ID; older ones are re-hashed with it on the
+next successful login (must_update), so a pepper can be rotated without locking
+anyone out and without trying several peppers per login.
+
+The bcrypt work factor comes from settings.PASSWORD_BCRYPT_ROUNDS (see
+`manage.py calibrate_hashers`); hashes with a different cost are likewise re-hashed
+on login.
 """
 
+import binascii
 import hashlib
-from django.contrib.auth.hashers import BCryptSHA256PasswordHasher
+import logging
+
 from django.conf import settings
+from django.contrib.auth.hashers import BCryptSHA256PasswordHasher
+from django.core.exceptions import ImproperlyConfigured
 from django.utils.crypto import constant_time_compare
 
+logger = logging.getLogger(__name__)
+
+
+def pepper_keyring():
+    """id -> pepper. The '' entry (legacy, un-identified hashes) defaults to PASSWORD_PEPPER."""
+    return {'': getattr(settings, 'PASSWORD_PEPPER', ''), **getattr(settings, 'PASSWORD_PEPPERS', {})}
+
+
+def current_pepper_id():
+    pepper_id = getattr(settings, 'PASSWORD_PEPPER_ID', '')
+    if '$' in pepper_id or pepper_id not in pepper_keyring():
+        raise ImproperlyConfigured(
+            "PASSWORD_PEPPER_ID must name an entry of PASSWORD_PEPPERS and must not contain '$'"
+        )
+    return pepper_id
+
 
 class PepperedBCryptSHA256PasswordHasher(BCryptSHA256PasswordHasher):
     """
     BCrypt hasher with pepper support.
-    
+
     Pepper is a secret key that is added to all passwords before hashing.
     Unlike salt (which is unique per password), pepper is the same for all passwords
     and is stored in settings/environment variables, not in the database.
-    
+
     Security benefits:
     - If database is compromised, attacker still needs the pepper key
     - Adds defense-in-depth security layer
     - Complements salting (which is still automatic with BCrypt)
-    
+
     Note: This hasher uses a unique algorithm identifier to ensure proper verification.
+    The pepper id stored in the hash selects the pepper, so verification is always a
+    single bcrypt computation.
     """
-    
+
     algorithm = "bcrypt_sha256_peppered"
-    
-    def _add_pepper(self, password):
-        """Add pepper to password"""
-        pepper = getattr(settings, 'PASSWORD_PEPPER', '')
-        return password + pepper
-    
+
+    @property
+    def rounds(self):
+        return getattr(settings, 'PASSWORD_BCRYPT_ROUNDS', 12)
+
+    def _split(self, encoded):
+        """Return (pepper id, bcrypt data starting with '$2b$')."""
+        algorithm, rest = encoded.split('$', 1)
+        assert algorithm == self.algorithm
+        pepper_id, data = rest.split('$', 1)
+        return pepper_id, '$' + data
+
+    def _bcrypt(self, password, pepper, salt):
+        """bcrypt of the peppered, SHA-256 pre-hashed password (as BCryptSHA256PasswordHasher)."""
+        bcrypt = self._load_library()
+        peppered = (password + pepper).encode()
+        return bcrypt.hashpw(binascii.hexlify(hashlib.sha256(peppered).digest()), salt)
+
     def encode(self, password, salt):
         """
-        Hash the password with pepper added.
-        
+        Hash the password with the current pepper added.
+
         Args:
             password: The plain text password
             salt: Random salt (automatically generated by BCrypt)
-            
+
         Returns:
             Hashed password string
         """
-        # Add pepper to password before hashing
-        peppered_password = self._add_pepper(password)
-        
-        # Use parent BCrypt hasher with peppered password
-        return super().encode(peppered_password, salt)
-    
+        pepper_id = current_pepper_id()
+        data = self._bcrypt(password, pepper_keyring()[pepper_id], salt)
+        return f"{self.algorithm}${pepper_id}{data.decode('ascii')}"
+
     def verify(self, password, encoded):
         """
         Verify a password against a stored hash.
-        
+
         Args:
             password: The plain text password to verify
             encoded: The stored hash from database
-            
+
         Returns:
             True if password matches, False otherwise
         """
-        # Add pepper to password before verification
-        peppered_password = self._add_pepper(password)
-        
-        # Decode the stored hash to get algorithm and rest
-        algorithm, rest = encoded.split('$', 1)
-        
-        # Use parent BCrypt verifier with peppered password
-        # We need to reconstruct the hash with the parent algorithm for verification
-        parent_encoded = f"bcrypt_sha256${rest}"
-        return BCryptSHA256PasswordHasher().verify(peppered_password, parent_encoded)
-    
+        pepper_id, data = self._split(encoded)
+        pepper = pepper_keyring().get(pepper_id)
+        if pepper is None:
+            logger.error("Password hash uses pepper id %r, which is not in PASSWORD_PEPPERS", pepper_id)
+            return False
+        # Stored data doubles as the salt (bcrypt reads the cost and salt prefix)
+        return constant_time_compare(self._bcrypt(password, pepper, data.encode('ascii')), data.encode('ascii'))
+
+    def decode(self, encoded):
+        pepper_id, data = self._split(encoded)
+        _, algostr, work_factor, rest = data.split('$', 3)
+        return {
+            "algorithm": self.algorithm,
+            "algostr": algostr,
+            "checksum": rest[22:],
+            "salt": rest[:22],
+            "work_factor": int(work_factor),
+            "pepper_id": pepper_id,
+        }
+
+    def must_update(self, encoded):
+        # Re-hash with the current pepper and cost on the next successful login
+        decoded = self.decode(encoded)
+        return decoded["work_factor"] != self.rounds or decoded["pepper_id"] != current_pepper_id()
+
+    def harden_runtime(self, password, encoded):
+        # Same as the parent, for the pepper-id format
+        _, data = self._split(encoded)
+        salt = data[:29]  # Length of the salt in bcrypt.
+        rounds = data.split('$')[2]
+        diff = 2 ** (self.rounds - int(rounds)) - 1
+        while diff > 0:
+            self._bcrypt(password, '', salt.encode('ascii'))
+            diff -= 1
+
     def safe_summary(self, encoded):
         """
         Return a summary of the password hash for debugging.
@@ -79,4 +149,5 @@ class PepperedBCryptSHA256PasswordHasher(BCryptSHA256PasswordHasher):
         """
         summary = super().safe_summary(encoded)
         summary['pepper'] = 'enabled'
+        summary['pepper id'] = self.decode(encoded)['pepper_id'] or '(legacy)'
         return summary
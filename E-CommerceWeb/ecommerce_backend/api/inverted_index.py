@@ -0,0 +1,347 @@
+"""
+In-process inverted index over product names and category names.
+
+Used by search_products as the Elasticsearch fallback instead of
+`icontains` scans. Text is analyzed like the ES `synonym_analyzer` in
+documents.py: split on non-word characters, lowercased, and expanded with
+PRODUCT_SYNONYMS (single-word entries).
+
+Matching: every query token must match a name token (or a category token,
+which selects the whole category) either exactly, as a prefix, or through a
+synonym. Ranking reuses the database fallback tiers:
+
+    100  category name == query
+     90  product name == query
+     80  product name starts with query
+     60  product name contains query
+     40  category name contains query
+     20  token / synonym match only
+
+The index is built at worker start from a streaming values_list() query and
+then kept current incrementally: this worker's writes are applied from the
+catalog signals (api/signals.py), and other workers' writes are replayed
+from the ids each catalog generation records (CatalogGeneration.changes()).
+Only when that history is gone (expired, evicted, or the generation counter
+reset) is the index rebuilt, in the background.
+"""
+
+import bisect
+import logging
+import re
+import threading
+from collections import defaultdict
+
+from . import metrics
+from .cache import catalog_generation
+from .documents import PRODUCT_SYNONYMS
+
+logger = logging.getLogger(__name__)
+
+_TOKEN_RE = re.compile(r'\w+')
+
+
+def _build_synonyms(groups):
+    synonyms = defaultdict(set)
+    for group in groups:
+        words = [w.strip().lower() for w in group.split(',')]
+        words = [w for w in words if w and _TOKEN_RE.fullmatch(w)]
+        for word in words:
+            synonyms[word].update(words)
+    return dict(synonyms)
+
+
+SYNONYMS = _build_synonyms(PRODUCT_SYNONYMS)
+
+
+def tokenize(text):
+    return _TOKEN_RE.findall(text.lower())
+
+
+class ProductIndex:
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._rebuilding = threading.Lock()
+        # Serializes read-from-database + apply, so an older read never lands last
+        self._applying = threading.Lock()
+        self._reset()
+        self.ready = False
+        self.generation = None
+        self.rebuilds = 0
+        self.catch_ups = 0
+
+    def _reset(self):
+        # pdt_id -> (name_lower, pdt_name, ct_id, pdt_mrp, pdt_dis_price, pdt_qty)
+        self._products = {}
+        # ct_id -> (name_lower, ct_name)
+        self._categories = {}
+        self._name_postings = defaultdict(set)      # token -> {pdt_id}
+        self._category_postings = defaultdict(set)  # token -> {ct_id}
+        self._category_products = defaultdict(set)  # ct_id -> {pdt_id}
+        self._vocabulary = []                       # sorted tokens, for prefix lookups
+        self._bulk_loading = False
+
+    # --- building -------------------------------------------------------
+
+    def build(self, chunk_size=2000):
+        """(Re)build the whole index from the database."""
+        from .models import Category, Product
+
+        with self._rebuilding:
+            generation = catalog_generation.current()
+            fresh = ProductIndex()
+            fresh._bulk_loading = True
+            for ct_id, ct_name in Category.objects.values_list('ct_id', 'ct_name').iterator(chunk_size=chunk_size):
+                fresh._add_category(ct_id, ct_name)
+            rows = Product.objects.values_list(
+                'pdt_id', 'pdt_name', 'ct_id', 'pdt_mrp', 'pdt_dis_price', 'pdt_qty'
+            ).iterator(chunk_size=chunk_size)
+            for row in rows:
+                fresh._add_product(*row)
+            fresh._vocabulary = sorted(set(fresh._name_postings) | set(fresh._category_postings))
+
+            with self._lock:
+                self.__dict__.update({
+                    key: getattr(fresh, key) for key in (
+                        '_products', '_categories', '_name_postings',
+                        '_category_postings', '_category_products', '_vocabulary',
+                    )
+                })
+                self.generation = generation
+                self.ready = True
+                self.rebuilds += 1
+        logger.info("Product fallback index built: %d products", len(self._products))
+
+    def build_in_background(self):
+        self._in_background(self.build)
+
+    def catch_up_in_background(self):
+        self._in_background(self.catch_up)
+
+    def _in_background(self, target):
+        if self._rebuilding.locked():
+            return
+        threading.Thread(target=self._safe_run, args=(target,), name='product-index-build', daemon=True).start()
+
+    def _safe_run(self, target):
+        if self._rebuilding.locked():
+            return
+        try:
+            target()
+        except Exception as e:
+            logger.warning("Product fallback index update failed: %s", e)
+
+    def catch_up(self):
+        """
+        Apply the writes other workers made since this index's generation,
+        falling back to a full build when they are no longer recorded.
+        """
+        with self._rebuilding:
+            since, until = self.generation, catalog_generation.current()
+            changes = None
+            if since is not None and since <= until:
+                changes = catalog_generation.changes(since, until)
+            if changes is not None:
+                self._apply(*changes)
+                with self._lock:
+                    self.generation = max(self.generation, until)
+                    self.catch_ups += 1
+                return
+        self.build()
+
+    def _unindex_token(self, postings, token, member):
+        entries = postings.get(token)
+        if entries is None:
+            return
+        entries.discard(member)
+        if not entries:
+            del postings[token]
+            if token not in self._name_postings and token not in self._category_postings:
+                position = bisect.bisect_left(self._vocabulary, token)
+                if position < len(self._vocabulary) and self._vocabulary[position] == token:
+                    del self._vocabulary[position]
+
+    def _index_token(self, token):
+        if self._bulk_loading:
+            return  # build() sorts the vocabulary once at the end
+        if token not in self._name_postings and token not in self._category_postings:
+            position = bisect.bisect_left(self._vocabulary, token)
+            if position == len(self._vocabulary) or self._vocabulary[position] != token:
+                self._vocabulary.insert(position, token)
+
+    def _add_category(self, ct_id, ct_name):
+        self._categories[ct_id] = (ct_name.lower(), ct_name)
+        for token in set(tokenize(ct_name)):
+            self._index_token(token)
+            self._category_postings[token].add(ct_id)
+
+    def _remove_category(self, ct_id):
+        entry = self._categories.pop(ct_id, None)
+        if entry:
+            for token in set(tokenize(entry[0])):
+                self._unindex_token(self._category_postings, token, ct_id)
+
+    def _add_product(self, pdt_id, pdt_name, ct_id, pdt_mrp, pdt_dis_price, pdt_qty):
+        self._products[pdt_id] = (
+            pdt_name.lower(),
+            pdt_name,
+            ct_id,
+            float(pdt_mrp),
+            float(pdt_dis_price) if pdt_dis_price is not None else None,
+            pdt_qty,
+        )
+        self._category_products[ct_id].add(pdt_id)
+        for token in set(tokenize(pdt_name)):
+            self._index_token(token)
+            self._name_postings[token].add(pdt_id)
+
+    def _remove_product(self, pdt_id):
+        entry = self._products.pop(pdt_id, None)
+        if entry:
+            in_category = self._category_products.get(entry[2])
+            if in_category is not None:
+                in_category.discard(pdt_id)
+                if not in_category:
+                    del self._category_products[entry[2]]
+            for token in set(tokenize(entry[0])):
+                self._unindex_token(self._name_postings, token, pdt_id)
+
+    # --- incremental updates ---------------------------------------------
+
+    def update(self, product_ids=(), category_ids=(), generation=None):
+        """
+        Apply this worker's write, made as `generation`. Generations from
+        other workers in between are left to catch_up().
+        """
+        if not self.ready:
+            return
+        self._apply(product_ids, category_ids)
+        with self._lock:
+            if generation is not None and self.generation == generation - 1:
+                self.generation = generation
+
+    def _apply(self, product_ids, category_ids):
+        """Re-read the given rows from the database (deleted rows are dropped)."""
+        from .models import Category, Product
+
+        with self._applying:
+            products = list(Product.objects.filter(pdt_id__in=product_ids).values_list(
+                'pdt_id', 'pdt_name', 'ct_id', 'pdt_mrp', 'pdt_dis_price', 'pdt_qty'
+            )) if product_ids else []
+            categories = list(Category.objects.filter(ct_id__in=category_ids).values_list(
+                'ct_id', 'ct_name'
+            )) if category_ids else []
+
+            with self._lock:
+                for pdt_id in product_ids:
+                    self._remove_product(pdt_id)
+                for row in products:
+                    self._add_product(*row)
+                for ct_id in category_ids:
+                    self._remove_category(ct_id)
+                for ct_id, ct_name in categories:
+                    self._add_category(ct_id, ct_name)
+                existing = {ct_id for ct_id, _ in categories}
+                for ct_id in set(category_ids) - existing:
+                    # Category deleted: its products went with it
+                    for pdt_id in list(self._category_products.get(ct_id, ())):
+                        self._remove_product(pdt_id)
+
+    # --- searching -----------------------------------------------------
+
+    def _expand(self, token):
+        """Index tokens matching `token` exactly, by prefix or via a synonym."""
+        matches = {token} | SYNONYMS.get(token, set())
+        position = bisect.bisect_left(self._vocabulary, token)
+        while position < len(self._vocabulary) and self._vocabulary[position].startswith(token):
+            matches.add(self._vocabulary[position])
+            position += 1
+        return matches
+
+    def _candidates(self, tokens):
+        candidates = None
+        for token in tokens:
+            words = self._expand(token)
+            matched = set()
+            for word in words:
+                matched |= self._name_postings.get(word, set())
+                for ct_id in self._category_postings.get(word, ()):
+                    matched |= self._category_products.get(ct_id, set())
+            candidates = matched if candidates is None else candidates & matched
+            if not candidates:
+                return set()
+        return candidates or set()
+
+    def search(self, search_query, price_filter=None, color_filter=None, start=0, size=100):
+        """Return (products, total) in the search_products fallback format."""
+        if catalog_generation.current() != self.generation:
+            # Another worker changed the catalog; catch up without blocking the request
+            self.catch_up_in_background()
+
+        query = ' '.join(search_query.lower().split())
+        tokens = tokenize(query)
+        if not tokens:
+            return [], 0
+
+        with self._lock:
+            candidates = self._candidates(tokens)
+            color_ids = self._name_postings.get(color_filter, set()) if color_filter else None
+
+            ranked = []
+            for pdt_id in candidates:
+                if color_ids is not None and pdt_id not in color_ids:
+                    continue
+                name_lower, pdt_name, ct_id, mrp, dis_price, qty = self._products[pdt_id]
+                if price_filter:
+                    op, val = price_filter
+                    if dis_price is None or (dis_price > val if op == 'lte' else dis_price < val):
+                        continue
+                ct_lower, ct_name = self._categories.get(ct_id, ('', None))
+                if ct_lower == query:
+                    relevance = 100
+                elif name_lower == query:
+                    relevance = 90
+                elif name_lower.startswith(query):
+                    relevance = 80
+                elif query in name_lower:
+                    relevance = 60
+                elif query in ct_lower:
+                    relevance = 40
+                else:
+                    relevance = 20
+                ranked.append((-relevance, pdt_id, pdt_name, mrp, dis_price, qty, ct_name))
+
+        ranked.sort()
+        products = [{
+            "pdt_id": pdt_id,
+            "pdt_name": pdt_name,
+            "pdt_mrp": mrp,
+            "pdt_dis_price": dis_price,
+            "pdt_qty": qty,
+            "category": ct_name,
+        } for _, pdt_id, pdt_name, mrp, dis_price, qty, ct_name in ranked[start:start + size]]
+        return products, len(ranked)
+
+    def stats(self):
+        return {
+            'ready': self.ready,
+            'products': len(self._products),
+            'categories': len(self._categories),
+            'vocabulary': len(self._vocabulary),
+            'generation': self.generation,
+            'rebuilds': self.rebuilds,
+            'catch_ups': self.catch_ups,
+        }
+
+
+product_index = ProductIndex()
+
+
+def warm_fallback_index():
+    """Build the fallback index in the background; called at worker start."""
+    from django.conf import settings
+    if getattr(settings, 'SEARCH_FALLBACK_MODE', 'inverted_index') == 'inverted_index':
+        product_index.build_in_background()
+
+
+metrics.register('fallback_index', product_index.stats)
@@ -0,0 +1,165 @@
+import math
+import statistics
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.contrib.auth.hashers import UNUSABLE_PASSWORD_PREFIX, get_hasher, get_hashers, identify_hasher
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+PASSWORD = 'calibration-Password-1'
+
+
+def _median_seconds(verify, samples):
+    timings = []
+    for _ in range(samples):
+        start = time.perf_counter()
+        verify()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def _bcrypt_cost(hasher, rounds, samples):
+    encoded = hasher.encode(PASSWORD, hasher._load_library().gensalt(rounds))
+    return _median_seconds(lambda: hasher.verify(PASSWORD, encoded), samples)
+
+
+def _calibrate_bcrypt(hasher, target, samples):
+    """Work factor closest to `target` seconds (each round doubles the cost)."""
+    current = hasher.rounds
+    measured = _bcrypt_cost(hasher, current, samples)
+    recommended = min(31, max(4, current + round(math.log2(target / measured))))
+    at_recommended = measured if recommended == current else _bcrypt_cost(hasher, recommended, samples)
+    setting = ('PASSWORD_BCRYPT_ROUNDS' if hasher.algorithm == 'bcrypt_sha256_peppered'
+               else f'{type(hasher).__name__}.rounds')
+    return f'rounds={current}', measured, f'{setting} = {recommended}', at_recommended
+
+
+def _calibrate_pbkdf2(hasher, target, samples):
+    """Iterations scaled linearly to `target` seconds."""
+    current = hasher.iterations
+    encoded = hasher.encode(PASSWORD, hasher.salt(), current)
+    measured = _median_seconds(lambda: hasher.verify(PASSWORD, encoded), samples)
+    recommended = max(10000, int(round(current * target / measured, -4)))
+    encoded = hasher.encode(PASSWORD, hasher.salt(), recommended)
+    at_recommended = _median_seconds(lambda: hasher.verify(PASSWORD, encoded), samples)
+    return (f'iterations={current}', measured,
+            f'{type(hasher).__name__}.iterations = {recommended}', at_recommended)
+
+
+def _calibrate_argon2(hasher, target, samples):
+    """time_cost scaled to `target` seconds at the configured memory_cost."""
+    current = hasher.time_cost
+    encoded = hasher.encode(PASSWORD, hasher.salt())
+    measured = _median_seconds(lambda: hasher.verify(PASSWORD, encoded), samples)
+    recommended = max(1, round(current * target / measured))
+    original = hasher.time_cost
+    hasher.time_cost = recommended
+    try:
+        encoded = hasher.encode(PASSWORD, hasher.salt())
+    finally:
+        hasher.time_cost = original
+    at_recommended = _median_seconds(lambda: hasher.verify(PASSWORD, encoded), samples)
+    return (f'time_cost={current} memory_cost={hasher.memory_cost}', measured,
+            f'{type(hasher).__name__}.time_cost = {recommended}', at_recommended)
+
+
+def _parameters(hasher, encoded):
+    """Cost parameters of a stored hash, for the distribution report."""
+    decoded = hasher.decode(encoded)
+    if 'work_factor' in decoded:
+        parameters = f"rounds={decoded['work_factor']}"
+    elif 'iterations' in decoded:
+        parameters = f"iterations={decoded['iterations']}"
+    elif 'time_cost' in decoded:
+        parameters = f"time_cost={decoded['time_cost']} memory_cost={decoded['memory_cost']}"
+    else:
+        parameters = '-'
+    if decoded.get('pepper_id') is not None:
+        parameters += f" pepper={decoded['pepper_id'] or '(legacy)'}"
+    return parameters
+
+
+class Command(BaseCommand):
+    help = (
+        'Time password verification for every hasher in PASSWORD_HASHERS on this machine, '
+        'recommend cost parameters for a target verification time, and report which '
+        'hashers and costs the stored passwords in auth_user use.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--target-ms', type=float, default=250.0,
+                            help='Desired time for one password verification (default: 250)')
+        parser.add_argument('--samples', type=int, default=5, help='Verifications timed per setting (median)')
+        parser.add_argument('--distribution-only', action='store_true', help='Skip the benchmark')
+
+    def handle(self, *args, **options):
+        if options['target_ms'] <= 0 or options['samples'] < 1:
+            raise CommandError('--target-ms and --samples must be positive')
+        if not options['distribution_only']:
+            self.calibrate(options['target_ms'] / 1000, options['samples'])
+        self.distribution()
+
+    def calibrate(self, target, samples):
+        self.stdout.write(f'Verification time per hasher (target {target * 1000:.0f} ms):\n')
+        rows = []
+        for path in settings.PASSWORD_HASHERS:
+            hasher = next(h for h in get_hashers() if f'{type(h).__module__}.{type(h).__name__}' == path)
+            try:
+                if hasher.library:
+                    hasher._load_library()
+            except ValueError as e:
+                rows.append((hasher.algorithm, 'unavailable', None, str(e).split('\n')[0], None))
+                continue
+            if hasattr(hasher, 'rounds'):
+                result = _calibrate_bcrypt(hasher, target, samples)
+            elif hasattr(hasher, 'iterations'):
+                result = _calibrate_pbkdf2(hasher, target, samples)
+            elif hasattr(hasher, 'time_cost'):
+                result = _calibrate_argon2(hasher, target, samples)
+            else:
+                continue
+            rows.append((hasher.algorithm, *result))
+
+        self.stdout.write(f"{'hasher':<24} {'current':<34} {'ms':>8}   {'recommended':<46} {'ms':>8}")
+        for algorithm, current, measured, recommended, at_recommended in rows:
+            self.stdout.write(
+                f"{algorithm:<24} {current:<34} {_ms(measured):>8}   {recommended:<46} {_ms(at_recommended):>8}"
+            )
+        self.stdout.write('')
+
+    def distribution(self):
+        default = get_hasher('default')
+        counts = Counter()
+        outdated = 0
+        passwords = User.objects.order_by().values_list('password', flat=True)
+        for encoded in passwords.iterator(chunk_size=2000):
+            if not encoded or encoded.startswith(UNUSABLE_PASSWORD_PREFIX):
+                counts[('(unusable)', '-')] += 1
+                continue
+            try:
+                hasher = identify_hasher(encoded)
+                key = (hasher.algorithm, _parameters(hasher, encoded))
+            except ValueError:
+                counts[('(unknown hasher)', '-')] += 1
+                continue
+            counts[key] += 1
+            # Re-hashed with the default hasher's current parameters on next login
+            if hasher.algorithm != default.algorithm or hasher.must_update(encoded):
+                outdated += 1
+
+        total = sum(counts.values())
+        self.stdout.write(f'Stored password hashes ({total} users):')
+        self.stdout.write(f"{'hasher':<24} {'parameters':<40} {'users':>8} {'share':>7}")
+        for (algorithm, parameters), count in counts.most_common():
+            self.stdout.write(f'{algorithm:<24} {parameters:<40} {count:>8} {count / total:>7.1%}')
+        if total:
+            self.stdout.write(self.style.SUCCESS(
+                f'{outdated} usable hashes differ from the current default ({default.algorithm}) '
+                f'and will be upgraded on login.'
+            ))
+
+
+def _ms(seconds):
+    return '-' if seconds is None else f'{seconds * 1000:.1f}'
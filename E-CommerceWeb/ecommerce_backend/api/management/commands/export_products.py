@@ -0,0 +1,44 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.catalog_export import export_products, export_setting
+
+
+class Command(BaseCommand):
+    help = (
+        'Export every product with its category as NDJSON or CSV, streamed in chunks '
+        '(gzipped when the path ends in .gz). Use "-" to write to stdout.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Output file, or - for stdout')
+        parser.add_argument('--type', choices=['ndjson', 'csv'], help='Format (default: from the extension)')
+        parser.add_argument('--chunk-size', type=int, default=export_setting('CHUNK_SIZE', 2000))
+
+    def handle(self, *args, **options):
+        path = options['path']
+        name = path[:-3] if path.endswith('.gz') else path
+        fmt = options['type'] or ('csv' if name.endswith('.csv') else 'ndjson')
+        if options['chunk_size'] < 1:
+            raise CommandError('--chunk-size must be positive')
+
+        try:
+            output = sys.stdout.buffer if path == '-' else open(path, 'wb')
+        except OSError as e:
+            raise CommandError(str(e))
+
+        written = 0
+        try:
+            for block in export_products(fmt, compressed=path.endswith('.gz'), chunk_size=options['chunk_size']):
+                output.write(block)
+                written += len(block)
+        finally:
+            # stdout belongs to the caller: flush it, only close our own file
+            if path == '-':
+                output.flush()
+            else:
+                output.close()
+
+        if path != '-':
+            self.stdout.write(self.style.SUCCESS(f'Wrote {written} bytes to {path}'))
@@ -0,0 +1,54 @@
+import contextlib
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.catalog_import import import_setting, iter_import_batches, read_rows
+
+
+class Command(BaseCommand):
+    help = (
+        'Import products from an NDJSON or CSV file (optionally .gz), reading it incrementally '
+        'and upserting in batches. Use "-" to read from stdin.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='NDJSON/CSV file, or - for stdin')
+        parser.add_argument('--type', choices=['ndjson', 'csv'], help='File format (default: from the extension)')
+        parser.add_argument('--batch-size', type=int, default=import_setting('BATCH_SIZE', 1000))
+        parser.add_argument('--no-upsert', action='store_true', help='Fail rows whose pdt_id already exists')
+        parser.add_argument('--max-errors', type=int, default=100, help='Stop printing errors after this many')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        name = path[:-3] if path.endswith('.gz') else path
+        fmt = options['type'] or ('csv' if name.endswith('.csv') else 'ndjson')
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be positive')
+
+        try:
+            stream = sys.stdin.buffer if path == '-' else open(path, 'rb')
+        except OSError as e:
+            raise CommandError(str(e))
+
+        rows_total = written = failed = printed = 0
+        # stdin belongs to the caller; only close a file we opened
+        with stream if path != '-' else contextlib.nullcontext():
+            rows = read_rows(stream, fmt, compressed=path.endswith('.gz'))
+            for batch in iter_import_batches(rows, options['batch_size'], upsert=not options['no_upsert']):
+                rows_total += batch['rows']
+                written += batch['written']
+                failed += batch['rows'] - batch['written']
+                self.stdout.write(
+                    f"Batch {batch['batch']}: {batch['written']}/{batch['rows']} written "
+                    f"({rows_total} rows read)"
+                )
+                if 'database_error' in batch:
+                    self.stderr.write(f"  batch {batch['batch']} rolled back: {batch['database_error']}")
+                for error in batch['errors']:
+                    if printed < options['max_errors']:
+                        self.stderr.write(f"  line {error['index']}: {error['error']}")
+                    printed += 1
+
+        style = self.style.SUCCESS if not failed else self.style.WARNING
+        self.stdout.write(style(f'Imported {written} of {rows_total} rows ({failed} failed)'))
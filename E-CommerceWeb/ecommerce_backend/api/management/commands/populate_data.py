@@ -1,6 +1,8 @@
 from django.core.management.base import BaseCommand
 from django.db import transaction
-from api.models import Category, Product
+from api.models import Category, CategoryStats, Product
+from api.search_indexing import bulk_index_products
+from api.signals import catalog_changed
 import random
 from decimal import Decimal
 
@@ -147,6 +149,14 @@ class Command(BaseCommand):
         # Bulk create all products
         with transaction.atomic():
             Product.objects.bulk_create(all_products, batch_size=50)
+            # bulk_create skips model signals: refresh stats and caches and bump
+            # the catalog generation on commit, so nothing cached while the
+            # catalog was empty survives. The table was just cleared, so every
+            # row is new (MySQL's bulk_create doesn't set the pks).
+            catalog_changed(
+                product_ids=Product.objects.values_list('pdt_id', flat=True),
+                category_ids=[category.ct_id for category in categories],
+            )
         
         self.stdout.write(
             self.style.SUCCESS(
@@ -155,6 +165,18 @@ class Command(BaseCommand):
         )
         
         # Print summary
-        for category in categories:
-            count = Product.objects.filter(ct=category).count()
-            self.stdout.write(f'{category.ct_name}: {count} products')
+        for stats in CategoryStats.objects.select_related('ct').order_by('ct_id'):
+            self.stdout.write(f'{stats.ct.ct_name}: {stats.product_count} products')
+
+        # bulk_create skips the django_elasticsearch_dsl signals, so index explicitly
+        try:
+            result = bulk_index_products(Product.objects.all())
+        except Exception as e:
+            self.stdout.write(self.style.WARNING(f'Skipped Elasticsearch indexing: {e}'))
+            return
+        for chunk in result['chunks']:
+            self.stdout.write(f"Chunk {chunk['chunk']}: {chunk['indexed']} indexed, {chunk['failed']} failed")
+        self.stdout.write(
+            f"Indexed {result['indexed']} products ({result['failed']} failed) "
+            f"in {result['seconds']}s, {result['docs_per_second']} docs/s"
+        )
@@ -0,0 +1,137 @@
+import re
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
+from django.utils import timezone
+
+from api.documents import CategoryDocument, ProductDocument
+from api.models import Category, Product
+from api.search_indexing import bulk_index, delete_documents, reindex_journal
+
+DOCUMENTS = {
+    'products': ProductDocument,
+    'categories': CategoryDocument,
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Zero-downtime reindex: build a new timestamped index (e.g. products-20250101120000) '
+        'from a streaming DB read, verify it, replay writes made meanwhile, then atomically '
+        'point the alias (products / categories) at it and delete old generations. '
+        'Writes from web workers are only captured when CACHES uses a shared backend.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--indices', nargs='+', choices=sorted(DOCUMENTS), default=['products', 'categories'],
+            help='Aliases to rebuild (default: all)'
+        )
+        parser.add_argument('--chunk-size', type=int, help='Rows per DB read and bulk request')
+        parser.add_argument('--keep', type=int, default=1, help='Previous generations kept for rollback (default: 1)')
+        parser.add_argument(
+            '--settle-seconds', type=float, default=2.0,
+            help='Wait after the swap before the final replay, for writes still in flight'
+        )
+
+    def handle(self, *args, **options):
+        reindex_journal.start()
+        try:
+            for alias in options['indices']:
+                self.reindex(DOCUMENTS[alias], options)
+        finally:
+            reindex_journal.stop()
+
+    def reindex(self, document_class, options):
+        client = document_class._get_connection()
+        alias = document_class._index._name
+        new_index = f"{alias}-{timezone.now():%Y%m%d%H%M%S}"
+
+        # Start from the journal's current position: writes from here on are replayed
+        _, _, sequence = reindex_journal.read()
+
+        body = document_class._index.to_dict()
+        client.indices.create(index=new_index, settings=body.get('settings', {}), mappings=body.get('mappings', {}))
+        self.stdout.write(f'Created {new_index}')
+
+        queryset = document_class().get_queryset()
+        result = bulk_index(
+            document_class, queryset, total=queryset.count(), chunk_size=options['chunk_size'], index=new_index
+        )
+        self.stdout.write(
+            f"Indexed {result['indexed']} documents in {len(result['chunks'])} chunks "
+            f"({result['docs_per_second']} docs/s)"
+        )
+
+        client.indices.refresh(index=new_index)
+        count = client.count(index=new_index)['count']
+        if result['failed'] or count != result['indexed']:
+            client.indices.delete(index=new_index)
+            raise CommandError(
+                f"{new_index}: {result['failed']} failed, {count} in index for {result['indexed']} indexed; "
+                f"index deleted, alias {alias} unchanged. First errors: {result['errors'][:3]}"
+            )
+
+        sequence = self.replay(document_class, new_index, sequence)
+
+        self.swap_alias(client, alias, new_index)
+        self.stdout.write(self.style.SUCCESS(f'Alias {alias} -> {new_index}'))
+
+        # Writes indexed through the alias just before the swap went to the old index
+        time.sleep(options['settle_seconds'])
+        self.replay(document_class, new_index, sequence)
+
+        client.indices.refresh(index=new_index)
+        self.stdout.write(
+            f"{alias}: {client.count(index=new_index)['count']} documents, "
+            f"{document_class().get_queryset().count()} rows in the database"
+        )
+        self.collect_garbage(client, alias, new_index, options['keep'])
+
+    def replay(self, document_class, index, since):
+        """Re-index rows touched after journal position `since`; return the new position."""
+        product_ids, category_ids, sequence = reindex_journal.read(since)
+        if not (product_ids or category_ids):
+            return sequence
+
+        if document_class is ProductDocument:
+            products = Product.objects.filter(Q(pdt_id__in=product_ids) | Q(ct_id__in=category_ids))
+            indexed = bulk_index(document_class, products.select_related('ct'), index=index)['indexed']
+            existing = set(Product.objects.filter(pdt_id__in=product_ids).values_list('pdt_id', flat=True))
+            deleted = delete_documents(document_class, product_ids - existing, index=index)
+            # Products of deleted categories went with the cascade, without their own journal entry
+            removed = category_ids - set(Category.objects.filter(ct_id__in=category_ids).values_list('ct_id', flat=True))
+            if removed:
+                response = document_class._get_connection().delete_by_query(
+                    index=index, query={'terms': {'ct.ct_id': sorted(removed)}}, conflicts='proceed'
+                )
+                deleted += response['deleted']
+        else:
+            categories = Category.objects.filter(ct_id__in=category_ids)
+            indexed = bulk_index(document_class, categories, index=index)['indexed']
+            existing = set(categories.values_list('ct_id', flat=True))
+            deleted = delete_documents(document_class, category_ids - existing, index=index)
+
+        self.stdout.write(f'Replayed live writes into {index}: {indexed} indexed, {deleted} deleted')
+        return sequence
+
+    def swap_alias(self, client, alias, new_index):
+        actions = [{'add': {'index': new_index, 'alias': alias}}]
+        if client.indices.exists_alias(name=alias):
+            for index in client.indices.get_alias(name=alias):
+                actions.append({'remove': {'index': index, 'alias': alias}})
+        elif client.indices.exists(index=alias):
+            # First run: a concrete index still holds the alias name; drop it in the same atomic update
+            actions.append({'remove_index': {'index': alias}})
+        client.indices.update_aliases(actions=actions)
+
+    def collect_garbage(self, client, alias, new_index, keep):
+        generation = re.compile(rf'^{re.escape(alias)}-\d{{14}}$')
+        previous = sorted(
+            (name for name in client.indices.get(index=f'{alias}-*') if generation.match(name) and name != new_index),
+            reverse=True,
+        )
+        for index in previous[keep:]:
+            client.indices.delete(index=index)
+            self.stdout.write(f'Deleted old generation {index}')
@@ -0,0 +1,18 @@
+"""
+In-process metrics registry.
+
+Components register a zero-argument callable returning a JSON-serializable
+dict; /api/metrics/ returns a snapshot of every registered provider for this
+worker process.
+"""
+
+_providers = {}
+
+
+def register(name, provider):
+    """Register (or replace) the metrics provider published under `name`."""
+    _providers[name] = provider
+
+
+def snapshot():
+    return {name: provider() for name, provider in sorted(_providers.items())}
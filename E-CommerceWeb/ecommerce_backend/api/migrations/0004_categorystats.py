@@ -0,0 +1,55 @@
+# Generated by Django 5.2.7 on 2026-10-18 17:38
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_category_stats(apps, schema_editor):
+    Category = apps.get_model('api', 'Category')
+    CategoryStats = apps.get_model('api', 'CategoryStats')
+    Product = apps.get_model('api', 'Product')
+
+    aggregates = {
+        row['ct_id']: row
+        for row in Product.objects.values('ct_id').annotate(
+            product_count=models.Count('pdt_id'),
+            in_stock_count=models.Count('pdt_id', filter=models.Q(pdt_qty__gt=0)),
+            min_dis_price=models.Min('pdt_dis_price'),
+            max_dis_price=models.Max('pdt_dis_price'),
+        )
+    }
+    CategoryStats.objects.bulk_create([
+        CategoryStats(
+            ct_id=ct_id,
+            product_count=aggregates.get(ct_id, {}).get('product_count', 0),
+            in_stock_count=aggregates.get(ct_id, {}).get('in_stock_count', 0),
+            min_dis_price=aggregates.get(ct_id, {}).get('min_dis_price'),
+            max_dis_price=aggregates.get(ct_id, {}).get('max_dis_price'),
+        )
+        for ct_id in Category.objects.values_list('ct_id', flat=True)
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_remove_category_id_remove_product_id'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CategoryStats',
+            fields=[
+                ('ct', models.OneToOneField(db_column='ct_id', on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='api.category')),
+                ('product_count', models.IntegerField(default=0)),
+                ('in_stock_count', models.IntegerField(default=0)),
+                ('min_dis_price', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('max_dis_price', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'category_stats',
+            },
+        ),
+        migrations.RunPython(backfill_category_stats, migrations.RunPython.noop),
+    ]
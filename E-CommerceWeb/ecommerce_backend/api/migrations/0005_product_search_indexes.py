@@ -0,0 +1,46 @@
+# Generated by Django 5.2.7 on 2026-10-18 18:10
+
+from django.db import migrations, models
+
+
+def add_fulltext_index(apps, schema_editor):
+    # FULLTEXT is MySQL-specific; other backends keep the icontains fallback
+    if schema_editor.connection.vendor != 'mysql':
+        return
+    schema_editor.execute(
+        'ALTER TABLE %s ADD FULLTEXT INDEX %s (%s)' % (
+            schema_editor.quote_name('products'),
+            schema_editor.quote_name('products_pdt_name_ft'),
+            schema_editor.quote_name('pdt_name'),
+        )
+    )
+
+
+def drop_fulltext_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'mysql':
+        return
+    schema_editor.execute(
+        'ALTER TABLE %s DROP INDEX %s' % (
+            schema_editor.quote_name('products'),
+            schema_editor.quote_name('products_pdt_name_ft'),
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_categorystats'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['pdt_dis_price'], name='products_dis_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['ct', 'pdt_id'], name='products_ct_pdt_idx'),
+        ),
+        migrations.RunPython(add_fulltext_index, drop_fulltext_index),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.2.7 on 2026-10-18 18:40
+
+from django.db import migrations, models
+from django.db.models import Count, Value
+from django.db.models.functions import Lower, NullIf
+
+# Case-insensitive unique email for auth_user; blank emails (NULL after NULLIF) may repeat.
+# Used by api.backends.EmailBackend and RegisterSerializer.validate_email.
+EMAIL_CONSTRAINT = models.UniqueConstraint(
+    NullIf(Lower('email'), Value('')), name='auth_user_email_ci_uniq',
+)
+
+
+def add_email_constraint(apps, schema_editor):
+    if not schema_editor.connection.features.supports_expression_indexes:
+        # Django would skip the functional constraint without a word (check api.E001)
+        raise RuntimeError(
+            "Cannot add a unique email index: this %s server does not support expression indexes "
+            "(MariaDB and MySQL before 8.0.13 do not)." % schema_editor.connection.vendor
+        )
+    User = apps.get_model('auth', 'User')
+    duplicates = list(
+        User.objects.using(schema_editor.connection.alias)
+        .annotate(email_key=NullIf(Lower('email'), Value('')))
+        .exclude(email_key=None)
+        .values('email_key').annotate(accounts=Count('pk')).filter(accounts__gt=1)
+        .values_list('email_key', flat=True)[:20]
+    )
+    if duplicates:
+        raise RuntimeError(
+            "Cannot add a unique email index: these emails belong to more than one account "
+            "(ignoring case): %s. Merge or change them and migrate again." % ', '.join(duplicates)
+        )
+    schema_editor.add_constraint(User, EMAIL_CONSTRAINT)
+
+
+def remove_email_constraint(apps, schema_editor):
+    schema_editor.remove_constraint(apps.get_model('auth', 'User'), EMAIL_CONSTRAINT)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_product_search_indexes'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.RunPython(add_email_constraint, remove_email_constraint),
+    ]
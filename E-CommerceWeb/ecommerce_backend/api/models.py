@@ -1,4 +1,6 @@
-from django.db import models
+from django.db import connection, models
+from django.db.models.functions import Coalesce, Greatest, Least
+from django.utils import timezone
 
 # Create your models here.
 
@@ -25,6 +27,130 @@ class Product(models.Model):
 
     class Meta:
         db_table = 'products'
+        # pdt_name also has a FULLTEXT index on MySQL (migration 0005, api/fulltext.py)
+        indexes = [
+            models.Index(fields=['pdt_dis_price'], name='products_dis_price_idx'),
+            models.Index(fields=['ct', 'pdt_id'], name='products_ct_pdt_idx'),
+        ]
 
     def __str__(self):
         return self.pdt_name
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.remember_stored_stats()
+        return instance
+
+    def refresh_from_db(self, *args, **kwargs):
+        super().refresh_from_db(*args, **kwargs)
+        self.remember_stored_stats()
+
+    def remember_stored_stats(self):
+        """
+        Keep the stored values CategoryStats aggregates (category, quantity,
+        discounted price) so a later save or delete can adjust the stats by
+        the difference instead of reading the row again (api/signals.py).
+        Forgotten when one of them was not loaded.
+        """
+        loaded = self.__dict__
+        if 'ct_id' in loaded and 'pdt_qty' in loaded and 'pdt_dis_price' in loaded:
+            self._stored_stats = (loaded['ct_id'], loaded['pdt_qty'], loaded['pdt_dis_price'])
+        else:
+            self._stored_stats = None
+
+
+class CategoryStats(models.Model):
+    """
+    Materialized per-category aggregates so category pages never aggregate
+    over `products` at request time. Single product writes adjust them in
+    place via `apply_change()` (api/signals.py); the bulk paths recompute
+    them via `refresh()`.
+    """
+    ct = models.OneToOneField(Category, on_delete=models.CASCADE, primary_key=True, related_name='stats', db_column='ct_id')
+    product_count = models.IntegerField(default=0)
+    in_stock_count = models.IntegerField(default=0)
+    min_dis_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    max_dis_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'category_stats'
+
+    def __str__(self):
+        return f"Stats for {self.ct_id}"
+
+    @classmethod
+    def refresh(cls, ct_ids=None):
+        """
+        Recompute the stats rows for the given categories (all categories when
+        None) with one grouped query and one upsert. Rows missing for
+        categories created by fixtures, raw SQL or bulk_create are created;
+        categories that no longer exist are skipped, so one being deleted is
+        never resurrected.
+        """
+        categories = Category.objects.all()
+        if ct_ids is not None:
+            ct_ids = {ct_id for ct_id in ct_ids if ct_id is not None}
+            if not ct_ids:
+                return
+            categories = categories.filter(ct_id__in=ct_ids)
+        rows = categories.values('ct_id').annotate(
+            product_count=models.Count('products'),
+            in_stock_count=models.Count('products', filter=models.Q(products__pdt_qty__gt=0)),
+            min_dis_price=models.Min('products__pdt_dis_price'),
+            max_dis_price=models.Max('products__pdt_dis_price'),
+        )
+        now = timezone.now()
+        fields = ['product_count', 'in_stock_count', 'min_dis_price', 'max_dis_price', 'updated_at']
+        cls.objects.bulk_create(
+            [cls(**row, updated_at=now) for row in rows],
+            update_conflicts=True,
+            update_fields=fields,
+            # MySQL's ON DUPLICATE KEY UPDATE takes no conflict target
+            unique_fields=['ct'] if connection.features.supports_update_conflicts_with_target else None,
+            batch_size=1000,
+        )
+
+    @classmethod
+    def apply_change(cls, old, new):
+        """
+        Adjust the stats for one product write without aggregating. `old` and
+        `new` are the product's (ct_id, in_stock, dis_price) before and after
+        the write, None when it was created or deleted. Counts move by F()
+        deltas and an added price widens the range, each in a single UPDATE.
+        Returns the ct_ids that need `refresh()` instead: those whose departing
+        price was their min or max (the next one is unknown) and those with no
+        stats row yet.
+        """
+        changes = {}
+        for state, sign in ((old, -1), (new, 1)):
+            if state is None:
+                continue
+            ct_id, in_stock, price = state
+            change = changes.setdefault(ct_id, {'count': 0, 'in_stock': 0, 'removed': None, 'added': None})
+            change['count'] += sign
+            change['in_stock'] += sign if in_stock else 0
+            change['removed' if sign < 0 else 'added'] = price
+
+        stale = set()
+        for ct_id, change in changes.items():
+            rows = cls.objects.filter(ct_id=ct_id)
+            updates = {}
+            if change['count']:
+                updates['product_count'] = models.F('product_count') + change['count']
+            if change['in_stock']:
+                updates['in_stock_count'] = models.F('in_stock_count') + change['in_stock']
+            removed, added = change['removed'], change['added']
+            if removed != added:
+                if removed is not None:
+                    rows = rows.exclude(min_dis_price=removed).exclude(max_dis_price=removed)
+                if added is not None:
+                    price = models.Value(added, output_field=cls._meta.get_field('min_dis_price'))
+                    updates['min_dis_price'] = Coalesce(Least('min_dis_price', price), price)
+                    updates['max_dis_price'] = Coalesce(Greatest('max_dis_price', price), price)
+            if not updates:
+                continue
+            if not rows.update(**updates, updated_at=timezone.now()):
+                stale.add(ct_id)
+        return stale
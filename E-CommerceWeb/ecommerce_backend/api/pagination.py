@@ -0,0 +1,60 @@
+"""
+Pagination classes for the catalog list endpoints.
+
+The global ``PageNumberPagination`` runs a ``COUNT(*)`` plus an ``OFFSET`` scan
+for every page, so deep pages get slower as the catalog grows. The cursor
+classes below page on the primary key instead (keyset pagination): every page
+is a ``WHERE pk > <last seen> ORDER BY pk LIMIT n`` lookup and no count query
+is ever issued.
+
+Cursor mode is opt-in per request so existing clients keep working:
+
+    /api/products/?pagination=cursor
+    /api/products/?cursor=<opaque cursor from a previous "next"/"previous">
+"""
+
+from rest_framework.pagination import CursorPagination
+
+
+def wants_cursor_pagination(request):
+    """Return True when the client asked for cursor (keyset) pagination."""
+    params = request.query_params
+    return params.get('pagination') == 'cursor' or CursorPagination.cursor_query_param in params
+
+
+class ProductCursorPagination(CursorPagination):
+    """
+    Keyset pagination on ``pdt_id``.
+
+    When the list is filtered by ``ct_id`` the query becomes
+    ``WHERE ct_id = ? AND pdt_id > ? ORDER BY pdt_id``, i.e. a keyset walk over
+    ``(ct_id, pdt_id)``, so the same cursor format serves both cases.
+    """
+    ordering = ('pdt_id',)
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+
+
+class CategoryCursorPagination(CursorPagination):
+    """Keyset pagination on ``ct_id``."""
+    ordering = ('ct_id',)
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+
+
+class CursorPaginationOptInMixin:
+    """
+    Swap the view's default paginator for ``cursor_pagination_class`` when the
+    request opts into cursor mode (see ``wants_cursor_pagination``).
+    """
+    cursor_pagination_class = None
+
+    @property
+    def paginator(self):
+        if (
+            not hasattr(self, '_paginator')
+            and self.cursor_pagination_class is not None
+            and wants_cursor_pagination(self.request)
+        ):
+            self._paginator = self.cursor_pagination_class()
+        return super().paginator
@@ -0,0 +1,185 @@
+"""
+Password hashing off the request workers.
+
+bcrypt costs tens to hundreds of milliseconds of CPU per call. The async
+auth views (api/async_views.py) hand hashing and verification to a bounded
+process pool instead of running them on the web process, so a login burst
+occupies at most PASSWORD_POOL['WORKERS'] cores (default: half of them) and
+the event loop stays free for catalog requests.
+
+Admission is bounded too: once MAX_PENDING calls are queued or running in
+this process (including ones whose caller gave up after TIMEOUT), further
+calls raise `PoolSaturated` immediately and the views answer 503 with
+Retry-After rather than queueing without limit. Queue depth, rejections and
+latency (queue wait + hashing) are published as the 'password_pool' metrics.
+
+Workers are spawned (not forked, since the web process runs threads) and
+run django.setup() so the configured PASSWORD_HASHERS and peppers apply.
+"""
+
+import asyncio
+import atexit
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+
+def pool_setting(name, default):
+    return getattr(settings, 'PASSWORD_POOL', {}).get(name, default)
+
+
+class PoolSaturated(Exception):
+    """Too many password operations pending in this process; retry later."""
+
+
+# --- Run inside the pool workers -------------------------------------------
+
+def _init_worker():
+    import django
+    django.setup()
+
+
+def _make_password(password):
+    from django.contrib.auth.hashers import make_password
+    return make_password(password)
+
+
+def _check_password(password, encoded):
+    """
+    (valid, new_encoded): new_encoded is a fresh hash when the password is
+    valid but `encoded` uses outdated hasher settings (what check_password's
+    setter would store), else None.
+    """
+    from django.contrib.auth.hashers import check_password, make_password
+    upgraded = []
+    valid = check_password(password, encoded, setter=lambda raw: upgraded.append(make_password(raw)))
+    return valid, (upgraded[0] if valid and upgraded else None)
+
+
+# --- Web process side ---------------------------------------------------------
+
+class PasswordPool:
+
+    def __init__(self):
+        self._executor = None
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=1024)  # seconds, most recent calls
+        self.pending = 0
+        self.submitted = 0
+        self.completed = 0
+        self.rejected = 0
+        self.errors = 0
+
+    @property
+    def workers(self):
+        return pool_setting('WORKERS', None) or max(1, (os.cpu_count() or 2) // 2)
+
+    @property
+    def max_pending(self):
+        return pool_setting('MAX_PENDING', None) or self.workers * 8
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context('spawn'),
+                    initializer=_init_worker,
+                )
+            return self._executor
+
+    def _reset(self, executor):
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    async def _run(self, fn, *args):
+        with self._lock:
+            if self.pending >= self.max_pending:
+                self.rejected += 1
+                raise PoolSaturated()
+            self.pending += 1
+            self.submitted += 1
+        executor = self._get_executor()
+        started = time.monotonic()
+        try:
+            future = executor.submit(fn, *args)
+        except BrokenProcessPool:
+            self._finished(started)
+            raise self._broken(executor)
+        # A call that times out keeps its worker busy until it ends, so it
+        # stays pending (and counts against MAX_PENDING) until then
+        future.add_done_callback(lambda _: self._finished(started))
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), timeout=pool_setting('TIMEOUT', 10.0))
+        except BrokenProcessPool:
+            raise self._broken(executor)
+        except asyncio.TimeoutError:
+            self.errors += 1
+            raise PoolSaturated()
+
+    def _finished(self, started):
+        with self._lock:
+            self.pending -= 1
+            self.completed += 1
+            self._latencies.append(time.monotonic() - started)
+
+    def _broken(self, executor):
+        # A worker died (e.g. OOM); start a fresh pool for later calls
+        logger.error("Password pool broke; restarting it")
+        self._reset(executor)
+        self.errors += 1
+        return PoolSaturated()
+
+    async def make_password(self, password):
+        return await self._run(_make_password, password)
+
+    async def check_password(self, password, encoded):
+        """(valid, new_encoded) - see _check_password."""
+        return await self._run(_check_password, password, encoded)
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def warm_up(self):
+        """Start the worker processes now instead of on the first login."""
+        executor = self._get_executor()
+        for future in [executor.submit(_make_password, None) for _ in range(self.workers)]:
+            future.result()
+
+    def stats(self):
+        with self._lock:
+            latencies = sorted(self._latencies)
+        def percentile(p):
+            return round(latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000, 2) if latencies else None
+        return {
+            'workers': self.workers,
+            'pending': self.pending,
+            'max_pending': self.max_pending,
+            'submitted': self.submitted,
+            'completed': self.completed,
+            'rejected': self.rejected,
+            'errors': self.errors,
+            'latency_ms_p50': percentile(0.5),
+            'latency_ms_p99': percentile(0.99),
+        }
+
+
+password_pool = PasswordPool()
+atexit.register(password_pool.shutdown)
+metrics.register('password_pool', password_pool.stats)
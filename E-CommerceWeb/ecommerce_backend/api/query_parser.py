@@ -0,0 +1,157 @@
+"""
+Query understanding for the search endpoints.
+
+Turns a raw search box string such as "black laptop under 2000" into a
+structured intent:
+
+    ParsedQuery(text='laptop', terms=('laptop',), price_filter=('lte', 2000.0),
+                color='black', category_hint='Electronics', ...)
+
+The query is tokenized once; price words, amounts and colors are recognised
+per token against precompiled patterns and sets (so "wireless" no longer
+reads as "less", nor "shredder" as "red"). Parsed results are memoized in an
+LRU keyed by the normalized query string.
+"""
+
+import re
+from functools import lru_cache
+from typing import NamedTuple, Optional, Tuple
+
+from django.conf import settings
+
+from . import metrics
+
+# "under 2000", "upto 1500", "up to 999"
+UPPER_BOUND_WORDS = frozenset({'under', 'below', 'less', 'upto'})
+# "over 500", "above 500", "more than 500"
+LOWER_BOUND_WORDS = frozenset({'over', 'above', 'greater'})
+# Filler words dropped from the text query
+FILTER_WORDS = UPPER_BOUND_WORDS | LOWER_BOUND_WORDS | frozenset({'than', 'more', 'in', 'with'})
+
+COLORS = (
+    "black", "white", "red", "blue", "green", "yellow",
+    "pink", "grey", "gray", "brown", "purple", "orange",
+)
+_COLOR_SET = frozenset(COLORS)
+
+# Keyword -> category name, used as a hint for ranking/routing
+CATEGORY_HINTS = {
+    **dict.fromkeys((
+        'electronics', 'mobile', 'mobiles', 'phone', 'phones', 'smartphone', 'cellphone',
+        'laptop', 'laptops', 'notebook', 'ultrabook', 'computer', 'tv', 'television',
+        'headphone', 'headphones', 'earphone', 'earphones', 'earbuds', 'headset',
+        'tablet', 'ipad', 'camera', 'dslr', 'smartwatch',
+    ), 'Electronics'),
+    **dict.fromkeys((
+        'fashion', 'clothing', 'clothes', 'apparel', 'shirt', 'tshirt', 't-shirt',
+        'jeans', 'pants', 'trousers', 'dress', 'jacket', 'hoodie', 'shoe', 'shoes',
+        'sneaker', 'sneakers', 'boots', 'handbag', 'wallet', 'belt',
+    ), 'Fashion'),
+    **dict.fromkeys((
+        'kitchen', 'furniture', 'appliance', 'appliances', 'cookware', 'blender',
+        'toaster', 'microwave', 'refrigerator',
+    ), 'Home & Kitchen'),
+    **dict.fromkeys(('book', 'books', 'novel', 'biography', 'cookbook'), 'Books'),
+    **dict.fromkeys(('fitness', 'sports', 'yoga', 'dumbbell', 'treadmill'), 'Sports & Fitness'),
+    **dict.fromkeys(('beauty', 'shampoo', 'perfume', 'lipstick', 'skincare'), 'Beauty & Personal Care'),
+    **dict.fromkeys(('toy', 'toys', 'lego', 'puzzle', 'doll'), 'Toys & Games'),
+}
+
+# Standalone amount, optionally with a currency sign and thousands separators
+_AMOUNT_RE = re.compile(r'(?:₹|\$|rs\.?)?(\d{3,7})(?:/-)?')
+_PUNCTUATION = '.,!?;:"()'
+
+
+class ParsedQuery(NamedTuple):
+    raw: str
+    text: str                                  # cleaned text for full-text matching
+    terms: Tuple[str, ...]
+    price_filter: Optional[Tuple[str, float]]  # ("lte" | "gte", amount)
+    color: Optional[str]
+    category_hint: Optional[str]
+
+    @property
+    def min_price(self):
+        if self.price_filter and self.price_filter[0] == 'gte':
+            return self.price_filter[1]
+        return None
+
+    @property
+    def max_price(self):
+        if self.price_filter and self.price_filter[0] == 'lte':
+            return self.price_filter[1]
+        return None
+
+
+def normalize_query(q):
+    """Lowercase and collapse whitespace; the memo key for `parse_query`."""
+    return ' '.join(q.lower().split())
+
+
+def parse_query(q):
+    """Parse a raw search string into a ParsedQuery (memoized)."""
+    return _parse_normalized(normalize_query(q))
+
+
+@lru_cache(maxsize=getattr(settings, 'QUERY_PARSER_CACHE_SIZE', 4096))
+def _parse_normalized(q):
+    tokens = q.split()
+    terms = []
+    amount = None
+    direction = None
+    color = None
+    category_hint = None
+
+    i = 0
+    while i < len(tokens):
+        token = tokens[i]
+        word = token.strip(_PUNCTUATION)
+        following = tokens[i + 1].strip(_PUNCTUATION) if i + 1 < len(tokens) else None
+
+        if word == 'up' and following == 'to':
+            direction = direction or 'lte'
+            i += 2
+            continue
+        if word == 'more' and following == 'than':
+            direction = direction or 'gte'
+            i += 2
+            continue
+
+        if word in UPPER_BOUND_WORDS:
+            direction = direction or 'lte'
+        elif word in LOWER_BOUND_WORDS:
+            direction = direction or 'gte'
+        elif word in FILTER_WORDS:
+            pass
+        elif word in _COLOR_SET:
+            color = color or word
+        else:
+            match = _AMOUNT_RE.fullmatch(word.replace(',', ''))
+            if match:
+                if amount is None:
+                    amount = float(match.group(1))
+            else:
+                terms.append(word or token)
+                if category_hint is None:
+                    category_hint = CATEGORY_HINTS.get(word)
+        i += 1
+
+    price_filter = (direction, amount) if amount is not None and direction else None
+    text = ' '.join(terms) or q  # fall back to the original query
+
+    return ParsedQuery(
+        raw=q,
+        text=text,
+        terms=tuple(terms),
+        price_filter=price_filter,
+        color=color,
+        category_hint=category_hint,
+    )
+
+
+def _cache_stats():
+    info = _parse_normalized.cache_info()
+    return {'hits': info.hits, 'misses': info.misses, 'size': info.currsize, 'maxsize': info.maxsize}
+
+
+metrics.register('query_parser', _cache_stats)
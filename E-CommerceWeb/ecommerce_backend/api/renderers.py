@@ -0,0 +1,68 @@
+"""
+orjson-backed JSON renderer.
+
+`ORJSONRenderer` is a drop-in for DRF's JSONRenderer: same media type, same
+compact UTF-8 output and the same representation of everything DRF's encoder
+handles - types orjson does not know natively (Decimal, lazy strings,
+querysets, ...) and datetimes are passed to DRF's own JSONEncoder.default, so
+decimal prices (already strings from DecimalField), ct_date and error payloads
+render byte-for-byte as before.
+
+Requests for indented output (`Accept: application/json; indent=4`, the
+browsable API) and non-default UNICODE_JSON/STRICT_JSON settings use the stock
+renderer, as does anything orjson refuses (e.g. integers beyond 64 bits).
+orjson writes NaN and infinities as null where the stock renderer refuses
+them (STRICT_JSON), so output containing null is checked for non-finite
+numbers and those payloads are handed to the stock renderer, which raises.
+"""
+
+import math
+from decimal import Decimal
+
+import orjson
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+_default = JSONEncoder().default
+_OPTIONS = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+
+
+def _has_non_finite(data):
+    """Whether `data` holds a NaN or infinite float or Decimal."""
+    stack = [data]
+    while stack:
+        value = stack.pop()
+        if isinstance(value, float):
+            if not math.isfinite(value):
+                return True
+        elif isinstance(value, Decimal):
+            if not value.is_finite():
+                return True
+        elif isinstance(value, dict):
+            stack.extend(value.values())
+        elif isinstance(value, (list, tuple)):
+            stack.extend(value)
+    return False
+
+
+class ORJSONRenderer(JSONRenderer):
+    """Renders JSON with orjson, falling back to JSONRenderer where the output would differ."""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if (self.ensure_ascii or not self.compact or not self.strict
+                or self.get_indent(accepted_media_type, renderer_context or {}) is not None):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(data, default=_default, option=_OPTIONS)
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        if b'null' in ret and _has_non_finite(data):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # Same escaping of U+2028/U+2029 as JSONRenderer (keeps output a JavaScript subset)
+        if b'\xe2\x80' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
@@ -0,0 +1,248 @@
+"""
+Bulk indexing into Elasticsearch.
+
+Product.objects.bulk_create() skips the model signals django_elasticsearch_dsl
+relies on, so the bulk paths (bulk_create_products, populate_data) push the
+created rows through here. Rows are streamed from the database, serialized
+with their Document and sent as chunked bulk requests from a small thread
+pool. Loads of LARGE_LOAD_DOCS documents or more run with the index
+refresh_interval set to -1; the previous value is restored and the index
+refreshed once at the end.
+
+`reindex_journal` records catalog writes while the reindex_search command
+rebuilds an index, so they can be replayed into the new index before and
+after the alias swap.
+"""
+
+import logging
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import contextmanager, nullcontext
+
+from django.conf import settings
+from django.db.models import QuerySet
+from elasticsearch.helpers import bulk
+
+from . import metrics
+from .cache import catalog_generation
+from .documents import ProductDocument
+
+logger = logging.getLogger(__name__)
+
+MAX_REPORTED_ERRORS = 20
+
+
+def _indexing_setting(name, default):
+    return getattr(settings, 'SEARCH_BULK_INDEXING', {}).get(name, default)
+
+
+def _chunks(iterable, size):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+@contextmanager
+def refresh_disabled(client, index):
+    """Turn off periodic refreshes of `index` for the duration of a load."""
+    current = client.indices.get_settings(index=index, name='index.refresh_interval')
+    previous = next(iter(current.values()), {}).get('settings', {}).get('index', {}).get('refresh_interval')
+    if previous == '-1':
+        # Another load already holds it off; leave restoring to that load
+        yield
+        return
+    client.indices.put_settings(index=index, settings={'index': {'refresh_interval': '-1'}})
+    try:
+        yield
+    finally:
+        # None resets the setting to the index default
+        client.indices.put_settings(index=index, settings={'index': {'refresh_interval': previous}})
+        client.indices.refresh(index=index)
+
+
+class _Totals:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.loads = 0
+        self.indexed = 0
+        self.failed = 0
+        self.last_docs_per_second = 0.0
+
+    def record(self, result):
+        with self._lock:
+            self.loads += 1
+            self.indexed += result['indexed']
+            self.failed += result['failed']
+            self.last_docs_per_second = result['docs_per_second']
+
+    def stats(self):
+        return {
+            'loads': self.loads,
+            'indexed': self.indexed,
+            'failed': self.failed,
+            'last_docs_per_second': self.last_docs_per_second,
+        }
+
+
+_totals = _Totals()
+
+
+def _index_chunk(client, document, number, objects, index, request_timeout):
+    actions = list(document.get_actions(objects, 'index'))
+    if index != document._index._name:
+        for action in actions:
+            action['_index'] = index
+    try:
+        indexed, errors = bulk(
+            client.options(request_timeout=request_timeout),
+            actions,
+            chunk_size=len(actions),
+            raise_on_error=False,
+            raise_on_exception=False,
+        )
+    except Exception as e:
+        # Connection-level failures fail the whole chunk
+        indexed, errors = 0, [{'chunk': number, 'error': str(e)}] * len(actions)
+    return {'chunk': number, 'indexed': indexed, 'failed': len(errors)}, errors
+
+
+def bulk_index_products(products, **kwargs):
+    """Index `products` (a Product queryset or iterable of Products); see bulk_index()."""
+    if isinstance(products, QuerySet):
+        products = products.select_related('ct')
+    return bulk_index(ProductDocument, products, **kwargs)
+
+
+def bulk_index(document_class, objects, total=None, chunk_size=None, threads=None, index=None):
+    """
+    Index `objects` (a queryset or an iterable of model instances) with
+    chunked, parallel bulk requests through `document_class`.
+
+    Returns per-chunk success/failure counts:
+
+        {"indexed": 1000, "failed": 0, "seconds": 0.42, "docs_per_second": 2380.9,
+         "refresh_disabled": False, "chunks": [{"chunk": 1, "indexed": 500, "failed": 0}, ...],
+         "errors": [...]}
+    """
+    chunk_size = chunk_size or _indexing_setting('CHUNK_SIZE', 500)
+    threads = threads or _indexing_setting('THREADS', 4)
+    request_timeout = _indexing_setting('REQUEST_TIMEOUT', 60)
+
+    if isinstance(objects, QuerySet):
+        if total is None:
+            total = objects.count()
+        objects = objects.order_by('pk').iterator(chunk_size=chunk_size)
+
+    document = document_class()
+    client = document_class._get_connection()
+    index = index or document_class._index._name
+    large_load = total is not None and total >= _indexing_setting('LARGE_LOAD_DOCS', 5000)
+
+    chunks, errors = [], []
+    started = time.perf_counter()
+    with refresh_disabled(client, index) if large_load else nullcontext():
+        with ThreadPoolExecutor(max_workers=threads, thread_name_prefix='bulk-index') as executor:
+            pending = set()
+            for number, chunk in enumerate(_chunks(objects, chunk_size), start=1):
+                pending.add(executor.submit(
+                    _index_chunk, client, document, number, chunk, index, request_timeout
+                ))
+                # Bound the chunks held in memory while the database read runs ahead
+                if len(pending) >= threads * 2:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    _collect(done, chunks, errors)
+            _collect(pending, chunks, errors)
+    seconds = time.perf_counter() - started
+
+    chunks.sort(key=lambda c: c['chunk'])
+    indexed = sum(c['indexed'] for c in chunks)
+    result = {
+        'indexed': indexed,
+        'failed': sum(c['failed'] for c in chunks),
+        'seconds': round(seconds, 3),
+        'docs_per_second': round(indexed / seconds, 1) if seconds else 0.0,
+        'refresh_disabled': large_load,
+        'chunks': chunks,
+        'errors': errors[:MAX_REPORTED_ERRORS],
+    }
+    _totals.record(result)
+    if result['failed']:
+        logger.warning("Bulk indexing into %s: %d of %d documents failed", index, result['failed'], result['failed'] + indexed)
+    return result
+
+
+def _collect(futures, chunks, errors):
+    for future in futures:
+        chunk, chunk_errors = future.result()
+        chunks.append(chunk)
+        errors.extend(chunk_errors[:max(0, MAX_REPORTED_ERRORS - len(errors))])
+
+
+def delete_documents(document_class, ids, index=None):
+    """Delete documents by id; ids that are not indexed are ignored."""
+    actions = [
+        {'_op_type': 'delete', '_index': index or document_class._index._name, '_id': pk}
+        for pk in ids
+    ]
+    if not actions:
+        return 0
+    deleted, _ = bulk(document_class._get_connection(), actions, raise_on_error=False)
+    return deleted
+
+
+class ReindexJournal:
+    """
+    Catalog writes recorded while an index rebuild runs.
+
+    Entries live in the shared cache (the one holding the catalog generation),
+    so writes made by every worker are captured as long as CACHES points at a
+    shared backend. Each entry is numbered from an atomic counter; readers
+    keep the last number they replayed.
+    """
+
+    active_key = 'reindex:journal:active'
+    sequence_key = 'reindex:journal:sequence'
+    entry_key = 'reindex:journal:entry:{}'
+    timeout = 24 * 60 * 60
+
+    @property
+    def shared(self):
+        return catalog_generation.shared
+
+    def start(self):
+        self.shared.set(self.sequence_key, 0, self.timeout)
+        self.shared.set(self.active_key, True, self.timeout)
+
+    def stop(self):
+        sequence = self.shared.get(self.sequence_key, 0)
+        self.shared.delete_many(
+            [self.active_key, self.sequence_key] + [self.entry_key.format(n) for n in range(1, sequence + 1)]
+        )
+
+    def record(self, product_ids=(), category_ids=()):
+        if not self.shared.get(self.active_key):
+            return
+        sequence = self.shared.incr(self.sequence_key)
+        self.shared.set(self.entry_key.format(sequence), (list(product_ids), list(category_ids)), self.timeout)
+
+    def read(self, since=0):
+        """Return (product_ids, category_ids, last_sequence) recorded after `since`."""
+        sequence = self.shared.get(self.sequence_key, 0)
+        product_ids, category_ids = set(), set()
+        keys = [self.entry_key.format(n) for n in range(since + 1, sequence + 1)]
+        for products, categories in self.shared.get_many(keys).values():
+            product_ids.update(products)
+            category_ids.update(categories)
+        return product_ids, category_ids, sequence
+
+
+reindex_journal = ReindexJournal()
+
+metrics.register('bulk_indexing', _totals.stats)
@@ -1,6 +1,7 @@
 from rest_framework import serializers
 from django.contrib.auth.models import User
-from .models import Category, Product
+from .backends import users_by_email
+from .models import Category, CategoryStats, Product
 import re
 
 class RegisterSerializer(serializers.ModelSerializer):
@@ -32,8 +33,8 @@ class RegisterSerializer(serializers.ModelSerializer):
         if email_domain not in valid_domains:
             raise serializers.ValidationError("Please use a valid email domain (gmail.com, yahoo.com, etc.)")
         
-        # Check if email already exists
-        if User.objects.filter(email=value).exists():
+        # Check if email already exists (any case; uses the unique email index)
+        if users_by_email(value).exists():
             raise serializers.ValidationError("An account with this email already exists.")
         
         return value
@@ -81,6 +82,19 @@ class RegisterSerializer(serializers.ModelSerializer):
         # Remove confirm_password from validated_data
         validated_data.pop('confirm_password', None)
         
+        # Already hashed by the caller (api/async_views.py hashes in the password pool)
+        password_hash = validated_data.pop('password_hash', None)
+        if password_hash is not None:
+            user = User(
+                username=User.normalize_username(validated_data['username']),
+                first_name=validated_data['first_name'],
+                last_name=validated_data['last_name'],
+                email=User.objects.normalize_email(validated_data['email']),
+                password=password_hash,
+            )
+            user.save()
+            return user
+        
         user = User.objects.create_user(
             username=validated_data['username'],
             first_name=validated_data['first_name'],
@@ -98,7 +112,15 @@ class ProductSerializer(serializers.ModelSerializer):
 
 
 class CategorySerializer(serializers.ModelSerializer):
-    products_count = serializers.IntegerField(source='products.count', read_only=True)
+    # Annotated by the category views from CategoryStats (no per-row COUNT)
+    products_count = serializers.IntegerField(read_only=True)
     class Meta:
         model = Category
         fields = ['ct_id', 'ct_name', 'ct_description', 'ct_date', 'products_count']
+
+
+class CategoryStatsSerializer(serializers.ModelSerializer):
+    ct_name = serializers.CharField(source='ct.ct_name', read_only=True)
+    class Meta:
+        model = CategoryStats
+        fields = ['ct_id', 'ct_name', 'product_count', 'in_stock_count', 'min_dis_price', 'max_dis_price', 'updated_at']
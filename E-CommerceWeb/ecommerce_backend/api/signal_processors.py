@@ -0,0 +1,376 @@
+"""
+Queued signal processor for django_elasticsearch_dsl.
+
+The stock RealTimeSignalProcessor indexes each saved instance synchronously
+inside the request, one HTTP call per save. QueuedSignalProcessor instead
+records the primary key of every committed save/delete in an in-process
+queue and returns. A background worker waits COALESCE_SECONDS after the first
+change arrives, so a burst of saves to the same row becomes one entry (the
+last action wins). It then re-reads the rows and sends them as bulk requests.
+
+- Bounded: at most MAX_PENDING distinct rows wait. A writer that finds the
+  queue full blocks for up to BLOCK_SECONDS (backpressure), then indexes
+  its own change synchronously, so nothing is dropped. While Elasticsearch
+  is failing a synchronous flush would fail too. In that case a change that
+  finds the queue full is not queued; its id is logged for
+  `manage.py reindex_search`, as with MAX_RETRIES.
+- Failed flushes (Elasticsearch down or timing out, rejected documents) are
+  requeued, and the worker backs off exponentially from RETRY_BACKOFF up to
+  MAX_BACKOFF seconds between attempts. Writers are not blocked while it
+  backs off, because their changes coalesce with the requeued rows. With
+  MAX_RETRIES set, rows still failing after that many attempts are logged
+  with their ids for `manage.py reindex_search`. Otherwise they are kept
+  until they index.
+- The catalog generation is bumped at commit (api/signals.py), before the
+  flush lands. It is bumped again after each successful flush, so search
+  results and ETags computed from the old documents in between are retired.
+- Changes to a related model (Category) are pushed by the document's
+  update_from_related() when it has one, instead of re-indexing every
+  embedding document. These can take minutes on a large index, so they run
+  in order on a separate thread and never hold up the flushes of other
+  changes. Failures are requeued like any other change.
+- The worker threads close stale database connections around every flush
+  (as the request cycle does), so they outlive the server's idle timeout.
+- Drained on shutdown through atexit, for up to DRAIN_TIMEOUT seconds.
+- Lag (time from commit to flush), depth and counters are published under
+  "search_sync_queue" in /api/metrics/.
+
+Enabled with ELASTICSEARCH_DSL_SIGNAL_PROCESSOR in settings.
+"""
+
+import atexit
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from django.conf import settings
+from django.db import close_old_connections, models, transaction
+from django_elasticsearch_dsl.apps import DEDConfig
+from django_elasticsearch_dsl.registries import registry
+from django_elasticsearch_dsl.signals import BaseSignalProcessor
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+INDEX = 'index'
+DELETE = 'delete'
+
+
+def _queue_setting(name, default):
+    return getattr(settings, 'ELASTICSEARCH_SIGNAL_QUEUE', {}).get(name, default)
+
+
+class QueuedSignalProcessor(BaseSignalProcessor):
+
+    def setup(self):
+        self.coalesce_seconds = _queue_setting('COALESCE_SECONDS', 0.5)
+        self.max_pending = _queue_setting('MAX_PENDING', 10000)
+        self.block_seconds = _queue_setting('BLOCK_SECONDS', 1.0)
+        self.batch_size = _queue_setting('BATCH_SIZE', 500)
+        self.drain_timeout = _queue_setting('DRAIN_TIMEOUT', 10.0)
+        self.retry_backoff = _queue_setting('RETRY_BACKOFF', 1.0)
+        self.max_backoff = _queue_setting('MAX_BACKOFF', 60.0)
+        self.max_retries = _queue_setting('MAX_RETRIES', None)
+
+        # (model, pk) -> (action, first enqueued at, failed attempts); insertion ordered
+        self._pending = {}
+        self._condition = threading.Condition()
+        self._worker = None
+        self._stopping = False
+        # Related-model pushes (update-by-query), one at a time in submission order
+        self._related_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='search-sync-related')
+        self._related_futures = set()
+        self._failures_in_row = 0
+        self._backoff_until = 0.0
+
+        self.enqueued = 0
+        self.coalesced = 0
+        self.flushed = 0
+        self.batches = 0
+        self.failed = 0
+        self.retried = 0
+        self.given_up = 0
+        self.blocked = 0
+        self.overflowed = 0
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+
+        models.signals.post_save.connect(self.handle_save)
+        models.signals.post_delete.connect(self.handle_delete)
+        models.signals.m2m_changed.connect(self.handle_m2m_changed)
+        models.signals.pre_delete.connect(self.handle_pre_delete)
+        atexit.register(self.drain)
+        metrics.register('search_sync_queue', self.stats)
+
+    def teardown(self):
+        models.signals.post_save.disconnect(self.handle_save)
+        models.signals.post_delete.disconnect(self.handle_delete)
+        models.signals.m2m_changed.disconnect(self.handle_m2m_changed)
+        models.signals.pre_delete.disconnect(self.handle_pre_delete)
+        atexit.unregister(self.drain)
+        self._related_executor.shutdown(wait=False)
+
+    # --- signal handlers -------------------------------------------------
+
+    def handle_save(self, sender, instance, **kwargs):
+        if self._tracked(instance):
+            model, pk = instance.__class__, instance.pk
+            transaction.on_commit(lambda: self.enqueue(model, pk, INDEX))
+
+    def handle_delete(self, sender, instance, **kwargs):
+        if self._tracked(instance):
+            model, pk = instance.__class__, instance.pk
+            transaction.on_commit(lambda: self.enqueue(model, pk, DELETE))
+
+    def handle_pre_delete(self, sender, instance, **kwargs):
+        # Documents embedding the deleted instance are re-read once the delete commits
+        if not self._tracked(instance):
+            return
+        for document_class in registry._get_related_doc(instance):
+            related = document_class(related_instance_to_ignore=instance).get_instances_from_related(instance)
+            if related is None:
+                continue
+            model = document_class.django.model
+            pks = list(related.values_list('pk', flat=True)) if hasattr(related, 'values_list') else [related.pk]
+            transaction.on_commit(lambda model=model, pks=pks: self._enqueue_many(model, pks, INDEX))
+
+    @staticmethod
+    def _tracked(instance):
+        return DEDConfig.autosync_enabled() and instance.__class__ in registry
+
+    # --- queue ---------------------------------------------------------
+
+    def _enqueue_many(self, model, pks, action):
+        for pk in pks:
+            self.enqueue(model, pk, action)
+
+    def enqueue(self, model, pk, action):
+        key = (model, pk)
+        with self._condition:
+            if key in self._pending:
+                self.coalesced += 1
+                _, enqueued_at, attempts = self._pending[key]
+                self._pending[key] = (action, enqueued_at, attempts)
+                return
+            backing_off = self._backing_off()
+            if len(self._pending) >= self.max_pending and not backing_off:
+                self.blocked += 1
+                self._condition.notify_all()  # flush now rather than after the window
+                self._condition.wait_for(
+                    lambda: len(self._pending) < self.max_pending, timeout=self.block_seconds
+                )
+            if len(self._pending) < self.max_pending:
+                self._pending[key] = (action, time.monotonic(), 0)
+                self.enqueued += 1
+                self._ensure_worker()
+                self._condition.notify_all()
+                return
+            self.overflowed += 1
+
+        if backing_off:
+            # Elasticsearch is failing, so a synchronous flush would fail too; leave it to a reindex
+            self.given_up += 1
+            logger.error(
+                "Search sync queue full while Elasticsearch is failing; not indexed, run reindex_search "
+                "to repair: %s:%s", model.__name__, pk,
+            )
+            return
+        # Still full after waiting: index this change in the caller
+        self._flush({key: (action, time.monotonic(), 0)})
+
+    def _backing_off(self):
+        return self._backoff_until > time.monotonic()
+
+    def _ensure_worker(self):
+        if self._worker is None or not self._worker.is_alive():
+            self._worker = threading.Thread(target=self._run, name='search-sync-queue', daemon=True)
+            self._worker.start()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self._pending or self._stopping)
+                if not self._pending:
+                    return
+                if self._backing_off() and not self._stopping:
+                    self._condition.wait(timeout=self._backoff_until - time.monotonic())
+                    continue
+                # Let a burst coalesce, unless the queue is full or shutting down
+                oldest = next(iter(self._pending.values()))[1]
+                delay = oldest + self.coalesce_seconds - time.monotonic()
+                if delay > 0 and not self._stopping and len(self._pending) < self.max_pending:
+                    self._condition.wait(timeout=delay)
+                batch = dict(list(self._pending.items())[:self.batch_size])
+                for key in batch:
+                    del self._pending[key]
+                self._condition.notify_all()
+            self._flush_in_thread(batch)
+
+    def _flush_in_thread(self, batch):
+        # A long-lived thread has no request cycle to retire expired connections
+        close_old_connections()
+        try:
+            self._flush(batch)
+        finally:
+            close_old_connections()
+
+    def _flush(self, batch):
+        from .cache import catalog_generation
+        from .search_indexing import bulk_index, delete_documents
+
+        by_model = {}
+        for (model, pk), (action, _, _) in batch.items():
+            by_model.setdefault(model, {INDEX: set(), DELETE: set()})[action].add(pk)
+
+        failed = set()  # (model, pk) to retry
+        for model, actions in by_model.items():
+            try:
+                for document_class in registry.get_documents([model]):
+                    if document_class.django.ignore_signals:
+                        continue
+                    if actions[INDEX]:
+                        result = bulk_index(
+                            document_class,
+                            document_class().get_queryset().filter(pk__in=actions[INDEX]),
+                            chunk_size=self.batch_size,
+                            threads=1,
+                        )
+                        if result['failed']:
+                            # Which rows failed is not reported for connection errors; retry them all
+                            self.failed += result['failed']
+                            failed.update((model, pk) for pk in actions[INDEX])
+                    if actions[DELETE]:
+                        delete_documents(document_class, actions[DELETE])
+                if model in registry._related_models and actions[INDEX]:
+                    for instance in model.objects.filter(pk__in=actions[INDEX]):
+                        self._push_related(instance, batch[(model, instance.pk)])
+            except Exception as e:
+                self.failed += len(actions[INDEX]) + len(actions[DELETE])
+                failed.update((model, pk) for pk in actions[INDEX] | actions[DELETE])
+                logger.warning("Search sync queue: flushing %s changes failed: %s", model.__name__, e)
+
+        if failed:
+            self._retry({key: batch[key] for key in failed})
+        else:
+            self._failures_in_row = 0
+        if len(failed) < len(batch):
+            # Retire search results and ETags computed from the documents just replaced
+            catalog_generation.bump()
+
+        now = time.monotonic()
+        lag = max(now - enqueued_at for _, enqueued_at, _ in batch.values())
+        self.flushed += len(batch) - len(failed)
+        self.batches += 1
+        self.last_lag = lag
+        self.max_lag = max(self.max_lag, lag)
+
+    def _retry(self, failed):
+        """Requeue failed changes (a newer queued change for the row wins) and back off."""
+        given_up = []
+        with self._condition:
+            self._failures_in_row += 1
+            backoff = min(self.max_backoff, self.retry_backoff * 2 ** (self._failures_in_row - 1))
+            self._backoff_until = time.monotonic() + backoff
+            for key, (action, enqueued_at, attempts) in failed.items():
+                if key in self._pending:
+                    continue
+                if self._stopping or (self.max_retries is not None and attempts + 1 >= self.max_retries):
+                    given_up.append(key)
+                    continue
+                self._pending[key] = (action, enqueued_at, attempts + 1)
+                self.retried += 1
+            self._condition.notify_all()
+        if given_up:
+            self.given_up += len(given_up)
+            logger.error(
+                "Search sync queue: giving up on %d changes, run reindex_search to repair: %s",
+                len(given_up), ', '.join(f'{model.__name__}:{pk}' for model, pk in given_up[:100]),
+            )
+        logger.warning("Search sync queue: %d changes failed, retrying in %.1fs", len(failed), backoff)
+
+    def _push_related(self, instance, entry):
+        future = self._related_executor.submit(self._update_related_documents, instance, entry)
+        with self._condition:
+            self._related_futures.add(future)
+        future.add_done_callback(self._related_done)
+
+    def _related_done(self, future):
+        with self._condition:
+            self._related_futures.discard(future)
+
+    def _update_related_documents(self, instance, entry):
+        """Runs on the related-update thread; requeues `instance` if any push fails."""
+        from .cache import catalog_generation
+
+        key = (instance.__class__, instance.pk)
+        close_old_connections()
+        try:
+            updated = all([
+                self._update_related(document_class(), instance)
+                for document_class in registry._get_related_doc(instance)
+            ])
+        except Exception as e:
+            logger.warning("Search sync queue: related update of %s %s failed: %s", key[0].__name__, key[1], e)
+            self.failed += 1
+            updated = False
+        finally:
+            close_old_connections()
+        if updated:
+            catalog_generation.bump()
+        else:
+            self._retry({key: entry})
+
+    def _update_related(self, document, instance):
+        """Push `instance`'s change into the documents embedding it; False if it failed."""
+        # Documents can push a related change themselves (ProductDocument
+        # rewrites the embedded category with one update-by-query)
+        if hasattr(document, 'update_from_related'):
+            response = document.update_from_related(instance)
+            if response is not None:
+                failures = len(response.get('failures', ()))
+                self.failed += failures
+                return not failures
+        related = document.get_instances_from_related(instance)
+        if related is not None:
+            document.update(related)
+        return True
+
+    def drain(self, timeout=None):
+        """Flush everything still queued; called at interpreter exit."""
+        worker = self._worker
+        with self._condition:
+            self._stopping = True
+            self._condition.notify_all()
+        deadline = time.monotonic() + (self.drain_timeout if timeout is None else timeout)
+        if worker is not None:
+            worker.join(deadline - time.monotonic())
+        with self._condition:
+            related = set(self._related_futures)
+        if related:
+            wait(related, timeout=max(0.0, deadline - time.monotonic()))
+        if self._pending:
+            logger.warning("Search sync queue: %d changes not flushed at shutdown", len(self._pending))
+
+    def stats(self):
+        with self._condition:
+            pending = list(self._pending.values())
+        return {
+            'depth': len(pending),
+            'related_updates_running': len(self._related_futures),
+            'max_pending': self.max_pending,
+            'oldest_seconds': round(time.monotonic() - pending[0][1], 3) if pending else 0.0,
+            'enqueued': self.enqueued,
+            'coalesced': self.coalesced,
+            'flushed': self.flushed,
+            'batches': self.batches,
+            'failed': self.failed,
+            'retried': self.retried,
+            'given_up': self.given_up,
+            'backoff_seconds': round(max(0.0, self._backoff_until - time.monotonic()), 3),
+            'blocked': self.blocked,
+            'overflowed': self.overflowed,
+            'last_lag_seconds': round(self.last_lag, 3),
+            'max_lag_seconds': round(self.max_lag, 3),
+        }
@@ -0,0 +1,137 @@
+"""
+Model signal handlers for the api app.
+
+Connected from ApiConfig.ready(). Keeps derived catalog data (CategoryStats,
+the object cache) in step with Product/Category writes. Paths that bypass
+model signals (bulk_create) call `catalog_changed()` directly.
+"""
+
+import threading
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from .cache import catalog_generation, category_cache, product_cache
+from .inverted_index import product_index
+from .search_indexing import reindex_journal
+from .models import Category, CategoryStats, Product
+
+# Categories currently being deleted on this thread. Their products are
+# removed by the cascade, so there is no point refreshing stats per product.
+_deleting = threading.local()
+
+
+def _deleting_categories():
+    if not hasattr(_deleting, 'ct_ids'):
+        _deleting.ct_ids = set()
+    return _deleting.ct_ids
+
+
+def catalog_changed(product_ids=(), category_ids=(), stats_change=None):
+    """
+    Propagate a catalog write once the current transaction commits: refresh
+    CategoryStats for the touched categories, drop their cached payloads,
+    bump the catalog generation (retiring every cached search result),
+    update the in-process search fallback index and, while reindex_search
+    runs, record the write for replay into the new index.
+
+    A single product write passes its (old, new) `stats_change` so the stats
+    are adjusted in place (CategoryStats.apply_change) rather than recomputed.
+    """
+    product_ids = set(product_ids) - {None}
+    category_ids = set(category_ids) - {None}
+
+    def propagate():
+        stale = category_ids if stats_change is None else CategoryStats.apply_change(*stats_change)
+        CategoryStats.refresh(stale - _deleting_categories())
+        product_cache.invalidate(product_ids)
+        category_cache.invalidate(category_ids)
+        generation = catalog_generation.bump(product_ids, category_ids)
+        product_index.update(product_ids, category_ids, generation=generation)
+        reindex_journal.record(product_ids, category_ids)
+
+    if product_ids or category_ids:
+        transaction.on_commit(propagate)
+
+
+@receiver(post_save, sender=Category)
+def category_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        # Fixture load: build the stats row once the fixture's products are in too
+        ct_id = instance.ct_id
+        transaction.on_commit(lambda: CategoryStats.refresh({ct_id}))
+        return
+    if created:
+        CategoryStats.objects.get_or_create(ct=instance)
+    catalog_changed(category_ids={instance.ct_id})
+
+
+@receiver(pre_delete, sender=Category)
+def mark_category_deleting(sender, instance, **kwargs):
+    _deleting_categories().add(instance.ct_id)
+
+
+@receiver(post_delete, sender=Category)
+def category_deleted(sender, instance, **kwargs):
+    _deleting_categories().discard(instance.ct_id)
+    catalog_changed(category_ids={instance.ct_id})
+
+
+def _stats_state(stored):
+    """What a product's stored (ct_id, pdt_qty, pdt_dis_price) adds to CategoryStats."""
+    if stored is None or any(hasattr(value, 'resolve_expression') for value in stored):
+        return None
+    ct_id, qty, price = stored
+    try:
+        return ct_id, int(qty) > 0, Product._meta.get_field('pdt_dis_price').to_python(price)
+    except (TypeError, ValueError, ValidationError):
+        return None
+
+
+@receiver(pre_save, sender=Product)
+def remember_stored_stats(sender, instance, raw=False, **kwargs):
+    # Instances read from the database carry their stored values
+    # (Product.from_db); the row is read only to save over one that wasn't.
+    if not raw and not instance._state.adding and getattr(instance, '_stored_stats', None) is None:
+        instance._stored_stats = (
+            Product.objects.filter(pk=instance.pk).values_list('ct_id', 'pdt_qty', 'pdt_dis_price').first()
+        )
+
+
+@receiver(post_save, sender=Product)
+def product_saved(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    if raw:
+        return
+    stored = None if created else getattr(instance, '_stored_stats', None)
+    saved = (instance.ct_id, instance.pdt_qty, instance.pdt_dis_price)
+    if update_fields is not None and stored is not None:
+        # Fields left out of update_fields keep their stored values
+        updated = {'ct_id' if name == 'ct' else name for name in update_fields}
+        saved = tuple(value if name in updated else kept
+                      for name, value, kept in zip(('ct_id', 'pdt_qty', 'pdt_dis_price'), saved, stored))
+    old, new = _stats_state(stored), _stats_state(saved)
+    # A product moved between categories changes the stats of both. When what
+    # the save replaced is unknown, the category is recomputed instead.
+    known = new is not None and (created or old is not None)
+    catalog_changed(
+        product_ids={instance.pk},
+        category_ids={saved[0], stored[0] if stored else None},
+        stats_change=(old, new) if known else None,
+    )
+    instance._stored_stats = saved if new is not None else None
+
+
+@receiver(post_delete, sender=Product)
+def product_deleted(sender, instance, **kwargs):
+    if instance.ct_id in _deleting_categories():
+        # Cascade from a category delete; category_deleted covers it.
+        product_cache.invalidate({instance.pk})
+        return
+    old = _stats_state(getattr(instance, '_stored_stats', None))
+    catalog_changed(
+        product_ids={instance.pk},
+        category_ids={instance.ct_id},
+        stats_change=(old, None) if old is not None else None,
+    )
@@ -1,3 +1,1199 @@
-from django.test import TestCase
+import asyncio
+import importlib
+import io
+import json
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, time as dt_time, timezone as dt_timezone
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+import bcrypt
+from django.apps import apps
+from django.contrib.auth import authenticate
+from django.contrib.auth.hashers import BCryptSHA256PasswordHasher, make_password
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.handlers.wsgi import WSGIRequest
+from django.core.management import call_command
+from django.db import IntegrityError, connection
+from django.db.models import Value
+from django.db.models.functions import Coalesce
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils.http import http_date
+from django.utils.translation import gettext_lazy
+from elasticsearch import ConnectionError as EsConnectionError
+from elasticsearch_dsl import Search as EsSearch
+from rest_framework.exceptions import ErrorDetail, ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from . import views
+from .backends import _dummy_encoded, hasher_params
+from .cache import CatalogGeneration, ObjectCache, catalog_generation, search_cache
+from .catalog_export import export_products
+from .checks import check_expression_indexes, check_shared_caches
+from .catalog_import import iter_import_batches, read_rows, validate_rows
+from .circuit_breaker import CircuitBreaker
+from .documents import ProductDocument
+from .fast_serializers import category_fast_serializer, product_fast_serializer
+from .hashers import PepperedBCryptSHA256PasswordHasher
+from .inverted_index import ProductIndex
+from .models import Category, CategoryStats, Product
+from .parsers import ORJSONParser
+from .password_pool import PasswordPool, PoolSaturated
+from .query_parser import parse_query
+from .renderers import ORJSONRenderer
+from .serializers import CategorySerializer, ProductSerializer, RegisterSerializer
+from .signal_processors import QueuedSignalProcessor
+from .signals import catalog_changed
+from .throttling import LoginThrottle, login_throttle
+
+
+# Model signals must not reach Elasticsearch or start the search sync worker
+# threads; the processor is exercised directly in SearchSyncQueueTests
+_no_autosync = override_settings(ELASTICSEARCH_DSL_AUTOSYNC=False)
+
+
+def setUpModule():
+    _no_autosync.enable()
+
+
+def tearDownModule():
+    _no_autosync.disable()
+
+
+class CursorPaginationTests(TestCase):
+    """?pagination=cursor walks the list by primary key (api/pagination.py)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.shoes = Category.objects.create(ct_name='Shoes')
+        cls.hats = Category.objects.create(ct_name='Hats')
+        for i in range(7):
+            Product.objects.create(pdt_name=f'Item {i}', pdt_mrp=Decimal('10'), pdt_qty=1,
+                                   ct=cls.shoes if i % 3 else cls.hats)
+
+    def walk(self, url):
+        ids, pages = [], 0
+        while url:
+            data = self.client.get(url).json()
+            self.assertNotIn('count', data)
+            ids += [row['pdt_id'] for row in data['results']]
+            url, pages = data['next'], pages + 1
+        return ids, pages
+
+    def test_forward_walk_covers_every_row_once(self):
+        ids, pages = self.walk('/api/products/?pagination=cursor&page_size=3')
+        self.assertEqual(ids, list(Product.objects.order_by('pdt_id').values_list('pdt_id', flat=True)))
+        self.assertEqual(pages, 3)
+
+    def test_filtered_walk_and_previous_page(self):
+        ids, _ = self.walk(f'/api/products/?pagination=cursor&page_size=2&ct_id={self.shoes.ct_id}')
+        self.assertEqual(ids, list(self.shoes.products.order_by('pdt_id').values_list('pdt_id', flat=True)))
+
+        first = self.client.get('/api/products/?pagination=cursor&page_size=3').json()
+        second = self.client.get(first['next']).json()
+        back = self.client.get(second['previous']).json()
+        self.assertEqual(back['results'], first['results'])
+
+    def test_default_pagination_is_unchanged(self):
+        data = self.client.get('/api/categories/').json()
+        self.assertEqual(data['count'], 2)
+
+
+class CategoryStatsTests(TestCase):
+    """CategoryStats follows product writes and is rebuilt by refresh() (api/models.py)."""
+
+    def setUp(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.category = Category.objects.create(ct_name='Shoes')
+
+    def stats(self):
+        return CategoryStats.objects.get(ct=self.category)
+
+    def test_counts_and_prices_follow_product_writes(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            cheap = Product.objects.create(pdt_name='Sandal', pdt_mrp=Decimal('20'), pdt_dis_price=Decimal('15'),
+                                           pdt_qty=0, ct=self.category)
+            Product.objects.create(pdt_name='Boot', pdt_mrp=Decimal('90'), pdt_dis_price=Decimal('80'),
+                                   pdt_qty=4, ct=self.category)
+        stats = self.stats()
+        self.assertEqual((stats.product_count, stats.in_stock_count), (2, 1))
+        self.assertEqual((stats.min_dis_price, stats.max_dis_price), (Decimal('15'), Decimal('80')))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            cheap.pdt_dis_price = Decimal('95')
+            cheap.pdt_qty = 3
+            cheap.save()
+        stats = self.stats()
+        self.assertEqual(stats.in_stock_count, 2)
+        self.assertEqual((stats.min_dis_price, stats.max_dis_price), (Decimal('80'), Decimal('95')))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            cheap.delete()
+        stats = self.stats()
+        self.assertEqual((stats.product_count, stats.min_dis_price, stats.max_dis_price),
+                         (1, Decimal('80'), Decimal('80')))
+
+    def test_single_writes_adjust_the_stats_without_aggregating(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            boot = Product.objects.create(pdt_name='Boot', pdt_mrp=Decimal('90'), pdt_dis_price=Decimal('80'),
+                                          pdt_qty=4, ct=self.category)
+            Product.objects.create(pdt_name='Clog', pdt_mrp=Decimal('30'), pdt_dis_price=Decimal('25'),
+                                   pdt_qty=1, ct=self.category)
+            Product.objects.create(pdt_name='Wader', pdt_mrp=Decimal('120'), pdt_dis_price=Decimal('100'),
+                                   pdt_qty=2, ct=self.category)
+        boot = Product.objects.get(pk=boot.pk)
+        with mock.patch.object(CategoryStats, 'refresh', wraps=CategoryStats.refresh) as refresh, \
+                CaptureQueriesContext(connection) as queries:
+            with self.captureOnCommitCallbacks(execute=True):
+                boot.pdt_qty = 0
+                boot.pdt_dis_price = Decimal('20')
+                boot.save()
+            with self.captureOnCommitCallbacks(execute=True):
+                boot.pdt_name = 'Ankle boot'
+                boot.save(update_fields=['pdt_name'])
+        sql = [query['sql'] for query in queries.captured_queries]
+        # No pre_save read of the row and no COUNT/MIN/MAX over the category
+        self.assertFalse([q for q in sql if q.startswith('SELECT')], sql)
+        self.assertEqual(refresh.call_args_list, [mock.call(set()), mock.call(set())])
+        stats = self.stats()
+        self.assertEqual((stats.product_count, stats.in_stock_count), (3, 2))
+        self.assertEqual((stats.min_dis_price, stats.max_dis_price), (Decimal('20'), Decimal('100')))
+
+    def test_departing_boundary_price_recomputes_the_category(self):
+        other = Category.objects.create(ct_name='Boots')
+        with self.captureOnCommitCallbacks(execute=True):
+            cheap = Product.objects.create(pdt_name='Sandal', pdt_mrp=Decimal('20'), pdt_dis_price=Decimal('15'),
+                                           pdt_qty=0, ct=self.category)
+            Product.objects.create(pdt_name='Boot', pdt_mrp=Decimal('90'), pdt_dis_price=Decimal('80'),
+                                   pdt_qty=4, ct=self.category)
+            Product.objects.create(pdt_name='Clog', pdt_mrp=Decimal('30'), pdt_dis_price=Decimal('25'),
+                                   pdt_qty=1, ct=self.category)
+        with mock.patch.object(CategoryStats, 'refresh', wraps=CategoryStats.refresh) as refresh:
+            with self.captureOnCommitCallbacks(execute=True):
+                cheap.ct = other
+                cheap.save()
+        refresh.assert_called_once_with({self.category.ct_id})
+        stats = self.stats()
+        self.assertEqual((stats.product_count, stats.in_stock_count), (2, 2))
+        self.assertEqual((stats.min_dis_price, stats.max_dis_price), (Decimal('25'), Decimal('80')))
+        moved = CategoryStats.objects.get(ct=other)
+        self.assertEqual((moved.product_count, moved.in_stock_count, moved.min_dis_price, moved.max_dis_price),
+                         (1, 0, Decimal('15'), Decimal('15')))
+
+    def test_refresh_creates_missing_rows_in_one_upsert(self):
+        bulk = Category.objects.bulk_create([Category(ct_name=f'Bulk {i}') for i in range(3)])
+        Product.objects.bulk_create([
+            Product(pdt_name='P', pdt_mrp=Decimal('5'), pdt_dis_price=Decimal('4'), pdt_qty=1, ct_id=bulk[0].ct_id)
+        ])
+        self.assertFalse(CategoryStats.objects.filter(ct__in=bulk).exists())
+        with self.assertNumQueries(2):
+            CategoryStats.refresh()
+        counts = dict(CategoryStats.objects.filter(ct__in=bulk).values_list('ct_id', 'product_count'))
+        self.assertEqual(counts, {bulk[0].ct_id: 1, bulk[1].ct_id: 0, bulk[2].ct_id: 0})
+        self.assertEqual(self.client.get(f'/api/categories/{bulk[0].ct_id}/').json()['products_count'], 1)
+
+
+class ObjectCacheTests(TestCase):
+    """Read-through payload cache (api/cache.py)."""
+
+    def setUp(self):
+        cache.clear()
+        self.objects = ObjectCache('test')
+
+    def test_load_racing_an_invalidation_is_not_served(self):
+        def stale_loader():
+            # The row was read, then a write committed and invalidated it
+            self.objects.invalidate([1])
+            return 'stale'
+
+        self.assertEqual(self.objects.get_or_load(1, stale_loader), 'stale')
+        self.assertEqual(self.objects.get_or_load(1, lambda: 'fresh'), 'fresh')
+        self.assertEqual(self.objects.get_or_load(1, lambda: 'unused'), 'fresh')
+
+    def test_invalidation_reaches_other_workers_shared_tier(self):
+        self.objects.get_or_load(1, lambda: 'old')
+        other_worker = ObjectCache('test')
+        self.assertEqual(other_worker.get_or_load(1, lambda: 'unused'), 'old')
+        self.objects.invalidate([1])
+        other_worker.local.clear()
+        self.assertEqual(other_worker.get_or_load(1, lambda: 'new'), 'new')
+        self.assertEqual(other_worker.stats()['shared_hits'], 1)
+        self.assertEqual(other_worker.stats()['misses'], 1)
+
+
+class SearchResultCacheTests(TestCase):
+    """search_products results are cached per parsed query and catalog generation."""
+
+    def setUp(self):
+        cache.clear()
+        search_cache.local.clear()
+        patcher = mock.patch('api.views._elasticsearch_product_search', return_value=[{'pdt_id': 1}])
+        self.es_search = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_equivalent_queries_share_an_entry(self):
+        first = self.client.get('/api/search/', {'q': 'Laptop under 2000'})
+        second = self.client.get('/api/search/', {'q': '  laptop   UNDER 2000 '})
+        self.assertNotIn('X-Cache', first)
+        self.assertEqual(second['X-Cache'], 'HIT')
+        self.assertEqual(second.json()['products'], first.json()['products'])
+        self.es_search.assert_called_once_with('laptop', ('lte', 2000.0), None, 0, 100)
+
+    def test_catalog_write_retires_cached_results(self):
+        self.client.get('/api/search/', {'q': 'laptop'})
+        with self.captureOnCommitCallbacks(execute=True):
+            catalog_changed(product_ids=[1])
+        self.assertNotIn('X-Cache', self.client.get('/api/search/', {'q': 'laptop'}))
+        self.assertEqual(self.es_search.call_count, 2)
+
+
+class QueryParserTests(TestCase):
+    """Query understanding for the search endpoints (api/query_parser.py)."""
+
+    def test_price_and_colour_tokens(self):
+        parsed = parse_query('Black laptop under ₹2,000')
+        self.assertEqual((parsed.text, parsed.color, parsed.price_filter), ('laptop', 'black', ('lte', 2000.0)))
+        self.assertEqual(parsed.category_hint, 'Electronics')
+
+        parsed = parse_query('shoes more than 500 red')
+        self.assertEqual((parsed.text, parsed.color, parsed.min_price), ('shoes', 'red', 500.0))
+        self.assertEqual(parse_query('phone up to 1500').max_price, 1500.0)
+
+    def test_words_containing_filter_words_are_terms(self):
+        parsed = parse_query('wireless shredder')
+        self.assertEqual(parsed.terms, ('wireless', 'shredder'))
+        self.assertIsNone(parsed.color)
+        self.assertIsNone(parsed.price_filter)
+
+    def test_amount_without_direction_is_not_a_filter(self):
+        parsed = parse_query('iphone 1500')
+        self.assertIsNone(parsed.price_filter)
+        self.assertEqual(parsed.text, 'iphone')
+
+    def test_filter_only_query_falls_back_to_raw_text(self):
+        self.assertEqual(parse_query('Red').text, 'red')
+
+    def test_equivalent_queries_share_a_memo_entry(self):
+        self.assertIs(parse_query('Red  Shirt'), parse_query('red shirt'))
+
+
+class FullTextSearchTests(TestCase):
+    """elasticsearch_fulltext_search builds the ES query from the parsed query."""
+
+    def setUp(self):
+        cache.clear()
+        search_cache.local.clear()
+        self.sent = []
+
+        def execute(search, *args, **kwargs):
+            self.sent.append(search.to_dict())
+            results = mock.MagicMock()
+            results.__iter__.return_value = iter([])
+            results.hits.total.value, results.hits.total.relation = 0, 'eq'
+            return results
+
+        for patcher in (mock.patch.object(ProductDocument, '_get_connection'),
+                        mock.patch.object(EsSearch, 'execute', autospec=True, side_effect=execute)):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def search(self, q):
+        return self.client.get('/api/elasticsearch-search/', {'q': q}).json()
+
+    def test_colour_is_required_and_keyed(self):
+        self.search('red shirt')
+        query = self.sent[0]['query']['bool']
+        self.assertEqual(query['must'][0]['multi_match']['query'], 'shirt')
+        self.assertEqual(query['must'][1], {'match': {'pdt_name': 'red'}})
+
+        self.search('blue shirt')
+        self.assertEqual(len(self.sent), 2)
+
+    def test_cached_payload_echoes_the_request_query(self):
+        self.search('red shirt')
+        hit = self.search('RED  shirt')
+        self.assertEqual(len(self.sent), 1)
+        self.assertEqual(hit['query'], 'RED  shirt')
+
+
+class CircuitBreakerTests(TestCase):
+    """search_products falls back fast while Elasticsearch is failing (api/circuit_breaker.py)."""
+
+    def setUp(self):
+        cache.clear()
+        search_cache.local.clear()
+        self.breaker = CircuitBreaker('test', probe=lambda: False, minimum_calls=2, open_seconds=60)
+        patcher = mock.patch('api.views.elasticsearch_breaker', self.breaker)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        category = Category.objects.create(ct_name='Computers')
+        Product.objects.create(pdt_name='Laptop', pdt_mrp=Decimal('900'), pdt_qty=1, ct=category)
+
+    def test_open_circuit_skips_elasticsearch(self):
+        with mock.patch('api.views._elasticsearch_product_search',
+                        side_effect=EsConnectionError('connection refused')) as es_search:
+            for _ in range(2):
+                data = self.client.get('/api/search/', {'q': 'laptop'}).json()
+                self.assertNotEqual(data['using'], 'elasticsearch')
+            self.assertEqual(self.breaker.state, 'open')
+            response = self.client.get('/api/search/', {'q': 'laptop'})
+        self.assertEqual(es_search.call_count, 2)
+        self.assertEqual(response['Cache-Control'], 'no-store')
+        self.assertEqual(response.json()['circuit_breaker'], 'open')
+        self.assertEqual([p['pdt_name'] for p in response.json()['products']], ['Laptop'])
+
+    def test_cached_and_fresh_responses_have_the_same_shape(self):
+        with mock.patch('api.views._elasticsearch_product_search', return_value=[]):
+            fresh = self.client.get('/api/search/', {'q': 'laptop'})
+            cached = self.client.get('/api/search/', {'q': 'laptop'})
+        self.assertEqual(cached['X-Cache'], 'HIT')
+        self.assertEqual(cached.json(), fresh.json())
+        self.assertEqual(cached.json()['circuit_breaker'], 'closed')
+
+    def test_malformed_parameters_are_rejected_before_elasticsearch(self):
+        for path, params in (('/api/elasticsearch-search/', {'min_price': 'abc'}),
+                             ('/api/elasticsearch-search/', {'max_price': 'nan'}),
+                             ('/api/elasticsearch-search/', {'page': '0'}),
+                             ('/api/search/', {'size': 'ten'})):
+            for _ in range(3):
+                response = self.client.get(path, {'q': 'laptop', **params})
+                self.assertEqual(response.status_code, 400, (path, params))
+        self.assertEqual(self.breaker.stats()['failures'], 0)
+        self.assertEqual(self.breaker.state, 'closed')
+
+    def test_only_backend_errors_count_against_the_breaker(self):
+        with mock.patch('api.views._elasticsearch_product_search', side_effect=KeyError('hits')):
+            for _ in range(3):
+                data = self.client.get('/api/search/', {'q': 'laptop'}).json()
+                self.assertNotEqual(data['using'], 'elasticsearch')
+        self.assertEqual(self.breaker.stats()['failures'], 0)
+        self.assertEqual(self.breaker.state, 'closed')
+
+
+class ProductIndexTests(TestCase):
+    """In-process fallback index kept current incrementally (api/inverted_index.py)."""
+
+    def setUp(self):
+        cache.clear()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.category = Category.objects.create(ct_name='Audio')
+            self.product = Product.objects.create(pdt_name='Wireless Speaker', pdt_mrp=Decimal('50'),
+                                                  pdt_dis_price=Decimal('40'), pdt_qty=2, ct=self.category)
+        self.index = ProductIndex()
+        self.index.build()
+
+    def names(self, query, **kwargs):
+        return [p['pdt_name'] for p in self.index.search(query, **kwargs)[0]]
+
+    def write(self, **changes):
+        # A write made by another worker: only the shared generation records it
+        with self.captureOnCommitCallbacks(execute=True):
+            Product.objects.filter(pk=self.product.pk).update(**changes)
+            catalog_changed(product_ids=[self.product.pk])
+
+    def test_search_ranks_and_filters(self):
+        self.assertEqual(self.names('speak'), ['Wireless Speaker'])
+        self.assertEqual(self.names('audio'), ['Wireless Speaker'])
+        self.assertEqual(self.names('speaker', price_filter=('lte', 30.0)), [])
+
+    def test_other_workers_writes_are_replayed_without_a_rebuild(self):
+        self.write(pdt_name='Bluetooth Headphones')
+        self.index.catch_up()
+        self.assertEqual((self.index.rebuilds, self.index.catch_ups), (1, 1))
+        self.assertEqual(self.index.generation, catalog_generation.current())
+        self.assertEqual(self.names('headph'), ['Bluetooth Headphones'])
+        # The old name's tokens are pruned from the postings and the vocabulary
+        self.assertEqual(self.names('speaker'), [])
+        self.assertNotIn('speaker', self.index._vocabulary)
+        self.assertNotIn('wireless', self.index._name_postings)
+
+    def test_missing_history_falls_back_to_a_rebuild(self):
+        self.write(pdt_name='Soundbar')
+        epoch, generation = catalog_generation.version().split('-')
+        cache.delete(CatalogGeneration.changes_key.format(epoch, generation))
+        self.index.catch_up()
+        self.assertEqual(self.index.rebuilds, 2)
+        self.assertEqual(self.names('soundbar'), ['Soundbar'])
+
+    def test_category_delete_drops_its_products(self):
+        ct_id = self.category.ct_id
+        with self.captureOnCommitCallbacks(execute=True):
+            self.category.delete()
+        self.index.update(category_ids=[ct_id], generation=catalog_generation.current())
+        self.assertEqual(self.index.generation, catalog_generation.current())
+        self.assertEqual(self.names('speaker'), [])
+        self.assertEqual(self.index.stats()['vocabulary'], 0)
+
+
+@override_settings(ELASTICSEARCH_SIGNAL_QUEUE={'RETRY_BACKOFF': 30.0, 'MAX_BACKOFF': 60.0})
+class SearchSyncQueueTests(TestCase):
+    """Queued Elasticsearch signal processor (api/signal_processors.py)."""
+
+    def setUp(self):
+        cache.clear()
+        self.processor = QueuedSignalProcessor(connections=None)
+        self.addCleanup(self.processor.teardown)
+        category = Category.objects.create(ct_name='Garden')
+        self.product = Product.objects.create(pdt_name='Hose', pdt_mrp=Decimal('12'), pdt_qty=1, ct=category)
+        self.batch = {(Product, self.product.pk): ('index', 0.0, 0)}
+
+    def flush(self, failed):
+        # As the worker does: take the queued changes (or the first batch) off the queue
+        batch = dict(self.processor._pending) or dict(self.batch)
+        self.processor._pending.clear()
+        result = {'indexed': 0 if failed else 1, 'failed': 1 if failed else 0}
+        with mock.patch('api.search_indexing.bulk_index', return_value=result) as bulk_index:
+            self.processor._flush(batch)
+        return bulk_index
+
+    def test_failed_flush_is_requeued_with_backoff(self):
+        generation = catalog_generation.current()
+        self.flush(failed=True)
+        self.assertEqual(self.processor._pending, {(Product, self.product.pk): ('index', 0.0, 1)})
+        self.assertTrue(self.processor._backing_off())
+        self.assertEqual(catalog_generation.current(), generation)
+
+        self.flush(failed=True)
+        self.assertEqual(self.processor._pending[(Product, self.product.pk)][2], 2)
+        self.assertAlmostEqual(self.processor.stats()['backoff_seconds'], 60.0, delta=1)
+
+    def test_successful_flush_bumps_the_generation(self):
+        generation = catalog_generation.current()
+        bulk_index = self.flush(failed=False)
+        bulk_index.assert_called_once()
+        self.assertEqual(self.processor._pending, {})
+        self.assertEqual(catalog_generation.current(), generation + 1)
+        self.assertEqual(self.processor.stats()['flushed'], 1)
+
+    @override_settings(ELASTICSEARCH_SIGNAL_QUEUE={'MAX_RETRIES': 1})
+    def test_gives_up_after_max_retries(self):
+        self.processor = QueuedSignalProcessor(connections=None)
+        self.addCleanup(self.processor.teardown)
+        with self.assertLogs('api.signal_processors', 'ERROR'):
+            self.flush(failed=True)
+        self.assertEqual(self.processor._pending, {})
+        self.assertEqual(self.processor.given_up, 1)
+
+    @override_settings(ELASTICSEARCH_SIGNAL_QUEUE={'MAX_PENDING': 1})
+    def test_queue_stays_bounded_while_backing_off(self):
+        self.processor = QueuedSignalProcessor(connections=None)
+        self.addCleanup(self.processor.teardown)
+        self.processor._backoff_until = time.monotonic() + 60
+        with mock.patch.object(self.processor, '_ensure_worker'), \
+                mock.patch.object(self.processor, '_flush') as flush:
+            self.processor.enqueue(Product, 1, 'index')
+            with self.assertLogs('api.signal_processors', 'ERROR') as logs:
+                self.processor.enqueue(Product, 2, 'index')
+        self.assertEqual(list(self.processor._pending), [(Product, 1)])
+        self.assertEqual(self.processor.given_up, 1)
+        self.assertIn('Product:2', logs.output[0])
+        flush.assert_not_called()
+
+    def test_worker_flushes_retire_stale_connections(self):
+        with mock.patch('api.signal_processors.close_old_connections') as close, \
+                mock.patch.object(self.processor, '_flush', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                self.processor._flush_in_thread(dict(self.batch))
+        self.assertEqual(close.call_count, 2)
+
+    def flush_category_change(self, update_from_related):
+        category = self.product.ct
+        self.batch = {(Category, category.pk): ('index', 0.0, 0)}
+        with mock.patch.object(ProductDocument, 'update_from_related', autospec=True, side_effect=update_from_related):
+            self.flush(failed=False)
+            return category, list(self.processor._related_futures)
+
+    def test_category_change_is_pushed_off_the_flush_thread(self):
+        release = threading.Event()
+        generation = catalog_generation.current()
+        category, running = self.flush_category_change(lambda document, category: release.wait(5) and {'failures': []})
+        # The flush is done while the update-by-query still runs
+        self.assertEqual(len(running), 1)
+        self.assertFalse(running[0].done())
+        release.set()
+        running[0].result(5)
+        self.assertEqual(catalog_generation.current(), generation + 2)
+        self.assertEqual(self.processor._pending, {})
+
+    def test_failed_category_change_is_requeued(self):
+        release = threading.Event()
+        category, running = self.flush_category_change(lambda document, category: release.wait(5) and {'failures': [{}]})
+        release.set()
+        running[0].result(5)
+        self.assertEqual(self.processor._pending, {(Category, category.pk): ('index', 0.0, 1)})
+
+    def test_stock_processor_reindexes_the_category_products(self):
+        related = ProductDocument().get_instances_from_related(self.product.ct)
+        self.assertEqual(list(related), [self.product])
+
+
+class BulkCreateProductsTests(TestCase):
+    """Batched validation and upsert behind /api/products/bulk_create/ (api/catalog_import.py)."""
+
+    def setUp(self):
+        cache.clear()
+        self.garden = Category.objects.create(ct_name='Garden')
+        self.kitchen = Category.objects.create(ct_name='Kitchen')
+        patcher = mock.patch('api.catalog_import.bulk_index_products', return_value={'indexed': 0, 'failed': 0})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def row(self, pdt_id, **fields):
+        return {'pdt_id': pdt_id, 'pdt_name': f'Item {pdt_id}', 'pdt_mrp': '10.00', 'pdt_qty': 3,
+                'ct_id': self.garden.ct_id, **fields}
+
+    def post(self, rows, query=''):
+        return self.client.post(f'/api/products/bulk_create/{query}', rows, content_type='application/json')
+
+    def test_any_invalid_row_rejects_the_import(self):
+        response = self.post([self.row(1), self.row(2, pdt_mrp='-1', ct_id=999)])
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Product.objects.exists())
+        [error] = response.json()['errors']
+        self.assertEqual(error['index'], 2)
+        self.assertIn('pdt_mrp', error['error'])
+        self.assertIn('ct_id=999 does not exist', error['error'])
+
+    def test_partial_import_commits_the_valid_rows(self):
+        response = self.post([self.row(1), self.row(2, pdt_qty='many'), self.row(3)], '?partial=true&batch_size=2')
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual(response.json()['created'], 2)
+        self.assertEqual(response.json()['batches'], 2)
+        self.assertEqual(sorted(Product.objects.values_list('pdt_id', flat=True)), [1, 3])
+
+    def test_existing_rows_are_updated_in_place(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.post([self.row(1), self.row(2)])
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.post([self.row(1, pdt_name='Renamed', ct_id=self.kitchen.ct_id), self.row(3)])
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Product.objects.count(), 3)
+        moved = Product.objects.get(pdt_id=1)
+        self.assertEqual((moved.pdt_name, moved.ct_id), ('Renamed', self.kitchen.ct_id))
+        self.assertEqual(CategoryStats.objects.get(ct=self.garden).product_count, 2)
+        self.assertEqual(CategoryStats.objects.get(ct=self.kitchen).product_count, 1)
+
+        response = self.post([self.row(1)], '?upsert=false')
+        self.assertEqual(response.status_code, 500)
+
+    def test_categories_are_resolved_in_one_query(self):
+        rows = [(n, self.row(n, ct_id=(self.garden, self.kitchen)[n % 2].ct_id)) for n in range(1, 51)]
+        with self.assertNumQueries(1):
+            products, errors = validate_rows(rows)
+        self.assertEqual((len(products), errors), (50, []))
+
+
+class ImportProductsFeedTests(TestCase):
+    """Streaming NDJSON/CSV import at /api/products/import/."""
+
+    def setUp(self):
+        cache.clear()
+        self.category = Category.objects.create(ct_name='Garden')
+        self.admin = User.objects.create_user('admin', 'admin@example.com', 'Password123', is_staff=True)
+        patcher = mock.patch('api.catalog_import.bulk_index_products', return_value={'indexed': 0, 'failed': 0})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def post(self, body, content_type, user=None):
+        request = APIRequestFactory().post('/api/products/import/?batch_size=2', body, content_type=content_type)
+        return self.send(request, user)
+
+    def post_chunked(self, body, **environ):
+        # As a chunked upload reaches Django: no CONTENT_LENGTH in the environ
+        request = WSGIRequest({
+            'REQUEST_METHOD': 'POST', 'PATH_INFO': '/api/products/import/', 'QUERY_STRING': 'batch_size=2',
+            'SERVER_NAME': 'testserver', 'SERVER_PORT': '80', 'wsgi.url_scheme': 'http',
+            'CONTENT_TYPE': 'application/x-ndjson', 'HTTP_TRANSFER_ENCODING': 'chunked',
+            'wsgi.input': io.BytesIO(body), **environ,
+        })
+        return self.send(request)
+
+    def send(self, request, user=None):
+        force_authenticate(request, user=user or self.admin)
+        response = views.import_products_feed(request)
+        if response.status_code != 200:
+            return response, None
+        return response, [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+
+    def ndjson(self, *rows):
+        return '\n'.join(row if isinstance(row, str) else json.dumps(row) for row in rows).encode()
+
+    def row(self, pdt_id, **fields):
+        return {'pdt_id': pdt_id, 'pdt_name': f'Item {pdt_id}', 'pdt_mrp': 10, 'pdt_qty': 3,
+                'ct_id': self.category.ct_id, **fields}
+
+    def test_ndjson_batches_report_errors_by_line(self):
+        body = self.ndjson(self.row(1), '{not json', self.row(2, pdt_qty=-1.5), '', self.row(3))
+        response, lines = self.post(body, 'application/x-ndjson')
+        self.assertEqual([line.get('batch') for line in lines], [1, 2, None])
+        self.assertEqual([error['index'] for error in lines[0]['errors']], [2])
+        self.assertEqual([error['index'] for error in lines[1]['errors']], [3])
+        self.assertEqual(lines[-1], {'done': True, 'rows': 4, 'written': 2, 'failed': 2})
+        self.assertEqual(sorted(Product.objects.values_list('pdt_id', flat=True)), [1, 3])
+
+    def test_csv_rows_are_upserted(self):
+        Product.objects.create(pdt_id=1, pdt_name='Old', pdt_mrp=Decimal('1'), pdt_qty=0, ct=self.category)
+        body = (
+            'pdt_id,pdt_name,pdt_mrp,pdt_dis_price,pdt_qty,ct_id\n'
+            f'1,Hose,12.50,,4,{self.category.ct_id}\n'
+            f'2,Rake,8,7.5,1,{self.category.ct_id}\n'
+        ).encode()
+        response, lines = self.post(body, 'text/csv')
+        self.assertEqual(lines[-1]['written'], 2)
+        hose = Product.objects.get(pdt_id=1)
+        self.assertEqual((hose.pdt_name, hose.pdt_mrp, hose.pdt_dis_price), ('Hose', Decimal('12.50'), None))
+
+    def test_chunked_body_needs_a_length_or_a_dechunking_server(self):
+        response, _ = self.post_chunked(self.ndjson(self.row(1), self.row(2)))
+        self.assertEqual(response.status_code, 411)
+        self.assertFalse(Product.objects.exists())
+
+        response, lines = self.post_chunked(self.ndjson(self.row(1), self.row(2)), **{'wsgi.input_terminated': True})
+        self.assertEqual(lines[-1]['written'], 2)
+
+    def test_admin_only(self):
+        user = User.objects.create_user('shopper', 'shopper@example.com', 'Password123')
+        response, _ = self.post(self.ndjson(self.row(1)), 'application/x-ndjson', user=user)
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(Product.objects.exists())
+
+
+class CatalogExportTests(TestCase):
+    """Exports (api/catalog_export.py) read back through the import path unchanged."""
+
+    fields = ('pdt_id', 'pdt_name', 'pdt_mrp', 'pdt_dis_price', 'pdt_qty', 'ct_id')
+
+    def setUp(self):
+        cache.clear()
+        garden = Category.objects.create(ct_name='Garden, "outdoor"')
+        books = Category.objects.create(ct_name='Böoks')
+        Product.objects.create(pdt_name='Hose, 20m "pro"', pdt_mrp=Decimal('12.50'), pdt_qty=4, ct=garden)
+        Product.objects.create(pdt_name='Ünïcode\nnovel', pdt_mrp=Decimal('9'), pdt_dis_price=Decimal('7.25'),
+                               pdt_qty=0, ct=books)
+        Product.objects.create(pdt_name='Rake', pdt_mrp=Decimal('99999999.99'), pdt_dis_price=Decimal('0'),
+                               pdt_qty=1, ct=garden)
+        self.catalog = list(Product.objects.order_by('pdt_id').values_list(*self.fields))
+        patcher = mock.patch('api.catalog_import.bulk_index_products', return_value={'indexed': 0, 'failed': 0})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def round_trip(self, fmt, compressed=False):
+        exported = b''.join(export_products(fmt, compressed=compressed, chunk_size=2))
+        Product.objects.all().delete()
+        batches = list(iter_import_batches(read_rows(io.BytesIO(exported), fmt, compressed=compressed), 2))
+        self.assertEqual([error for batch in batches for error in batch['errors']], [])
+        self.assertEqual(list(Product.objects.order_by('pdt_id').values_list(*self.fields)), self.catalog)
+
+    def test_ndjson_round_trip(self):
+        self.round_trip('ndjson')
+
+    def test_csv_round_trip(self):
+        self.round_trip('csv')
+
+    def test_gzipped_csv_round_trip(self):
+        self.round_trip('csv', compressed=True)
+
+    def export(self, user, query=''):
+        request = APIRequestFactory().get(f'/api/products/export/{query}')
+        force_authenticate(request, user=user)
+        return views.export_products_feed(request)
+
+    def test_endpoint_streams_every_row(self):
+        admin = User.objects.create_superuser('admin', 'admin@example.com', 'Password123')
+        response = self.export(admin, '?chunk_size=1')
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+        self.assertEqual([row['pdt_id'] for row in rows], [row[0] for row in self.catalog])
+        self.assertEqual(rows[0]['ct_name'], 'Garden, "outdoor"')
+        self.assertEqual(rows[0]['pdt_mrp'], '12.50')
+
+    @override_settings(CATALOG_EXPORT={'THROTTLE_RATE': '2/hour'})
+    def test_endpoint_is_admin_only_and_throttled(self):
+        shopper = User.objects.create_user('shopper', 'shopper@example.com', 'Password123')
+        self.assertEqual(self.client.get('/api/products/export/').status_code, 401)
+        self.assertEqual(self.export(shopper).status_code, 403)
+        admin = User.objects.create_superuser('admin', 'admin@example.com', 'Password123')
+        self.assertEqual([self.export(admin).status_code for _ in range(3)], [200, 200, 429])
+
+    def test_commands_leave_stdin_and_stdout_open(self):
+        stdout = io.TextIOWrapper(io.BytesIO())
+        with mock.patch('sys.stdout', stdout):
+            call_command('export_products', '-', chunk_size=2)
+        self.assertFalse(stdout.closed)
+        exported = stdout.buffer.getvalue()
+        self.assertEqual(len(exported.splitlines()), len(self.catalog))
+
+        Product.objects.all().delete()
+        stdin = io.TextIOWrapper(io.BytesIO(exported))
+        with mock.patch('sys.stdin', stdin):
+            call_command('import_products', '-', stdout=io.StringIO(), stderr=io.StringIO())
+        self.assertFalse(stdin.closed)
+        self.assertEqual(list(Product.objects.order_by('pdt_id').values_list(*self.fields)), self.catalog)
+
+
+class FastSerializerParityTests(TestCase):
+    """The values() fast path must render byte-identical JSON to the ModelSerializers."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.electronics = Category.objects.create(ct_name='Electronics', ct_description='Gadgets')
+        cls.books = Category.objects.create(ct_name='Books ünïcode', ct_description='')
+        Category.objects.filter(pk=cls.books.pk).update(ct_date=datetime(2024, 1, 2, 3, 4, 5, 678901, tzinfo=dt_timezone.utc))
+        CategoryStats.objects.filter(ct=cls.electronics).update(product_count=3)
+
+        prices = [
+            (Decimal('10'), Decimal('9.5')),
+            (Decimal('1234.56'), None),
+            (Decimal('0.01'), Decimal('0')),
+            (Decimal('99999999.99'), Decimal('12345678.90')),
+        ]
+        for i, (mrp, dis_price) in enumerate(prices, start=1):
+            Product.objects.create(
+                pdt_name=f'Product "{i}" — ñ',
+                pdt_mrp=mrp,
+                pdt_dis_price=dis_price,
+                pdt_qty=i * 7,
+                ct=cls.electronics if i % 2 else cls.books,
+            )
+
+    def render(self, data):
+        return JSONRenderer().render(data)
+
+    def test_products_match_model_serializer(self):
+        queryset = Product.objects.select_related('ct').order_by('pdt_id')
+        expected = ProductSerializer(queryset, many=True).data
+        actual = product_fast_serializer.many(product_fast_serializer.values(queryset))
+        self.assertEqual(self.render(actual), self.render(expected))
+
+    def test_categories_match_model_serializer(self):
+        queryset = Category.objects.annotate(
+            products_count=Coalesce('stats__product_count', Value(0))
+        ).order_by('ct_id')
+        expected = CategorySerializer(queryset, many=True).data
+        actual = category_fast_serializer.many(category_fast_serializer.values(queryset))
+        self.assertEqual(self.render(actual), self.render(expected))
+
+    def test_single_product_matches_model_serializer(self):
+        product = Product.objects.get(pdt_dis_price__isnull=True)
+        row = product_fast_serializer.values(Product.objects.filter(pk=product.pk)).get()
+        self.assertEqual(
+            self.render(product_fast_serializer.to_representation(row)),
+            self.render(ProductSerializer(product).data),
+        )
+
+    def test_list_endpoints_use_fast_path_output(self):
+        response = self.client.get('/api/products/')
+        expected = ProductSerializer(Product.objects.order_by('pdt_id'), many=True).data
+        self.assertEqual(self.render(response.json()['results']), self.render(expected))
+
+        response = self.client.get('/api/products/?pagination=cursor')
+        self.assertEqual(self.render(response.json()['results']), self.render(expected))
+
+
+class ORJSONParityTests(TestCase):
+    """api/renderers.py and api/parsers.py must match DRF's JSONRenderer/JSONParser."""
+
+    payload = {
+        'price': Decimal('1234.50'),
+        'aware': datetime(2024, 1, 2, 3, 4, 5, 678901, tzinfo=dt_timezone.utc),
+        'naive': datetime(2024, 1, 2, 3, 4, 5),
+        'day': date(2024, 2, 29),
+        'at': dt_time(23, 59, 1, 500),
+        'id': uuid.UUID('12345678-1234-5678-1234-567812345678'),
+        'text': 'ñ — "quoted" \u2028 \u2029 <tag>',
+        'lazy': gettext_lazy('This field is required.'),
+        'errors': {'pdt_mrp': [ErrorDetail('Ensure this value is greater than or equal to 0.', code='min_value')]},
+        'numbers': [0, -1, 2 ** 63 - 1, 1.5, 1e-7, True, None],
+        'big': 2 ** 64,
+        1: 'non-string key',
+    }
+
+    def test_renderer_matches_stock_output(self):
+        for data in (self.payload, [self.payload], {}, [], 'plain', ErrorDetail('x', code='y')):
+            with self.subTest(data=data):
+                self.assertEqual(ORJSONRenderer().render(data), JSONRenderer().render(data))
+        self.assertEqual(ORJSONRenderer().render(None), JSONRenderer().render(None))
+
+    def test_non_finite_numbers_are_refused_like_stock(self):
+        for value in (float('nan'), float('inf'), -float('inf'), Decimal('NaN')):
+            data = {'products': [{'pdt_dis_price': None, 'relevance_score': value}]}
+            with self.subTest(value=value):
+                with self.assertRaises(ValueError):
+                    JSONRenderer().render(data)
+                with self.assertRaises(ValueError):
+                    ORJSONRenderer().render(data)
+
+    def test_indented_output_matches_stock(self):
+        accepted = 'application/json; indent=4'
+        self.assertEqual(
+            ORJSONRenderer().render(self.payload, accepted),
+            JSONRenderer().render(self.payload, accepted),
+        )
+
+    def test_endpoint_output_matches_stock(self):
+        category = Category.objects.create(ct_name='Garden')
+        product = Product.objects.create(pdt_name='Hose', pdt_mrp=Decimal('12.5'), pdt_qty=1, ct=category)
+        for path in ('/api/products/', f'/api/products/{product.pk}/', f'/api/categories/{category.pk}/'):
+            with self.subTest(path=path):
+                response = self.client.get(path)
+                self.assertEqual(response.content, JSONRenderer().render(response.data))
+
+    def test_parser_matches_stock(self):
+        body = JSONRenderer().render({'name': 'ñ — 中文', 'price': '12.50', 'qty': 3, 'ratio': 0.1,
+                                      'items': [{'nested': None}, True]})
+        self.assertEqual(
+            ORJSONParser().parse(io.BytesIO(body)),
+            JSONParser().parse(io.BytesIO(body)),
+        )
+
+    def test_parser_rejects_what_stock_rejects(self):
+        for body in (b'{"a": NaN}', b'{"a": Infinity}', b'{broken', b'\xff'):
+            with self.subTest(body=body):
+                with self.assertRaises(ParseError):
+                    JSONParser().parse(io.BytesIO(body))
+                with self.assertRaises(ParseError):
+                    ORJSONParser().parse(io.BytesIO(body))
+
+
+class ConditionalGetTests(TestCase):
+    """Catalog reads are validated by the catalog generation (api/conditional.py)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(ct_name='Electronics', ct_description='Gadgets')
+        cls.product = Product.objects.create(
+            pdt_name='Phone', pdt_mrp=Decimal('100'), pdt_dis_price=None, pdt_qty=1, ct=category,
+        )
+
+    def test_matching_etag_is_answered_without_queries(self):
+        for url in ('/api/products/', f'/api/products/{self.product.pk}/', '/api/categories/'):
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            with self.assertNumQueries(0):
+                revalidated = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+            self.assertEqual(revalidated.status_code, 304)
+            self.assertEqual(revalidated['ETag'], response['ETag'])
+
+    def test_catalog_write_changes_etag(self):
+        url = f'/api/products/{self.product.pk}/'
+        etag = self.client.get(url)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            Product.objects.filter(pk=self.product.pk).update(pdt_qty=2)
+            catalog_changed(product_ids=[self.product.pk])
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.json()['pdt_qty'], 2)
+
+    def test_populate_data_bumps_the_generation_after_its_products_exist(self):
+        def changed(product_ids, category_ids):
+            self.assertEqual(sorted(product_ids), sorted(Product.objects.values_list('pdt_id', flat=True)))
+            catalog_changed(product_ids=product_ids, category_ids=category_ids)
+
+        url = '/api/products/'
+        etag = self.client.get(url)['ETag']
+        with mock.patch('api.management.commands.populate_data.catalog_changed', side_effect=changed) as propagate, \
+                mock.patch('api.management.commands.populate_data.bulk_index_products', side_effect=RuntimeError), \
+                self.captureOnCommitCallbacks(execute=True):
+            call_command('populate_data', stdout=io.StringIO())
+        propagate.assert_called_once()
+        self.assertEqual(Product.objects.count(), 300)
+        self.assertEqual(sum(CategoryStats.objects.values_list('product_count', flat=True)), 300)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_last_modified_waits_for_its_second_to_pass(self):
+        url = f'/api/products/{self.product.pk}/'
+        catalog_generation.bump()
+        modified = catalog_generation.last_modified()
+        self.assertLessEqual(modified, time.time())
+        with mock.patch('api.conditional.time.time', return_value=modified + 0.5):
+            self.assertNotIn('Last-Modified', self.client.get(url))
+        with mock.patch('api.conditional.time.time', return_value=modified + 1):
+            response = self.client.get(url)
+            self.assertEqual(response['Last-Modified'], http_date(modified))
+            revalidated = self.client.get(url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(revalidated.status_code, 304)
+
+    def test_bumps_never_run_ahead_of_the_clock(self):
+        for _ in range(5):
+            catalog_generation.bump()
+        self.assertLessEqual(catalog_generation.last_modified(), time.time())
+
+    @override_settings(CACHES={
+        'worker-a': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'worker-a'},
+        'worker-b': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'worker-b'},
+        'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'shared'},
+    })
+    def test_workers_with_local_caches_never_share_a_version(self):
+        workers = {'worker-a': CatalogGeneration(), 'worker-b': CatalogGeneration()}
+        versions = {}
+        for alias, generation in workers.items():
+            with override_settings(SEARCH_CACHE={'CACHE_ALIAS': alias}):
+                generation.bump()
+                versions[alias] = generation.version()
+        # Same count of writes on each side, different catalogs
+        self.assertEqual(workers['worker-a'].current(), workers['worker-b'].current())
+        self.assertNotEqual(versions['worker-a'], versions['worker-b'])
+
+    @override_settings(SEARCH_CACHE={'GENERATION_CHECK_INTERVAL': 0})
+    def test_cache_loss_starts_a_new_epoch(self):
+        generation = CatalogGeneration()
+        generation.bump()
+        seen = generation.version()
+        cache.clear()
+        self.assertNotEqual(generation.version(), seen)
+
+        # A worker starting on the emptied cache counts from scratch without repeating `seen`
+        fresh = CatalogGeneration()
+        cache.clear()
+        versions = set()
+        for _ in range(3):
+            fresh.bump()
+            versions.add(fresh.version())
+        self.assertNotIn(seen, versions)
+
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+    def test_local_memory_search_cache_is_reported(self):
+        self.assertIn('api.W001', [warning.id for warning in check_shared_caches(None)])
+        with override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache'}}):
+            self.assertEqual(check_shared_caches(None), [])
+
+
+@override_settings(PASSWORD_BCRYPT_ROUNDS=4)
+class EmailBackendTests(TestCase):
+    """Email logins (api/backends.py)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('alice', 'Alice@Gmail.com', 'correct-horse')
+
+    def test_email_matches_ignoring_case(self):
+        for email in ('alice@gmail.com', 'ALICE@GMAIL.COM', 'Alice@Gmail.com'):
+            with self.subTest(email=email):
+                self.assertEqual(authenticate(email=email, password='correct-horse'), self.user)
+        self.assertIsNone(authenticate(email='alice@gmail.com', password='wrong'))
+
+    def test_unknown_and_inactive_accounts_spend_a_dummy_check(self):
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        for email in ('nobody@gmail.com', 'alice@gmail.com'):
+            with self.subTest(email=email):
+                with mock.patch.object(PepperedBCryptSHA256PasswordHasher, 'verify', return_value=True) as verify:
+                    self.assertIsNone(authenticate(email=email, password='correct-horse'))
+                verify.assert_called_once()
+
+    def test_dummy_hash_follows_the_hasher_settings(self):
+        hasher = PepperedBCryptSHA256PasswordHasher()
+        self.assertEqual(hasher.decode(_dummy_encoded(hasher_params()))['work_factor'], 4)
+        with override_settings(PASSWORD_BCRYPT_ROUNDS=5):
+            self.assertEqual(hasher.decode(_dummy_encoded(hasher_params()))['work_factor'], 5)
+        with override_settings(PASSWORD_PEPPERS={'': 'old', 'k2': 'new'}, PASSWORD_PEPPER_ID='k2'):
+            self.assertEqual(hasher.decode(_dummy_encoded(hasher_params()))['pepper_id'], 'k2')
+
+    def test_backends_without_expression_indexes_fail_loudly(self):
+        migration = importlib.import_module('api.migrations.0006_auth_user_email_ci_unique')
+        self.assertEqual(check_expression_indexes(None, databases=['default']), [])
+        with mock.patch.object(connection.features, 'supports_expression_indexes', False):
+            self.assertEqual([error.id for error in check_expression_indexes(None, databases=['default'])],
+                             ['api.E001'])
+            schema_editor = mock.Mock(connection=connection)
+            with self.assertRaisesMessage(RuntimeError, 'does not support expression indexes'):
+                migration.add_email_constraint(apps, schema_editor)
+        schema_editor.add_constraint.assert_not_called()
+
+    def test_registration_race_is_a_validation_error(self):
+        request = APIRequestFactory().post('/api/register/', {
+            'username': 'alice2', 'first_name': 'Alice', 'last_name': 'Smith', 'email': 'alice2@gmail.com',
+            'password': 'secret', 'confirm_password': 'secret',
+        }, format='json')
+        with mock.patch.object(RegisterSerializer, 'save', side_effect=IntegrityError('auth_user_email_ci_uniq')):
+            response = views.register_user(request)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['non_field_errors'], ['An account with this email or username already exists.'])
+
+
+@override_settings(PASSWORD_POOL={'WORKERS': 1, 'MAX_PENDING': 1, 'TIMEOUT': 0.05})
+class PasswordPoolTests(TestCase):
+    """Admission accounting of the password pool (api/password_pool.py)."""
+
+    def setUp(self):
+        self.pool = PasswordPool()
+        # Threads stand in for the worker processes
+        self.pool._executor = ThreadPoolExecutor(max_workers=1)
+        self.addCleanup(self.pool.shutdown)
+        self.release = threading.Event()
+        self.addCleanup(self.release.set)
+
+    def test_timed_out_call_stays_pending_until_it_ends(self):
+        with self.assertRaises(PoolSaturated):
+            asyncio.run(self.pool._run(self.release.wait, 5))
+        self.assertEqual(self.pool.pending, 1)
+        # Its worker is still busy, so admission stays closed
+        with self.assertRaises(PoolSaturated):
+            asyncio.run(self.pool._run(len, 'x'))
+        self.assertEqual(self.pool.rejected, 1)
+
+        self.release.set()
+        self.pool._executor.shutdown(wait=True)
+        self.assertEqual((self.pool.pending, self.pool.completed, self.pool.errors), (0, 1, 1))
+
+    def test_completed_call_releases_its_slot(self):
+        self.assertEqual(asyncio.run(self.pool._run(len, 'abc')), 3)
+        self.assertEqual(asyncio.run(self.pool._run(len, 'ab')), 2)
+        self.assertEqual((self.pool.pending, self.pool.completed), (0, 2))
+
+
+@override_settings(PASSWORD_BCRYPT_ROUNDS=4, PASSWORD_PEPPER='legacy', PASSWORD_PEPPERS={'': 'legacy'},
+                   PASSWORD_PEPPER_ID='')
+class PepperedHasherTests(TestCase):
+    """Pepper ids in peppered bcrypt hashes (api/hashers.py)."""
+
+    rotated = {'PASSWORD_PEPPERS': {'': 'legacy', 'k2': 'second'}, 'PASSWORD_PEPPER_ID': 'k2'}
+
+    def setUp(self):
+        self.hasher = PepperedBCryptSHA256PasswordHasher()
+
+    def legacy_hash(self, password, rounds=4):
+        # As stored before pepper ids: the parent's encoding of password + pepper, no id
+        encoded = BCryptSHA256PasswordHasher().encode(password + 'legacy', bcrypt.gensalt(rounds))
+        return self.hasher.algorithm + encoded[len(BCryptSHA256PasswordHasher.algorithm):]
+
+    def test_legacy_hashes_still_verify(self):
+        encoded = self.legacy_hash('correct-horse')
+        self.assertTrue(encoded.startswith('bcrypt_sha256_peppered$$2b$04$'))
+        self.assertTrue(self.hasher.verify('correct-horse', encoded))
+        self.assertFalse(self.hasher.verify('wrong', encoded))
+        self.assertFalse(self.hasher.must_update(encoded))
+        self.assertEqual(self.hasher.decode(encoded)['pepper_id'], '')
+
+    def test_rotation_rehashes_on_login(self):
+        user = User.objects.create_user('alice', 'alice@gmail.com')
+        user.password = self.legacy_hash('correct-horse')
+        user.save()
+        with override_settings(**self.rotated):
+            self.assertTrue(self.hasher.must_update(user.password))
+            self.assertTrue(user.check_password('correct-horse'))
+            user.refresh_from_db()
+            self.assertTrue(user.password.startswith('bcrypt_sha256_peppered$k2$2b$04$'))
+            self.assertFalse(self.hasher.must_update(user.password))
+            self.assertTrue(user.check_password('correct-horse'))
+
+    def test_unknown_pepper_id_never_verifies(self):
+        with override_settings(**self.rotated):
+            encoded = make_password('correct-horse')
+        with self.assertLogs('api.hashers', 'ERROR'):
+            self.assertFalse(self.hasher.verify('correct-horse', encoded))
+
+
+@override_settings(PASSWORD_BCRYPT_ROUNDS=4)
+class BCryptRoundsTests(TestCase):
+    """Work factor from PASSWORD_BCRYPT_ROUNDS and the calibrate_hashers report."""
+
+    def setUp(self):
+        self.hasher = PepperedBCryptSHA256PasswordHasher()
+
+    def test_rounds_change_rehashes_on_login(self):
+        user = User.objects.create_user('alice', 'alice@gmail.com', 'correct-horse')
+        self.assertEqual(self.hasher.decode(user.password)['work_factor'], 4)
+        self.assertFalse(self.hasher.must_update(user.password))
+        with override_settings(PASSWORD_BCRYPT_ROUNDS=5):
+            self.assertTrue(self.hasher.must_update(user.password))
+            self.assertTrue(user.check_password('correct-horse'))
+            user.refresh_from_db()
+            self.assertEqual(self.hasher.decode(user.password)['work_factor'], 5)
+            self.assertFalse(self.hasher.must_update(user.password))
+
+    def test_distribution_report(self):
+        User.objects.create_user('alice', 'alice@gmail.com', 'correct-horse')
+        User.objects.create_user('bob', 'bob@gmail.com')
+        with override_settings(PASSWORD_BCRYPT_ROUNDS=5):
+            User.objects.create_user('carol', 'carol@gmail.com', 'correct-horse')
+            out = io.StringIO()
+            call_command('calibrate_hashers', '--distribution-only', stdout=out)
+        report = out.getvalue()
+        self.assertIn('Stored password hashes (3 users)', report)
+        self.assertRegex(report, r'bcrypt_sha256_peppered +rounds=4 pepper=\(legacy\) +1 ')
+        self.assertRegex(report, r'bcrypt_sha256_peppered +rounds=5 pepper=\(legacy\) +1 ')
+        self.assertRegex(report, r'\(unusable\) +- +1 ')
+        self.assertIn('1 usable hashes differ from the current default', report)
+
+
+@override_settings(LOGIN_THROTTLE={'IP': (3, 1), 'ACCOUNT': (2, 1)})
+class LoginThrottleTests(TestCase):
+    """Password-checking endpoints draw on shared token buckets (api/throttling.py)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        User.objects.create_user('alice', 'alice@example.com', 'correct-horse')
+
+    def setUp(self):
+        cache.clear()
+
+    def login(self, email, ip='10.0.0.1'):
+        return self.client.post('/api/login/', {'email': email, 'password': 'wrong'},
+                                content_type='application/json', REMOTE_ADDR=ip)
+
+    def test_ip_bucket_rejects_before_hashing(self):
+        for n in range(3):
+            self.assertEqual(self.login(f'user{n}@example.com').status_code, 401)
+        with mock.patch.object(PepperedBCryptSHA256PasswordHasher, 'verify') as verify:
+            response = self.login('user3@example.com')
+        self.assertEqual(response.status_code, 429)
+        self.assertGreaterEqual(int(response['Retry-After']), 1)
+        verify.assert_not_called()
+        # Another client is unaffected
+        self.assertEqual(self.login('user3@example.com', ip='10.0.0.2').status_code, 401)
+
+    def test_account_bucket_is_shared_across_ips_and_endpoints(self):
+        self.assertEqual(self.login('Alice@example.com', ip='10.0.0.1').status_code, 401)
+        self.assertEqual(self.login('alice@example.com ', ip='10.0.0.2').status_code, 401)
+        self.assertEqual(self.login('alice@example.com', ip='10.0.0.3').status_code, 429)
+        response = self.client.post('/api/async/login/', {'email': 'ALICE@example.com', 'password': 'wrong'},
+                                    content_type='application/json', REMOTE_ADDR='10.0.0.4')
+        self.assertEqual(response.status_code, 429)
+
+    def test_refused_attempt_takes_nothing_from_the_other_buckets(self):
+        self.assertEqual(self.login('alice@example.com').status_code, 401)
+        self.assertEqual(self.login('alice@example.com').status_code, 401)
+        self.assertEqual(self.login('alice@example.com').status_code, 429)  # account bucket
+        # The IP bucket only counted the two admitted attempts
+        self.assertEqual(self.login('bob@example.com').status_code, 401)
+        self.assertEqual(self.login('carol@example.com').status_code, 429)
+
+    def test_concurrent_attempts_never_exceed_the_burst(self):
+        results = []
+        def attempt(n):
+            results.append(login_throttle.check('10.0.0.9', f'user{n}@example.com'))
+        threads = [threading.Thread(target=attempt, args=(n,)) for n in range(20)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results.count(None), 3)
+
+    def test_window_slides_at_the_refill_rate(self):
+        start = 180 * 10_000  # start of a 180 s window (burst 3, 1 a minute)
+        with mock.patch('api.throttling.time.time', return_value=start):
+            for n in range(3):
+                self.assertIsNone(login_throttle.check('10.0.0.9', f'user{n}@example.com'))
+            wait = login_throttle.check('10.0.0.9', 'user3@example.com')
+        self.assertEqual(wait, 240)
+        with mock.patch('api.throttling.time.time', return_value=start + wait - 1):
+            self.assertIsNotNone(login_throttle.check('10.0.0.9', 'user3@example.com'))
+        with mock.patch('api.throttling.time.time', return_value=start + wait):
+            self.assertIsNone(login_throttle.check('10.0.0.9', 'user3@example.com'))
+            self.assertEqual(login_throttle.check('10.0.0.9', 'user4@example.com'), 60)
+
+    def test_local_memory_cache_is_reported(self):
+        self.assertIn('api.W002', [warning.id for warning in check_shared_caches(None)])
+        throttle = LoginThrottle()
+        with self.assertLogs('api.throttling', 'WARNING'):
+            throttle.check('10.0.0.9', 'alice@example.com')
+        with override_settings(LOGIN_THROTTLE={'ENABLED': False}):
+            self.assertNotIn('api.W002', [warning.id for warning in check_shared_caches(None)])
@@ -0,0 +1,205 @@
+"""
+Token-bucket throttling for the password-checking endpoints.
+
+Every login attempt costs a full password hash (bcrypt, tens to hundreds of
+milliseconds of CPU), whether or not the account exists. Before any hashing,
+the login views take one token from each of two buckets:
+
+- the client IP (BaseThrottle.get_ident, honouring REST_FRAMEWORK['NUM_PROXIES'])
+- the target account (email or username, normalized)
+
+and are refused with 429 and Retry-After when either is empty. Buckets hold
+up to BURST tokens and refill at PER_MINUTE tokens a minute
+(settings.LOGIN_THROTTLE). An optional GLOBAL bucket caps the password checks
+of the whole deployment, bounding the CPU a distributed credential-stuffing
+run can take.
+
+A bucket is kept as a sliding window of BURST / PER_MINUTE minutes: one
+counter per window in the shared cache (LOGIN_THROTTLE['CACHE_ALIAS']),
+taken from with the cache's atomic `incr`. An attempt is admitted while
+
+    previous window's count * (share of it still inside the sliding window)
+        + its own position in the current window  <=  BURST
+
+which lets BURST attempts through at once and then PER_MINUTE a minute, like
+a token bucket. Every attempt gets its own position from `incr`, so
+concurrent workers can never admit more than the limit between them. A
+refused attempt hands back what it took from the other buckets.
+
+The buckets are only shared when that cache is: with a local-memory cache
+every worker process has its own, multiplying the limits by the number of
+workers (check api.W002, and logged on first use). If the cache is
+unreachable the throttle fails open (logged and counted) rather than locking
+everyone out. Decisions are published as the 'login_throttle' metrics.
+"""
+
+import hashlib
+import logging
+import math
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import JsonResponse
+from rest_framework.throttling import BaseThrottle, UserRateThrottle
+
+from . import metrics
+from .checks import is_local_cache
+
+logger = logging.getLogger(__name__)
+
+
+def throttle_setting(name, default):
+    return getattr(settings, 'LOGIN_THROTTLE', {}).get(name, default)
+
+
+class LoginThrottle:
+    """Shared token buckets for password checks; `check()` before hashing."""
+
+    prefix = 'login-throttle'
+    scopes = ('GLOBAL', 'IP', 'ACCOUNT')
+
+    def __init__(self):
+        self.allowed = 0
+        self.rejected = {scope: 0 for scope in self.scopes}
+        self.cache_errors = 0
+        self._warned_local = False
+
+    @property
+    def shared(self):
+        return caches[throttle_setting('CACHE_ALIAS', 'default')]
+
+    def _buckets(self, ip, identity):
+        """(scope, cache key, burst, window in seconds) for each configured bucket."""
+        identity = (identity or '').strip().lower()
+        idents = {
+            'GLOBAL': 'all',
+            'IP': ip,
+            # Hashed: keeps keys short and cache-safe whatever the client sends
+            'ACCOUNT': hashlib.blake2b(identity.encode(), digest_size=16).hexdigest() if identity else None,
+        }
+        buckets = []
+        for scope in self.scopes:
+            limits = throttle_setting(scope, None)
+            if limits and idents[scope]:
+                burst, per_minute = limits
+                key = f'{self.prefix}:{scope.lower()}:{idents[scope]}'
+                buckets.append((scope, key, burst, burst * 60 / per_minute))
+        return buckets
+
+    def _take(self, key, window):
+        """Count one attempt in the current window of `key`; returns the new count."""
+        # Kept while it can still be the previous window
+        self.shared.add(key, 0, math.ceil(2 * window) + 1)
+        try:
+            return self.shared.incr(key)
+        except ValueError:
+            # Expired between add() and incr(); start it again
+            self.shared.add(key, 0, math.ceil(2 * window) + 1)
+            return self.shared.incr(key)
+
+    def _give_back(self, keys):
+        for key in keys:
+            try:
+                self.shared.decr(key)
+            except ValueError:
+                pass  # expired meanwhile: nothing left to give back
+
+    def _warn_if_local(self):
+        if not self._warned_local and is_local_cache(throttle_setting('CACHE_ALIAS', 'default')):
+            self._warned_local = True
+            logger.warning(
+                "LOGIN_THROTTLE['CACHE_ALIAS'] is a local-memory cache: every worker process has its "
+                "own login buckets, so the limits are multiplied by the number of workers"
+            )
+
+    def check(self, ip, identity):
+        """
+        Take one token from each bucket of this attempt.
+
+        Returns None when the attempt may proceed, otherwise the number of
+        seconds until it would be admitted. Nothing is taken when refused.
+        """
+        if not throttle_setting('ENABLED', True):
+            return None
+        self._warn_if_local()
+        now = time.time()
+        buckets = []
+        for scope, key, burst, window in self._buckets(ip, identity):
+            index, elapsed = divmod(now, window)
+            buckets.append((scope, burst, window, elapsed, f'{key}:{int(index)}', f'{key}:{int(index) - 1}'))
+        taken = []
+        try:
+            previous = self.shared.get_many([previous_key for *_, previous_key in buckets])
+            for scope, burst, window, elapsed, key, previous_key in buckets:
+                count = self._take(key, window)
+                taken.append(key)
+                # Share of the previous window still inside the sliding window
+                carried = previous.get(previous_key, 0) * (1 - elapsed / window)
+                if carried + count > burst:
+                    self.rejected[scope] += 1
+                    self._give_back(taken)
+                    if count > burst:
+                        # Full on its own: wait for the next window and for this one to slide out enough
+                        held = count - 1
+                        return max(1, math.ceil(window - elapsed + window * (1 - (burst - 1) / held)))
+                    # The carried-over part drains as the window slides on
+                    return max(1, math.ceil((carried + count - burst) * window / previous[previous_key]))
+        except Exception:
+            logger.exception("Login throttle cache unavailable; admitting the request")
+            self.cache_errors += 1
+            return None
+        self.allowed += 1
+        return None
+
+    def stats(self):
+        return {
+            'enabled': throttle_setting('ENABLED', True),
+            'allowed': self.allowed,
+            'rejected': dict(self.rejected),
+            'cache_errors': self.cache_errors,
+        }
+
+
+login_throttle = LoginThrottle()
+metrics.register('login_throttle', login_throttle.stats)
+
+
+def client_ip(request):
+    """Client address as DRF throttles see it (works for plain Django requests too)."""
+    return BaseThrottle().get_ident(request)
+
+
+def throttled_response(wait):
+    response = JsonResponse({'detail': f'Too many login attempts. Try again in {wait} seconds.'}, status=429)
+    response['Retry-After'] = str(wait)
+    return response
+
+
+class PasswordCheckThrottle(BaseThrottle):
+    """
+    DRF throttle for APIViews that check a password. The account is read from
+    request.data[view.throttle_identity_field] (default 'username').
+    """
+
+    def allow_request(self, request, view):
+        data = request.data
+        identity = data.get(getattr(view, 'throttle_identity_field', 'username')) if hasattr(data, 'get') else None
+        self._wait = login_throttle.check(self.get_ident(request), identity if isinstance(identity, str) else None)
+        return self._wait is None
+
+    def wait(self):
+        return self._wait
+
+
+class CatalogExportThrottle(UserRateThrottle):
+    """
+    Per-user rate for full catalog exports, each a scan of every product:
+    CATALOG_EXPORT['THROTTLE_RATE'] (DRF rate syntax, e.g. '10/hour'; None
+    disables it).
+    """
+
+    scope = 'catalog_export'
+
+    def get_rate(self):
+        return getattr(settings, 'CATALOG_EXPORT', {}).get('THROTTLE_RATE', '10/hour')
@@ -1,6 +1,6 @@
 # product and category API
 from django.urls import path
-from . import views
+from . import async_views, views
 from .views import RegisterView, search_products, bulk_create_products, CustomTokenObtainPairView, elasticsearch_fulltext_search
 from rest_framework_simplejwt.views import TokenRefreshView
 
@@ -11,8 +11,14 @@ urlpatterns = [
     path('token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
     path('user/', views.get_user_profile, name='user_profile'),
     
+    # Async auth endpoints (ASGI): hashing runs in the password process pool
+    path('async/login/', async_views.login, name='async_login'),
+    path('async/register/', async_views.register, name='async_register'),
+    path('async/token/', async_views.token, name='async_token'),
+    
     # Category endpoints
     path('categories/', views.CategoryListAPIView.as_view(), name='category-list'),
+    path('categories/stats/', views.CategoryStatsListAPIView.as_view(), name='category-stats'),
     path('categories/<int:id>/', views.CategoryDetailAPIView.as_view(), name='category-detail'),
     
     # Product endpoints
@@ -28,4 +34,7 @@ urlpatterns = [
     
     # Utility endpoints
     path('products/bulk_create/', bulk_create_products, name='bulk_create_products'),
+    path('products/import/', views.import_products_feed, name='import_products_feed'),
+    path('products/export/', views.export_products_feed, name='export_products_feed'),
+    path('metrics/', views.metrics_view, name='metrics'),
 ]
\ No newline at end of file
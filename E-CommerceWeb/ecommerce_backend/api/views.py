@@ -7,37 +7,68 @@ from rest_framework.response import Response
 from rest_framework import status
 from django.contrib.auth.models import User
 from rest_framework_simplejwt.tokens import RefreshToken
-from rest_framework.permissions import IsAuthenticated
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
+from rest_framework.decorators import api_view, permission_classes, throttle_classes
 from django.contrib.auth import authenticate
 from rest_framework_simplejwt.views import TokenObtainPairView
 from .serializers import RegisterSerializer
 
 from django.contrib.auth import authenticate
 from django.views.decorators.csrf import csrf_exempt
-from django.http import JsonResponse
+from django.http import JsonResponse, StreamingHttpResponse
+from django.core.serializers.json import DjangoJSONEncoder
+from django.conf import settings
+import io
 import json
+import logging
+import math
+import time
 
 from django.db import transaction, IntegrityError
+from django.utils.decorators import method_decorator
 
 from rest_framework import generics, filters
-from .models import Category, Product
-from .serializers import CategorySerializer, ProductSerializer
+from django.db.models import Value
+from django.db.models.functions import Coalesce
+from .models import Category, CategoryStats, Product
+from .serializers import CategorySerializer, CategoryStatsSerializer, ProductSerializer
+from .signals import catalog_changed
+from .cache import category_cache, product_cache, search_cache
+from .conditional import catalog_conditional
+from .throttling import CatalogExportThrottle, PasswordCheckThrottle, client_ip, login_throttle, throttled_response
+from .query_parser import parse_query
+from .circuit_breaker import elasticsearch_breaker, elasticsearch_request_timeout, is_elasticsearch_outage
+from .inverted_index import product_index
+from . import fulltext
+from .catalog_import import import_products, import_setting, iter_import_batches, read_rows
+from .catalog_export import CONTENT_TYPES, export_products, export_setting
+from . import metrics
+from .pagination import CursorPaginationOptInMixin, CategoryCursorPagination, ProductCursorPagination
+from .fast_serializers import FastListMixin, category_fast_serializer, product_fast_serializer
 
 from django_elasticsearch_dsl.search import Search
 from .documents import ProductDocument, CategoryDocument
 
+logger = logging.getLogger(__name__)
+
 
 class RegisterView(APIView):
     def post(self, request):
         serializer = RegisterSerializer(data=request.data)
         if serializer.is_valid():
-            serializer.save()
+            try:
+                serializer.save()
+            except IntegrityError:
+                # Lost a race with a concurrent registration (unique email/username index)
+                return Response({"non_field_errors": ["An account with this email or username already exists."]},
+                                status=status.HTTP_400_BAD_REQUEST)
             return Response({"message": "User registered successfully!"}, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
 class GetTokenView(APIView):
+    throttle_classes = [PasswordCheckThrottle]
+
     def post(self, request):
         username = request.data.get('username')
         password = request.data.get('password')
@@ -56,7 +87,12 @@ class GetTokenView(APIView):
 def register_user(request):
     serializer = RegisterSerializer(data=request.data)
     if serializer.is_valid():
-        serializer.save()
+        try:
+            serializer.save()
+        except IntegrityError:
+            # Lost a race with a concurrent registration (unique email/username index)
+            return Response({"non_field_errors": ["An account with this email or username already exists."]},
+                            status=status.HTTP_400_BAD_REQUEST)
         return Response({"message": "User registered successfully!"}, status=status.HTTP_201_CREATED)
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -65,6 +101,9 @@ class CustomTokenObtainPairView(TokenObtainPairView):
     """
     Custom JWT login view with better error handling
     """
+    throttle_classes = [PasswordCheckThrottle]
+    throttle_identity_field = 'email'
+
     def post(self, request, *args, **kwargs):
         email = request.data.get('email')
         password = request.data.get('password')
@@ -74,12 +113,8 @@ class CustomTokenObtainPairView(TokenObtainPairView):
                 'detail': 'Invalid email or password'
             }, status=status.HTTP_400_BAD_REQUEST)
         
-        # Try to find user by email and authenticate
-        try:
-            user_obj = User.objects.get(email=email)
-            user = authenticate(username=user_obj.username, password=password)
-        except User.DoesNotExist:
-            user = None
+        # Look up by email and verify in one step (api.backends.EmailBackend)
+        user = authenticate(request, email=email, password=password)
         
         if user is not None:
             # Generate JWT tokens
@@ -123,55 +158,128 @@ def bulk_create_products(request):
     """
     Accepts a JSON array of product objects and bulk-creates them.
     Each object should contain: pdt_id, pdt_name, pdt_mrp, pdt_dis_price, pdt_qty, ct_id
+
+    Existing pdt_ids are updated in place (?upsert=false to insert only).
+    Rows are written in batches of ?batch_size= (CATALOG_IMPORT['BATCH_SIZE']).
+    By default any invalid row rejects the whole import; with ?partial=true
+    each batch commits on its own and invalid rows are skipped and reported.
     """
     data = request.data
     if not isinstance(data, list):
         return Response({"error": "Expected a JSON array"}, status=status.HTTP_400_BAD_REQUEST)
 
-    created = 0
-    errors = []
-    objs = []
+    try:
+        batch_size = int(request.query_params.get('batch_size') or import_setting('BATCH_SIZE', 1000))
+    except ValueError:
+        return Response({"error": "batch_size must be an integer"}, status=status.HTTP_400_BAD_REQUEST)
+    if batch_size < 1:
+        return Response({"error": "batch_size must be positive"}, status=status.HTTP_400_BAD_REQUEST)
+    partial = request.query_params.get('partial', '').lower() in ('1', 'true', 'yes')
+    upsert = request.query_params.get('upsert', 'true').lower() not in ('0', 'false', 'no')
 
-    with transaction.atomic():
-        for i, item in enumerate(data, start=1):
-            try:
-                # validate required fields
-                for f in ("pdt_id", "pdt_name", "pdt_mrp", "pdt_qty", "ct_id"):
-                    if f not in item:
-                        raise ValueError(f"Missing field: {f}")
+    try:
+        result = import_products(data, batch_size=batch_size, partial=partial, upsert=upsert)
+    except IntegrityError as e:
+        return Response({"error": "DB integrity error", "detail": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-                ct_id = item.get("ct_id")
-                try:
-                    category = Category.objects.get(ct_id=ct_id)
-                except Category.DoesNotExist:
-                    raise ValueError(f"Category ct_id={ct_id} does not exist")
-
-                # create Product instance (do not save yet)
-                p = Product(
-                    pdt_id = item.get("pdt_id"),
-                    pdt_name = item.get("pdt_name"),
-                    pdt_mrp = item.get("pdt_mrp"),
-                    pdt_dis_price = item.get("pdt_dis_price"),
-                    pdt_qty = item.get("pdt_qty"),
-                    ct = category
-                )
-                objs.append(p)
-            except Exception as e:
-                errors.append({"index": i, "error": str(e), "item": item})
-
-        # If there were any validation errors, roll back and return
-        if errors:
-            return Response({"created": 0, "errors": errors}, status=status.HTTP_400_BAD_REQUEST)
+    if not result["created"] and result["errors"]:
+        # If there were any validation errors, nothing was written
+        return Response(result, status=status.HTTP_400_BAD_REQUEST)
+    if result["errors"]:
+        return Response(result, status=status.HTTP_207_MULTI_STATUS)
+    return Response(result, status=status.HTTP_201_CREATED)
 
-        try:
-            Product.objects.bulk_create(objs)
-            created = len(objs)
-        except IntegrityError as e:
-            return Response({"error": "DB integrity error", "detail": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-    return Response({"created": created}, status=status.HTTP_201_CREATED)
+# Content types accepted by import_products_feed
+IMPORT_FORMATS = {
+    'application/x-ndjson': 'ndjson',
+    'application/jsonl': 'ndjson',
+    'application/json-lines': 'ndjson',
+    'text/csv': 'csv',
+}
 
 
+@api_view(['POST'])
+@permission_classes([IsAdminUser])
+def import_products_feed(request):
+    """
+    Streaming catalog import: NDJSON (one product object per line) or CSV
+    (header row with the product field names) in the request body, optionally
+    with Content-Encoding: gzip. The body is read incrementally and rows are
+    validated and upserted in batches of ?batch_size=, each committed on its
+    own. The response streams one NDJSON progress line per batch, with the
+    errors of that batch keyed by line number, then a summary line.
+    Chunked uploads (no Content-Length) get 411 unless the server de-chunks
+    them. Admin users only.
+    """
+    content_type = request.content_type.split(';')[0].strip().lower()
+    fmt = request.query_params.get('type') or IMPORT_FORMATS.get(content_type)
+    if fmt not in ('ndjson', 'csv'):
+        return Response(
+            {"error": "Send NDJSON (application/x-ndjson) or CSV (text/csv), or pass ?type=ndjson|csv"},
+            status=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+        )
+    try:
+        batch_size = int(request.query_params.get('batch_size') or import_setting('BATCH_SIZE', 1000))
+    except ValueError:
+        return Response({"error": "batch_size must be an integer"}, status=status.HTTP_400_BAD_REQUEST)
+    if batch_size < 1:
+        return Response({"error": "batch_size must be positive"}, status=status.HTTP_400_BAD_REQUEST)
+    upsert = request.query_params.get('upsert', 'true').lower() not in ('0', 'false', 'no')
+    compressed = request.headers.get('Content-Encoding', '').lower() == 'gzip'
+
+    # request.stream is the unparsed body; request.data is never touched.
+    # Without a Content-Length (a chunked upload) Django reads nothing, so the
+    # raw input is only usable when the server has de-chunked it and marks
+    # the end of the body (wsgi.input_terminated, e.g. gunicorn, mod_wsgi)
+    if 'CONTENT_LENGTH' in request.META:
+        stream = request.stream if request.stream is not None else io.BytesIO()
+    elif request.META.get('wsgi.input_terminated'):
+        stream = request.META['wsgi.input']
+    else:
+        return Response({"error": "Send a Content-Length header"}, status=status.HTTP_411_LENGTH_REQUIRED)
+    rows = read_rows(stream, fmt, compressed=compressed)
+
+    def progress():
+        totals = {"done": True, "rows": 0, "written": 0, "failed": 0}
+        for batch in iter_import_batches(rows, batch_size=batch_size, upsert=upsert):
+            totals["rows"] += batch["rows"]
+            totals["written"] += batch["written"]
+            totals["failed"] += batch["rows"] - batch["written"]
+            yield json.dumps(batch, cls=DjangoJSONEncoder) + "\n"
+        yield json.dumps(totals) + "\n"
+
+    return StreamingHttpResponse(progress(), content_type='application/x-ndjson', status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+@throttle_classes([CatalogExportThrottle])
+def export_products_feed(request):
+    """
+    Stream every product with its category as NDJSON (default) or CSV
+    (?type=csv), gzipped with ?gzip=1. Rows are read in keyset chunks of
+    ?chunk_size= straight from values_list, so memory stays flat for any
+    catalog size. Admin users only, at CATALOG_EXPORT['THROTTLE_RATE'].
+    """
+    fmt = request.query_params.get('type', 'ndjson')
+    if fmt not in CONTENT_TYPES:
+        return Response({"error": "type must be ndjson or csv"}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        chunk_size = int(request.query_params.get('chunk_size') or export_setting('CHUNK_SIZE', 2000))
+    except ValueError:
+        return Response({"error": "chunk_size must be an integer"}, status=status.HTTP_400_BAD_REQUEST)
+    chunk_size = max(1, min(chunk_size, export_setting('MAX_CHUNK_SIZE', 20000)))
+    compressed = request.query_params.get('gzip', '').lower() in ('1', 'true', 'yes')
+
+    filename = f"products.{fmt}" + (".gz" if compressed else "")
+    response = StreamingHttpResponse(
+        export_products(fmt, compressed=compressed, chunk_size=chunk_size),
+        content_type='application/gzip' if compressed else CONTENT_TYPES[fmt],
+    )
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
 
 @csrf_exempt
 def login_user(request):
@@ -181,6 +289,10 @@ def login_user(request):
             username = data.get('username')
             password = data.get('password')
 
+            wait = login_throttle.check(client_ip(request), username if isinstance(username, str) else None)
+            if wait is not None:
+                return throttled_response(wait)
+
             user = authenticate(username=username, password=password)
             if user is not None:
                 return JsonResponse({"message": "Login successful"})
@@ -192,19 +304,51 @@ def login_user(request):
         return JsonResponse({"error": "POST request required"}, status=400)
 
     
-class CategoryListAPIView(generics.ListAPIView):
-    queryset = Category.objects.all().order_by('ct_id')
+def category_queryset():
+    # products_count comes from the materialized CategoryStats row via one join
+    return Category.objects.annotate(products_count=Coalesce('stats__product_count', Value(0)))
+
+
+@method_decorator(catalog_conditional, name='dispatch')
+class CategoryListAPIView(FastListMixin, CursorPaginationOptInMixin, generics.ListAPIView):
+    queryset = category_queryset().order_by('ct_id')
     serializer_class = CategorySerializer
+    fast_serializer = category_fast_serializer
+    cursor_pagination_class = CategoryCursorPagination
 
 # get single category (optional)
+@method_decorator(catalog_conditional, name='dispatch')
 class CategoryDetailAPIView(generics.RetrieveAPIView):
-    queryset = Category.objects.all()
+    queryset = category_queryset()
     serializer_class = CategorySerializer
     lookup_field = 'ct_id'
+    lookup_url_kwarg = 'id'
+
+    def retrieve(self, request, *args, **kwargs):
+        payload = category_cache.get_or_load(
+            kwargs[self.lookup_url_kwarg],
+            lambda: category_fast_serializer.to_representation(generics.get_object_or_404(
+                category_fast_serializer.values(self.get_queryset()), ct_id=kwargs[self.lookup_url_kwarg]
+            )),
+        )
+        return Response(payload)
+
+# per-category product count, in-stock count and price range (no aggregation at request time)
+@method_decorator(catalog_conditional, name='dispatch')
+class CategoryStatsListAPIView(generics.ListAPIView):
+    queryset = CategoryStats.objects.select_related('ct').order_by('ct_id')
+    serializer_class = CategoryStatsSerializer
+    pagination_class = None
 
 # list products (optionally filter by category via query param)
-class ProductListAPIView(generics.ListAPIView):
+# ?pagination=cursor switches to keyset pagination (no COUNT, no OFFSET)
+# rows are serialized from values() by the fast path (same JSON as ProductSerializer)
+# catalog read endpoints answer If-None-Match with 304 (api/conditional.py)
+@method_decorator(catalog_conditional, name='dispatch')
+class ProductListAPIView(FastListMixin, CursorPaginationOptInMixin, generics.ListAPIView):
     serializer_class = ProductSerializer
+    fast_serializer = product_fast_serializer
+    cursor_pagination_class = ProductCursorPagination
     filter_backends = [filters.SearchFilter]
     search_fields = ['pdt_name']
 
@@ -216,174 +360,314 @@ class ProductListAPIView(generics.ListAPIView):
         return qs
 
 # product detail
+@method_decorator(catalog_conditional, name='dispatch')
 class ProductDetailAPIView(generics.RetrieveAPIView):
     queryset = Product.objects.select_related('ct').all()
     serializer_class = ProductSerializer
     lookup_field = 'pdt_id'
+    lookup_url_kwarg = 'id'
+
+    def retrieve(self, request, *args, **kwargs):
+        payload = product_cache.get_or_load(
+            kwargs[self.lookup_url_kwarg],
+            lambda: product_fast_serializer.to_representation(generics.get_object_or_404(
+                product_fast_serializer.values(self.get_queryset()), pdt_id=kwargs[self.lookup_url_kwarg]
+            )),
+        )
+        return Response(payload)
+
+
+@api_view(['GET'])
+def metrics_view(request):
+    """
+    Per-worker counters (cache hit/miss/eviction, ...) for capacity sizing.
+    """
+    return Response(metrics.snapshot(), status=status.HTTP_200_OK)
+
+
+# Document fields rendered by the search endpoints (_source filtering)
+SEARCH_SOURCE_FIELDS = ['pdt_id', 'pdt_name', 'pdt_mrp', 'pdt_dis_price', 'pdt_qty', 'ct.ct_name']
+
+
+def cached_search_response(payload):
+    """
+    Response for a search payload served from the search result cache, with
+    the current circuit breaker state as on a fresh response.
+    """
+    response = Response({**payload, "circuit_breaker": elasticsearch_breaker.state}, status=status.HTTP_200_OK)
+    response['X-Cache'] = 'HIT'
+    return response
+
+
+def _page_and_size(request, default_size):
+    """Positive integer page/size query parameters; ValueError if malformed."""
+    page, size = request.GET.get('page') or 1, request.GET.get('size') or default_size
+    try:
+        page, size = int(page), int(size)
+    except ValueError:
+        raise ValueError("'page' and 'size' must be integers")
+    if page < 1 or size < 1:
+        raise ValueError("'page' and 'size' must be at least 1")
+    return page, size
+
+
+def _price_param(request, name, default=None):
+    """A finite price query parameter (or the default); ValueError if malformed."""
+    value = request.GET.get(name)
+    if not value:
+        return default
+    try:
+        value = float(value)
+    except ValueError:
+        raise ValueError(f"'{name}' must be a number")
+    if not math.isfinite(value):
+        raise ValueError(f"'{name}' must be a number")
+    return value
+
 
 #new
+@catalog_conditional
 @api_view(['GET'])
 def search_products(request):
-    import re
-    from django.db.models import Q as DJQ
-
     q = request.GET.get('q', '').strip()
     if not q:
         return Response({"products": [], "categories": []}, status=status.HTTP_200_OK)
 
-    page = int(request.GET.get('page', 1))
-    size = int(request.GET.get('size', 100))  # Increased to show more results
+    try:
+        page, size = _page_and_size(request, 100)  # Increased to show more results
+    except ValueError as e:
+        return Response({"error": str(e), "products": [], "categories": []}, status=status.HTTP_400_BAD_REQUEST)
     start = (page - 1) * size
 
-    # --- Extract price filter and color/attributes ---
-    q_lower = q.lower()
-    price_filter = None
-    color_filter = None
-    
-    # Extract price with better regex
-    price_match = re.search(r'(\d{3,7})', q_lower)
-    if price_match:
-        amount = float(price_match.group(1))
-        if any(word in q_lower for word in ["under", "below", "less", "upto", "up to"]):
-            price_filter = ("lte", amount)
-        elif any(word in q_lower for word in ["over", "above", "greater", "more than"]):
-            price_filter = ("gte", amount)
-
-    # Extract color (if mentioned)
-    colors = ["black", "white", "red", "blue", "green", "yellow", "pink", "grey", "gray", "brown", "purple", "orange"]
-    for color in colors:
-        if color in q_lower:
-            color_filter = color
-            break
-
-    # Clean query for better text search - remove price and filter words
-    search_query = re.sub(r'\b(under|below|less|over|above|greater|than|upto|up to|more than|more|in|with|\d{3,7})\b', '', q_lower).strip()
-    if color_filter:
-        search_query = search_query.replace(color_filter, '').strip()
+    # --- Extract price filter, color and the cleaned text query ---
+    parsed = parse_query(q)
+    search_query = parsed.text
+    price_filter = parsed.price_filter
+    color_filter = parsed.color
+
+    # --- Serve repeated queries from the result cache ---
+    cache_key = (search_query, price_filter, color_filter, page, size)
+    cached = search_cache.get('search_products', cache_key)
+    if cached is not None:
+        return cached_search_response(cached)
+
+    # --- Try Elasticsearch first (skipped while the circuit breaker is open) ---
+    if elasticsearch_breaker.allow_request():
+        started = time.monotonic()
+        try:
+            products = _elasticsearch_product_search(search_query, price_filter, color_filter, start, size)
+        except Exception as e:
+            if is_elasticsearch_outage(e):
+                elasticsearch_breaker.record_failure()
+                logger.warning("Elasticsearch search failed, using fallback search: %s", e)
+            else:
+                logger.exception("Elasticsearch search failed, using fallback search")
+        else:
+            elasticsearch_breaker.record_success(time.monotonic() - started)
+            payload = {"products": products, "categories": [], "using": "elasticsearch", "total": len(products)}
+            search_cache.set('search_products', cache_key, payload)
+            return Response({**payload, "circuit_breaker": elasticsearch_breaker.state}, status=200)
+
+    # --- Fallback: in-process inverted index or MySQL FULLTEXT, else a DB icontains search ---
+    fallback_mode = getattr(settings, 'SEARCH_FALLBACK_MODE', 'inverted_index')
+    boolean_query = fulltext.boolean_query(search_query) if fallback_mode == 'fulltext' and fulltext.available() else ''
+    if fallback_mode == 'inverted_index' and product_index.ready:
+        products, _ = product_index.search(search_query, price_filter, color_filter, start, size)
+        using = "inverted_index_fallback"
+    elif boolean_query:
+        products = _fulltext_fallback_search(search_query, boolean_query, price_filter, color_filter, start, size)
+        using = "fulltext_fallback"
+    else:
+        products = _database_fallback_search(search_query, price_filter, color_filter, start, size)
+        using = "database_fallback"
+
+    # Return only products (no categories) in fallback mode; degraded results
+    # are not cached by clients (and get no ETag)
+    response = Response({
+        "products": products,
+        "categories": [],
+        "using": using,
+        "circuit_breaker": elasticsearch_breaker.state,
+    }, status=200)
+    response['Cache-Control'] = 'no-store'
+    return response
+
+
+def _database_fallback_search(search_query, price_filter, color_filter, start, size):
+    """Relevance-tiered icontains search over products and category names."""
+    from django.db.models import Q as DJQ
+    from django.db.models import Case, When, Value, IntegerField
     
-    # Remove extra spaces
-    search_query = ' '.join(search_query.split())
+    # Search in product name AND category name
+    # If category matches, show all products in that category
+    pqs = Product.objects.select_related('ct').filter(
+        DJQ(pdt_name__icontains=search_query) |
+        DJQ(ct__ct_name__icontains=search_query)
+    ).annotate(
+        relevance=Case(
+            # Exact match in category name = highest priority (show all products)
+            When(ct__ct_name__iexact=search_query, then=Value(100)),
+            # Exact match in product name = very high priority
+            When(pdt_name__iexact=search_query, then=Value(90)),
+            # Starts with search query in product name = high priority
+            When(pdt_name__istartswith=search_query, then=Value(80)),
+            # Contains in product name = medium priority
+            When(pdt_name__icontains=search_query, then=Value(60)),
+            # Contains in category name = low priority
+            When(ct__ct_name__icontains=search_query, then=Value(40)),
+            default=Value(0),
+            output_field=IntegerField()
+        )
+    ).order_by('-relevance', 'pdt_id')
     
-    if not search_query:
-        search_query = q_lower  # Fallback to original query
+    # Apply price and color filters
+    pqs = _filter_fallback(pqs, price_filter, color_filter)
     
-    # --- Try Elasticsearch first ---
-    try:
-        from elasticsearch_dsl import Q
-        
-        ps = ProductDocument.search()
-        
-        # Build a bool query with should clauses for better semantic matching
-        # This allows matching on product name OR category name with synonyms
-        bool_query = Q('bool', should=[
-            # Match in product name with high boost and synonym support
-            Q('match', pdt_name={'query': search_query, 'boost': 3.0, 'fuzziness': 'AUTO'}),
-            
-            # Match in category name with very high boost (for category-based searches)
-            Q('match', **{'ct.ct_name': {'query': search_query, 'boost': 5.0, 'fuzziness': 'AUTO'}}),
-            
-            # Match in category description
-            Q('match', **{'ct.ct_description': {'query': search_query, 'boost': 1.0}}),
-            
-            # Wildcard match for partial matches
-            Q('wildcard', pdt_name={'value': f'*{search_query}*', 'boost': 1.5}),
-            Q('wildcard', **{'ct.ct_name': {'value': f'*{search_query}*', 'boost': 2.0}}),
-        ], minimum_should_match=1)
-        
-        ps = ps.query(bool_query)
-        
-        # Apply price filter
-        if price_filter:
-            op, val = price_filter
-            ps = ps.filter("range", **{"pdt_dis_price": {op: val}})
-        
-        # Apply color filter if specified
-        if color_filter:
-            ps = ps.query("match", pdt_name=color_filter)
-        
-        # Sort by relevance score (default) and limit results
-        ps = ps[start:start + size]
-        presults = ps.execute()
+    return [_fallback_product(p) for p in pqs[start:start + size]]
+
+
+def _fallback_product(p):
+    return {
+        "pdt_id": p.pdt_id,
+        "pdt_name": p.pdt_name,
+        "pdt_mrp": float(p.pdt_mrp),
+        "pdt_dis_price": float(p.pdt_dis_price) if p.pdt_dis_price is not None else None,
+        "pdt_qty": p.pdt_qty,
+        "category": p.ct.ct_name if p.ct else None,
+    }
+
+
+def _filter_fallback(pqs, price_filter, color_filter):
+    if price_filter:
+        op, val = price_filter
+        if op == "lte":
+            pqs = pqs.filter(pdt_dis_price__lte=val)
+        else:
+            pqs = pqs.filter(pdt_dis_price__gte=val)
+    if color_filter:
+        pqs = pqs.filter(pdt_name__icontains=color_filter)
+    return pqs
 
-        products = []
-        for hit in presults:
-            
-            ct = getattr(hit, "ct", None)
-            category_name = None
-            if ct:
-                try:
-                    category_name = ct.get("ct_name") if hasattr(ct, "get") else getattr(ct, "ct_name", None)
-                except Exception:
-                    pass
-            
-            product_data = {
-                "pdt_id": getattr(hit, "pdt_id", None),
-                "pdt_name": getattr(hit, "pdt_name", None),
-                "pdt_mrp": getattr(hit, "pdt_mrp", None),
-                "pdt_dis_price": getattr(hit, "pdt_dis_price", None),
-                "pdt_qty": getattr(hit, "pdt_qty", None),
-                "category": category_name,
-                "score": hit.meta.score if hasattr(hit.meta, 'score') else None,
-            }
-            products.append(product_data)
 
-        return Response({"products": products, "categories": [], "using": "elasticsearch", "total": len(products)}, status=200)
+def _fulltext_fallback_search(search_query, boolean_query, price_filter, color_filter, start, size):
+    """
+    _database_fallback_search's relevance tiers, with product names matched
+    through the FULLTEXT index (api/fulltext.py) instead of a LIKE scan.
+
+    Name matches (exact 90, prefix 80, other 60, then MATCH score) and
+    products of matching categories (exact name 100, partial 40) are read as
+    two index-driven queries of start + size rows each and merged; a product
+    found by both keeps its higher tier.
+    """
+    from django.db.models import Case, When, Value, IntegerField
+
+    limit = start + size
+    ranked = {}
+
+    name_matches = _filter_fallback(
+        Product.objects.select_related('ct').filter(fulltext.matches('pdt_name', boolean_query)),
+        price_filter, color_filter,
+    ).annotate(
+        score=fulltext.MatchAgainst('pdt_name', boolean_query),
+        relevance=Case(
+            When(pdt_name__iexact=search_query, then=Value(90)),
+            When(pdt_name__istartswith=search_query, then=Value(80)),
+            default=Value(60),
+            output_field=IntegerField()
+        ),
+    ).order_by('-relevance', '-score', 'pdt_id')[:limit]
+    for p in name_matches:
+        ranked[p.pdt_id] = ((-p.relevance, -p.score, p.pdt_id), p)
+
+    # The categories table is small; its matches are resolved up front
+    category_tiers = {
+        ct_id: 100 if ct_name.lower() == search_query.lower() else 40
+        for ct_id, ct_name in Category.objects.filter(ct_name__icontains=search_query).values_list('ct_id', 'ct_name')
+    }
+    for tier in (100, 40):
+        ct_ids = [ct_id for ct_id, ct_tier in category_tiers.items() if ct_tier == tier]
+        if not ct_ids:
+            continue
+        category_products = _filter_fallback(
+            Product.objects.select_related('ct').filter(ct_id__in=ct_ids), price_filter, color_filter,
+        ).order_by('pdt_id')[:limit]
+        for p in category_products:
+            key = (-tier, 0.0, p.pdt_id)
+            if p.pdt_id not in ranked or key < ranked[p.pdt_id][0]:
+                ranked[p.pdt_id] = (key, p)
+
+    ordered = sorted(ranked.values(), key=lambda entry: entry[0])
+    return [_fallback_product(p) for _, p in ordered[start:limit]]
+
+
+def _elasticsearch_product_search(search_query, price_filter, color_filter, start, size):
+    """Run the search_products bool query against Elasticsearch and format the hits."""
+    from elasticsearch_dsl import Q
     
-    except Exception as e:
-        import traceback
-        print(f"❌ Elasticsearch error: {str(e)}")
-        print(f"❌ Traceback: {traceback.format_exc()}")
-        # --- Fallback to simple DB icontains search ---
-        from django.db.models import Case, When, Value, IntegerField
-        
-        # Search in product name AND category name
-        # If category matches, show all products in that category
-        pqs = Product.objects.select_related('ct').filter(
-            DJQ(pdt_name__icontains=search_query) |
-            DJQ(ct__ct_name__icontains=search_query)
-        ).annotate(
-            relevance=Case(
-                # Exact match in category name = highest priority (show all products)
-                When(ct__ct_name__iexact=search_query, then=Value(100)),
-                # Exact match in product name = very high priority
-                When(pdt_name__iexact=search_query, then=Value(90)),
-                # Starts with search query in product name = high priority
-                When(pdt_name__istartswith=search_query, then=Value(80)),
-                # Contains in product name = medium priority
-                When(pdt_name__icontains=search_query, then=Value(60)),
-                # Contains in category name = low priority
-                When(ct__ct_name__icontains=search_query, then=Value(40)),
-                default=Value(0),
-                output_field=IntegerField()
-            )
-        ).order_by('-relevance', 'pdt_id')
+    # Bound the call by the per-request budget instead of the client's connection timeout
+    client = ProductDocument._get_connection().options(request_timeout=elasticsearch_request_timeout())
+    ps = ProductDocument.search(using=client)
+    
+    # Build a bool query with should clauses for better semantic matching
+    # This allows matching on product name OR category name with synonyms
+    bool_query = Q('bool', should=[
+        # Match in product name with high boost and synonym support
+        Q('match', pdt_name={'query': search_query, 'boost': 3.0, 'fuzziness': 'AUTO'}),
         
-        # Apply price filter
-        if price_filter:
-            op, val = price_filter
-            if op == "lte":
-                pqs = pqs.filter(pdt_dis_price__lte=val)
-            else:
-                pqs = pqs.filter(pdt_dis_price__gte=val)
+        # Match in category name with very high boost (for category-based searches)
+        Q('match', **{'ct.ct_name': {'query': search_query, 'boost': 5.0, 'fuzziness': 'AUTO'}}),
         
-        # Apply color filter
-        if color_filter:
-            pqs = pqs.filter(pdt_name__icontains=color_filter)
+        # Match in category description
+        Q('match', **{'ct.ct_description': {'query': search_query, 'boost': 1.0}}),
         
-        pqs = pqs[start:start + size]
-        products = [{
-            "pdt_id": p.pdt_id,
-            "pdt_name": p.pdt_name,
-            "pdt_mrp": float(p.pdt_mrp),
-            "pdt_dis_price": float(p.pdt_dis_price) if p.pdt_dis_price is not None else None,
-            "pdt_qty": p.pdt_qty,
-            "category": p.ct.ct_name if p.ct else None,
-        } for p in pqs]
-
-        # Return only products (no categories) in fallback mode
-        return Response({"products": products, "categories": [], "using": "database_fallback"}, status=200)
-
+        # Partial matches via the n-gram subfields (every gram of the query must match)
+        Q('match', **{'pdt_name.ngram': {'query': search_query, 'operator': 'and', 'boost': 1.5}}),
+        Q('match', **{'ct.ct_name.ngram': {'query': search_query, 'operator': 'and', 'boost': 2.0}}),
+    ], minimum_should_match=1)
+    
+    ps = ps.query(bool_query)
+    
+    # Apply price filter
+    if price_filter:
+        op, val = price_filter
+        ps = ps.filter("range", **{"pdt_dis_price": {op: val}})
+    
+    # Apply color filter if specified
+    if color_filter:
+        ps = ps.query("match", pdt_name=color_filter)
+    
+    # Only fetch the fields we render; the total is len(products), so skip hit counting
+    ps = ps.source(SEARCH_SOURCE_FIELDS).extra(track_total_hits=False)
+    
+    # Sort by relevance score (default) and limit results
+    ps = ps[start:start + size]
+    presults = ps.execute()
 
+    products = []
+    for hit in presults:
+        
+        ct = getattr(hit, "ct", None)
+        category_name = None
+        if ct:
+            try:
+                category_name = ct.get("ct_name") if hasattr(ct, "get") else getattr(ct, "ct_name", None)
+            except Exception:
+                pass
+        
+        product_data = {
+            "pdt_id": getattr(hit, "pdt_id", None),
+            "pdt_name": getattr(hit, "pdt_name", None),
+            "pdt_mrp": getattr(hit, "pdt_mrp", None),
+            "pdt_dis_price": getattr(hit, "pdt_dis_price", None),
+            "pdt_qty": getattr(hit, "pdt_qty", None),
+            "category": category_name,
+            "score": hit.meta.score if hasattr(hit.meta, 'score') else None,
+        }
+        products.append(product_data)
+    return products
+
+
+@catalog_conditional
 @api_view(['GET'])
 def elasticsearch_fulltext_search(request):
     """
@@ -398,6 +682,11 @@ def elasticsearch_fulltext_search(request):
     - min_price: Minimum price filter
     - max_price: Maximum price filter
     
+    A colour in the query ("red shirt") must appear in the product name.
+    
+    `total` is exact up to settings.SEARCH_TRACK_TOTAL_HITS; beyond that it is a
+    lower bound and `total_relation` is "gte" (display as e.g. "10000+").
+    
     Example: /api/elasticsearch-search/?q=laptop&size=10&min_price=500&max_price=2000
     """
     from elasticsearch_dsl import Q
@@ -411,27 +700,52 @@ def elasticsearch_fulltext_search(request):
             "total": 0
         }, status=status.HTTP_400_BAD_REQUEST)
     
-    page = int(request.GET.get('page', 1))
-    size = int(request.GET.get('size', 20))
+    # Malformed parameters are the client's fault: reject them before they
+    # reach Elasticsearch (and the circuit breaker)
+    parsed = parse_query(query)
+    try:
+        page, size = _page_and_size(request, 20)
+        # Price filters (explicit parameters win over "under 2000" in the query)
+        min_price = _price_param(request, 'min_price', parsed.min_price)
+        max_price = _price_param(request, 'max_price', parsed.max_price)
+    except ValueError as e:
+        return Response({
+            "error": str(e),
+            "products": [],
+            "total": 0
+        }, status=status.HTTP_400_BAD_REQUEST)
     start = (page - 1) * size
     
     # Get search fields (default to product name and category name)
     fields_param = request.GET.get('fields', 'pdt_name,ct.ct_name')
     search_fields = [f.strip() for f in fields_param.split(',')]
     
-    # Price filters
-    min_price = request.GET.get('min_price')
-    max_price = request.GET.get('max_price')
+    # Serve repeated queries from the result cache (echoing this request's query)
+    cache_key = (parsed.text, parsed.color, tuple(search_fields), min_price, max_price, page, size)
+    cached = search_cache.get('elasticsearch_fulltext_search', cache_key)
+    if cached is not None:
+        return cached_search_response({**cached, "query": query})
+    
+    # Fail fast while Elasticsearch is known to be down
+    if not elasticsearch_breaker.allow_request():
+        return Response({
+            "error": "Elasticsearch search unavailable",
+            "products": [],
+            "total": 0,
+            "circuit_breaker": elasticsearch_breaker.state
+        }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
     
+    started = time.monotonic()
     try:
-        # Initialize search
-        search = ProductDocument.search()
+        # Initialize search, bounded by the per-request time budget
+        client = ProductDocument._get_connection().options(request_timeout=elasticsearch_request_timeout())
+        search = ProductDocument.search(using=client)
         
         # Build multi_match query for full-text search across multiple fields
         # This uses Elasticsearch's relevance scoring algorithm
         search = search.query(
             "multi_match",
-            query=query,
+            query=parsed.text,
             fields=search_fields,
             type="best_fields",  # Uses the best matching field's score
             fuzziness="AUTO",     # Handles typos automatically
@@ -440,20 +754,28 @@ def elasticsearch_fulltext_search(request):
         )
         
         # Apply price range filters if provided
-        if min_price or max_price:
+        if min_price is not None or max_price is not None:
             price_range = {}
-            if min_price:
-                price_range['gte'] = float(min_price)
-            if max_price:
-                price_range['lte'] = float(max_price)
+            if min_price is not None:
+                price_range['gte'] = min_price
+            if max_price is not None:
+                price_range['lte'] = max_price
             search = search.filter("range", pdt_dis_price=price_range)
         
-        # Get total count before pagination
-        total_count = search.count()
+        # The parser takes colour words out of the text; require them in the name
+        if parsed.color:
+            search = search.query("match", pdt_name=parsed.color)
+        
+        # One round trip: the total comes from the search response itself, and
+        # ES stops counting exactly past SEARCH_TRACK_TOTAL_HITS (total_relation "gte")
+        search = search.extra(track_total_hits=getattr(settings, 'SEARCH_TRACK_TOTAL_HITS', 10000))
+        search = search.source(SEARCH_SOURCE_FIELDS)
         
         # Apply pagination and execute
         search = search[start:start + size]
         results = search.execute()
+        total_count = results.hits.total.value
+        total_relation = results.hits.total.relation
         
         # Format results with relevance scores
         products = []
@@ -477,25 +799,31 @@ def elasticsearch_fulltext_search(request):
             }
             products.append(product_data)
         
-        return Response({
+        payload = {
             "query": query,
             "total": total_count,
+            "total_relation": total_relation,
             "page": page,
             "size": size,
             "products": products,
             "search_engine": "elasticsearch",
             "search_type": "multi_match_fulltext"
-        }, status=status.HTTP_200_OK)
+        }
+        elasticsearch_breaker.record_success(time.monotonic() - started)
+        search_cache.set('elasticsearch_fulltext_search', cache_key, payload)
+        return Response({**payload, "circuit_breaker": elasticsearch_breaker.state}, status=status.HTTP_200_OK)
     
     except Exception as e:
-        import traceback
-        error_trace = traceback.format_exc()
-        print(f"❌ Elasticsearch error: {str(e)}")
-        print(f"❌ Traceback: {error_trace}")
+        if is_elasticsearch_outage(e):
+            elasticsearch_breaker.record_failure()
+            logger.warning("Elasticsearch full-text search failed: %s", e)
+        else:
+            logger.exception("Elasticsearch full-text search failed")
         
         return Response({
             "error": "Elasticsearch search failed",
             "detail": str(e),
             "products": [],
-            "total": 0
+            "total": 0,
+            "circuit_breaker": elasticsearch_breaker.state
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
\ No newline at end of file
@@ -0,0 +1,113 @@
+#!/usr/bin/env python
+"""
+Bulk indexing throughput (docs/s) of api.search_indexing.bulk_index_products.
+
+Indexes generated (unsaved) products into a throwaway index built from the
+ProductDocument settings and mapping, once per configuration:
+
+    sequential      1 thread, refresh on  (one bulk request at a time)
+    parallel        N threads, refresh on
+    parallel+norefresh  N threads, refresh_interval -1 during the load
+
+Usage:
+    python benchmark_bulk_indexing.py                  # 200,000 docs
+    python benchmark_bulk_indexing.py --docs 50000 --chunk-size 1000 --threads 8
+"""
+
+import argparse
+import os
+import random
+from decimal import Decimal
+
+import django
+
+# Setup Django environment
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ecommerce_backend.settings')
+django.setup()
+
+from django.test.utils import override_settings
+
+from api.documents import ProductDocument
+from api.models import Category, Product
+from api.search_indexing import bulk_index_products
+
+INDEX = 'products-bulk-benchmark'
+
+CATEGORIES = ["Electronics", "Fashion", "Home & Kitchen", "Books", "Sports & Fitness", "Toys & Games"]
+NOUNS = ["Smartphone", "Laptop", "Tablet", "Headphones", "T-Shirt", "Jeans", "Blender", "Novel", "Yoga Mat", "Puzzle"]
+ADJECTIVES = ["Pro", "Plus", "Max", "Elite", "Premium", "Standard", "Basic", "Deluxe"]
+
+
+def generate_products(count):
+    categories = [
+        Category(ct_id=i, ct_name=name, ct_description=f"{name} products")
+        for i, name in enumerate(CATEGORIES, start=1)
+    ]
+    for i in range(1, count + 1):
+        mrp = Decimal(random.randint(50, 50000))
+        yield Product(
+            pdt_id=i,
+            pdt_name=f"{random.choice(NOUNS)} {random.choice(ADJECTIVES)} {i}",
+            pdt_mrp=mrp,
+            pdt_dis_price=mrp * Decimal('0.9'),
+            pdt_qty=random.randint(0, 100),
+            ct=random.choice(categories),
+        )
+
+
+def recreate_index(client):
+    if client.indices.exists(index=INDEX):
+        client.indices.delete(index=INDEX)
+    index_body = ProductDocument._index.to_dict()
+    client.indices.create(index=INDEX, settings=index_body['settings'], mappings=index_body['mappings'])
+
+
+def run(client, docs, chunk_size, threads, large_load_docs):
+    recreate_index(client)
+    with override_settings(SEARCH_BULK_INDEXING={'LARGE_LOAD_DOCS': large_load_docs}):
+        result = bulk_index_products(
+            generate_products(docs), total=docs, chunk_size=chunk_size, threads=threads, index=INDEX
+        )
+    client.indices.refresh(index=INDEX)
+    count = client.count(index=INDEX)['count']
+    return result, count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--docs', type=int, default=200000)
+    parser.add_argument('--chunk-size', type=int, default=500)
+    parser.add_argument('--threads', type=int, default=4)
+    args = parser.parse_args()
+
+    client = ProductDocument._get_connection()
+    never = args.docs + 1
+
+    configurations = [
+        ('sequential', 1, never),
+        ('parallel', args.threads, never),
+        ('parallel+norefresh', args.threads, 0),
+    ]
+
+    print(f"Indexing {args.docs} generated products per run, chunk size {args.chunk_size}")
+    rows = []
+    for name, threads, large_load_docs in configurations:
+        result, count = run(client, args.docs, args.chunk_size, threads, large_load_docs)
+        rows.append((name, threads, result, count))
+        print(f"  {name}: {result['docs_per_second']} docs/s")
+
+    print("\n" + "=" * 78)
+    print(f"{'configuration':<20} | {'threads':>7} | {'chunks':>6} | {'failed':>6} | {'seconds':>8} | {'docs/s':>10} | {'in index':>8}")
+    print("-" * 78)
+    for name, threads, result, count in rows:
+        print(
+            f"{name:<20} | {threads:>7} | {len(result['chunks']):>6} | {result['failed']:>6} | "
+            f"{result['seconds']:>8} | {result['docs_per_second']:>10} | {count:>8}"
+        )
+    print("=" * 78)
+
+    client.indices.delete(index=INDEX)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+#!/usr/bin/env python
+"""
+Cost of propagating a category rename to its products in Elasticsearch.
+
+before: the old ProductDocument.get_instances_from_related() fan-out - every
+        product of the category re-read from the database, re-serialized and
+        re-indexed as a full document.
+after:  ProductDocument.update_from_related() - one update-by-query that
+        rewrites only the embedded `ct` object.
+
+Creates a temporary category with --products rows (100,000 by default) in
+the database and a throwaway index holding their documents, renames the
+category, and times both ways. Everything is deleted afterwards.
+
+Usage:
+    python benchmark_category_fanout.py
+    python benchmark_category_fanout.py --products 20000
+"""
+
+import argparse
+import os
+import random
+import time
+from decimal import Decimal
+
+import django
+
+# Setup Django environment
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ecommerce_backend.settings')
+django.setup()
+
+from django.db.models.signals import post_delete, post_save, pre_delete
+from elasticsearch.helpers import bulk
+
+from api.documents import ProductDocument
+from api.models import Category, Product
+
+INDEX = 'products-fanout-benchmark'
+
+
+def create_rows(count):
+    category = Category.objects.create(ct_name='Benchmark Category', ct_description='Fan-out benchmark')
+    Product.objects.bulk_create(
+        (Product(
+            pdt_name=f"Benchmark Product {i}",
+            pdt_mrp=Decimal(random.randint(50, 5000)),
+            pdt_dis_price=None,
+            pdt_qty=random.randint(0, 100),
+            ct=category,
+        ) for i in range(count)),
+        batch_size=5000,
+    )
+    return category
+
+
+def index_actions(document, queryset):
+    for action in document.get_actions(queryset.iterator(chunk_size=2000), 'index'):
+        action['_index'] = INDEX
+        yield action
+
+
+def create_index(client, document, category):
+    if client.indices.exists(index=INDEX):
+        client.indices.delete(index=INDEX)
+    index_body = ProductDocument._index.to_dict()
+    client.indices.create(index=INDEX, settings=index_body['settings'], mappings=index_body['mappings'])
+    bulk(client, index_actions(document, document.get_queryset().filter(ct=category)), chunk_size=2000, request_timeout=120)
+    client.indices.refresh(index=INDEX)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--products', type=int, default=100000)
+    args = parser.parse_args()
+
+    # Keep the sync signal processor out of the measurement (and off the real index)
+    receivers = [(signal, signal.receivers[:]) for signal in (post_save, post_delete, pre_delete)]
+    for signal, _ in receivers:
+        signal.receivers = []
+        signal.sender_receivers_cache.clear()
+
+    document = ProductDocument()
+    client = ProductDocument._get_connection()
+    print(f"Creating a category with {args.products} products...")
+    category = create_rows(args.products)
+    try:
+        create_index(client, document, category)
+
+        # before: re-read and re-index every product of the renamed category
+        category.ct_name = 'Benchmark Category (renamed)'
+        category.save()
+        start = time.perf_counter()
+        indexed, _ = bulk(
+            client,
+            index_actions(document, document.get_queryset().filter(ct=category)),
+            chunk_size=500,  # django_elasticsearch_dsl default
+            request_timeout=120,
+        )
+        before = time.perf_counter() - start
+
+        # after: one update-by-query over the embedded `ct`
+        category.ct_name = 'Benchmark Category (renamed again)'
+        category.save()
+        start = time.perf_counter()
+        response = document.update_from_related(category, index=INDEX)
+        after = time.perf_counter() - start
+
+        client.indices.refresh(index=INDEX)
+        matching = client.count(index=INDEX, query={'term': {'ct.ct_name.raw': category.ct_name}})['count']
+
+        print("\n" + "=" * 60)
+        print(f"{'':<28} | {'documents':>10} | {'seconds':>10}")
+        print("-" * 60)
+        print(f"{'per-product reindex (before)':<28} | {indexed:>10} | {before:>10.2f}")
+        print(f"{'update-by-query (after)':<28} | {response['updated']:>10} | {after:>10.2f}")
+        print("=" * 60)
+        print(f"Documents carrying the new category name: {matching}/{args.products}")
+    finally:
+        if client.indices.exists(index=INDEX):
+            client.indices.delete(index=INDEX)
+        category.delete()
+        for signal, saved in receivers:
+            signal.receivers = saved
+            signal.sender_receivers_cache.clear()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python
+"""
+Catalog latency under a credential-stuffing load, with and without the login
+throttle (api/throttling.py).
+
+In one process, --samplers threads time GET --catalog-path for --duration
+seconds per phase:
+
+    catalog only
+    stuffing, throttle off    every attempt costs a full password check
+    stuffing, throttle on     attempts beyond the IP/account buckets get 429
+
+During the stuffing phases --attackers threads POST /api/login/ with a new
+email and a wrong password each time, spread over --ips client addresses.
+bcrypt releases the GIL, so the hashing threads compete with the catalog
+threads for cores as separate server workers would. Prints catalog p50/p99,
+login attempts per second and how many of them reached password hashing.
+
+Usage:
+    python benchmark_credential_stuffing.py
+    python benchmark_credential_stuffing.py --attackers 32 --ips 8 --duration 15
+"""
+
+import argparse
+import os
+import statistics
+import threading
+import time
+from collections import Counter
+
+import django
+
+# Setup Django environment
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ecommerce_backend.settings')
+django.setup()
+
+from django.conf import settings
+from django.core.cache import caches
+from django.test import Client
+from django.test.utils import override_settings
+
+
+def sample_catalog(path, stop, latencies):
+    client = Client(HTTP_HOST='localhost')
+    while not stop.is_set():
+        start = time.perf_counter()
+        client.get(path)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+
+def stuff(stop, statuses, attacker, ips):
+    client = Client(HTTP_HOST='localhost')
+    n = 0
+    while not stop.is_set():
+        response = client.post(
+            '/api/login/', {'email': f'victim_{attacker}_{n}@gmail.com', 'password': 'Password123'},
+            content_type='application/json', REMOTE_ADDR=f'203.0.113.{(attacker + n) % ips + 1}',
+        )
+        statuses[response.status_code] += 1
+        n += 1
+
+
+def run_phase(args, attackers, throttle):
+    caches[settings.LOGIN_THROTTLE.get('CACHE_ALIAS', 'default')].clear()
+    stop = threading.Event()
+    latencies, statuses = [], Counter()
+    threads = [
+        threading.Thread(target=sample_catalog, args=(args.catalog_path, stop, latencies))
+        for _ in range(args.samplers)
+    ] + [
+        threading.Thread(target=stuff, args=(stop, statuses, i, args.ips))
+        for i in range(attackers)
+    ]
+    with override_settings(LOGIN_THROTTLE={**settings.LOGIN_THROTTLE, 'ENABLED': throttle}):
+        for thread in threads:
+            thread.start()
+        time.sleep(args.duration)
+        stop.set()
+        for thread in threads:
+            thread.join()
+    latencies.sort()
+    attempts = sum(statuses.values())
+    return {
+        'requests': len(latencies),
+        'p50': statistics.median(latencies) if latencies else float('nan'),
+        'p99': latencies[min(len(latencies) - 1, int(0.99 * len(latencies)))] if latencies else float('nan'),
+        'attempts_per_s': attempts / args.duration,
+        'hashed': attempts - statuses[429],
+        'statuses': dict(statuses),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--catalog-path', default='/api/products/')
+    parser.add_argument('--samplers', type=int, default=2)
+    parser.add_argument('--attackers', type=int, default=16, help='Concurrent login threads')
+    parser.add_argument('--ips', type=int, default=4, help='Distinct client addresses used by the attackers')
+    parser.add_argument('--duration', type=float, default=10.0, help='Seconds per phase')
+    args = parser.parse_args()
+
+    phases = [
+        ('catalog only', run_phase(args, 0, True)),
+        ('stuffing, throttle off', run_phase(args, args.attackers, False)),
+        ('stuffing, throttle on', run_phase(args, args.attackers, True)),
+    ]
+
+    print("\n" + "=" * 96)
+    print(f"{'phase':<24} | {'catalog reqs':>12} | {'p50 ms':>8} | {'p99 ms':>8} | "
+          f"{'logins/s':>8} | {'hashed':>6} | statuses")
+    print("-" * 96)
+    for name, result in phases:
+        print(f"{name:<24} | {result['requests']:>12} | {result['p50']:>8.1f} | {result['p99']:>8.1f} | "
+              f"{result['attempts_per_s']:>8.1f} | {result['hashed']:>6} | {result['statuses'] or '-'}")
+    print("=" * 96)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+#!/usr/bin/env python
+"""
+Benchmark the icontains and FULLTEXT database fallbacks of search_products.
+
+For each query this prints MySQL's EXPLAIN for the product-name lookup of
+both modes (_database_fallback_search vs _fulltext_fallback_search) and the
+median latency of the complete fallback search. MySQL only: the FULLTEXT
+index from migration 0005 must be in place.
+
+Usage:
+    python benchmark_fulltext_search.py --seed 1000000
+    python benchmark_fulltext_search.py --repeat 20 --query "wireless mouse"
+
+--seed inserts synthetic products with varied names (into a "Benchmark"
+category) first; see FULLTEXT_SEARCH.md for how to read the output.
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from decimal import Decimal
+
+import django
+
+# Setup Django environment
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ecommerce_backend.settings')
+django.setup()
+
+from django.db import connection, transaction
+
+from api import fulltext
+from api.models import Category, Product
+from api.views import _database_fallback_search, _fulltext_fallback_search
+
+QUERIES = ['phone', 'wireless headphones', 'laptop', 'cotton shirt', 'zzzz']
+
+ADJECTIVES = ['wireless', 'smart', 'cotton', 'leather', 'portable', 'classic', 'premium', 'compact']
+NOUNS = ['phone', 'laptop', 'headphones', 'shirt', 'mouse', 'watch', 'speaker', 'backpack', 'camera']
+
+
+def seed_products(count, batch_size=5000):
+    category, _ = Category.objects.get_or_create(
+        ct_name='Benchmark', defaults={'ct_description': 'Synthetic benchmark rows'}
+    )
+    print(f"Seeding {count} products into category {category.ct_id}...")
+    rng = random.Random(42)
+    with transaction.atomic():
+        for offset in range(0, count, batch_size):
+            Product.objects.bulk_create([
+                Product(
+                    pdt_name=f"{rng.choice(ADJECTIVES)} {rng.choice(NOUNS)} {offset + i}",
+                    pdt_mrp=Decimal('999.00'),
+                    pdt_dis_price=Decimal(rng.randint(100, 99900)) / 100,
+                    pdt_qty=rng.randint(0, 50),
+                    ct=category,
+                )
+                for i in range(min(batch_size, count - offset))
+            ])
+
+
+def explain(queryset):
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute('EXPLAIN ' + sql, params)
+        columns = [c[0] for c in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+
+def print_plan(label, rows):
+    print(f"  {label}:")
+    for row in rows:
+        print(f"    table={row.get('table')} type={row.get('type')} key={row.get('key')} "
+              f"rows={row.get('rows')} extra={row.get('Extra')}")
+
+
+def median_ms(search, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        search()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--seed', type=int, default=0, help='Insert this many synthetic products first')
+    parser.add_argument('--repeat', type=int, default=10)
+    parser.add_argument('--size', type=int, default=100, help='Results per search (as search_products)')
+    parser.add_argument('--query', action='append', help='Query to run (repeatable); defaults to a built-in set')
+    args = parser.parse_args()
+
+    if not fulltext.available():
+        sys.exit("FULLTEXT search needs MySQL (DATABASES['default'] is %s)" % connection.vendor)
+    if args.seed:
+        seed_products(args.seed)
+    print(f"Products in table: {Product.objects.count()}")
+
+    rows = []
+    for query in args.query or QUERIES:
+        boolean_query = fulltext.boolean_query(query)
+        print(f"\nEXPLAIN for {query!r} (BOOLEAN MODE query {boolean_query!r})")
+        print_plan('icontains', explain(Product.objects.filter(pdt_name__icontains=query)))
+        print_plan('fulltext', explain(Product.objects.filter(fulltext.matches('pdt_name', boolean_query))))
+
+        like_ms = median_ms(lambda: _database_fallback_search(query, None, None, 0, args.size), args.repeat)
+        fulltext_ms = median_ms(
+            lambda: _fulltext_fallback_search(query, boolean_query, None, None, 0, args.size), args.repeat
+        )
+        rows.append((query, like_ms, fulltext_ms))
+
+    print("\n" + "=" * 72)
+    print(f"{'query':<28} | {'icontains ms':>12} | {'fulltext ms':>11} | {'speedup':>8}")
+    print("-" * 72)
+    for query, like_ms, fulltext_ms in rows:
+        print(f"{query:<28} | {like_ms:>12.2f} | {fulltext_ms:>11.2f} | {like_ms / fulltext_ms:>7.1f}x")
+    print("=" * 72)
+
+
+if __name__ == "__main__":
+    main()
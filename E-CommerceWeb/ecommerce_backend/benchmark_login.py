@@ -0,0 +1,109 @@
+#!/usr/bin/env python
+"""
+Benchmark login throughput on POST /api/login/ (email + password).
+
+Seeds --users accounts sharing one precomputed password hash (so seeding
+costs a single hash), then sends --logins requests from --threads threads
+for three cases: correct password, wrong password and unknown email. For
+each case it reports queries per login, median latency and logins/second.
+Unknown emails should cost the same hashing time as wrong passwords
+(api.backends.EmailBackend checks a dummy hash).
+
+Usage:
+    python benchmark_login.py
+    python benchmark_login.py --users 100000 --logins 200 --threads 8
+"""
+
+import argparse
+import os
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import django
+
+# Setup Django environment
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ecommerce_backend.settings')
+# Every request comes from one address; measure hashing, not the login throttle
+os.environ.setdefault('LOGIN_THROTTLE_ENABLED', 'False')
+django.setup()
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+
+PASSWORD = 'Benchmark-password-1'
+
+
+def seed_users(count, batch_size=5000):
+    encoded = make_password(PASSWORD)
+    existing = User.objects.filter(username__startswith='bench_login_').count()
+    print(f"Seeding {max(0, count - existing)} users ({existing} already present)...")
+    for offset in range(existing, count, batch_size):
+        User.objects.bulk_create([
+            User(username=f'bench_login_{i}', email=f'bench_login_{i}@gmail.com', password=encoded)
+            for i in range(offset, min(offset + batch_size, count))
+        ])
+
+
+def queries_per_login(client, email, password):
+    with CaptureQueriesContext(connection) as queries:
+        client.post('/api/login/', {'email': email, 'password': password}, content_type='application/json')
+    return len(queries)
+
+
+def run_case(users, logins, threads, credentials):
+    local = threading.local()
+
+    def login(i):
+        if not hasattr(local, 'client'):
+            local.client = Client(HTTP_HOST='localhost')
+        email, password = credentials(i % users)
+        start = time.perf_counter()
+        response = local.client.post(
+            '/api/login/', {'email': email, 'password': password}, content_type='application/json'
+        )
+        return response.status_code, (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        results = list(pool.map(login, range(logins)))
+    elapsed = time.perf_counter() - start
+    statuses = sorted({code for code, _ in results})
+    return statuses, statistics.median(ms for _, ms in results), logins / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--logins', type=int, default=40)
+    parser.add_argument('--threads', type=int, default=4)
+    args = parser.parse_args()
+
+    seed_users(args.users)
+    cases = {
+        'correct password': lambda i: (f'bench_login_{i}@gmail.com', PASSWORD),
+        'wrong password': lambda i: (f'bench_login_{i}@gmail.com', 'wrong'),
+        'unknown email': lambda i: (f'nobody_{i}@gmail.com', PASSWORD),
+    }
+
+    client = Client(HTTP_HOST='localhost')
+    rows = []
+    for name, credentials in cases.items():
+        queries = queries_per_login(client, *credentials(0))
+        statuses, median_ms, rate = run_case(args.users, args.logins, args.threads, credentials)
+        rows.append((name, statuses, queries, median_ms, rate))
+
+    print("\n" + "=" * 78)
+    print(f"{'case':<18} | {'status':>10} | {'queries':>7} | {'median ms':>9} | {'logins/s':>8}")
+    print("-" * 78)
+    for name, statuses, queries, median_ms, rate in rows:
+        print(f"{name:<18} | {','.join(map(str, statuses)):>10} | {queries:>7} | {median_ms:>9.1f} | {rate:>8.1f}")
+    print("=" * 78)
+
+
+if __name__ == "__main__":
+    main()
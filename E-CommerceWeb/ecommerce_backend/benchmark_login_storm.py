@@ -0,0 +1,106 @@
+#!/usr/bin/env python
+"""
+Catalog latency during a login storm, against a running server.
+
+Samples GET --catalog-path from --samplers threads for --duration seconds,
+first alone and then while --storm threads hammer a login endpoint with
+unknown emails (each costs a full password check: EmailBackend verifies a
+dummy hash). Prints catalog p50/p99 for both phases and the status codes
+the login endpoint returned (503 = shed by the password pool).
+
+Compare the sync and async login endpoints (all requests come from one
+address, so disable the login throttle to measure the password pool alone;
+benchmark_credential_stuffing.py covers the throttle):
+    LOGIN_THROTTLE_ENABLED=False uvicorn ecommerce_backend.asgi:application --workers 2 &
+    python benchmark_login_storm.py --login-path /api/login/
+    python benchmark_login_storm.py --login-path /api/async/login/
+"""
+
+import argparse
+import json
+import statistics
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import Counter
+
+
+def request(url, body=None):
+    data = json.dumps(body).encode() if body is not None else None
+    req = urllib.request.Request(url, data=data, headers={'Content-Type': 'application/json'})
+    try:
+        with urllib.request.urlopen(req, timeout=30) as response:
+            response.read()
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+    except OSError:
+        return 'error'
+
+
+def sample_catalog(url, stop, latencies):
+    while not stop.is_set():
+        start = time.perf_counter()
+        request(url)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+
+def storm(url, stop, statuses, thread_id):
+    n = 0
+    while not stop.is_set():
+        statuses[request(url, {'email': f'storm_{thread_id}_{n}@gmail.com', 'password': 'guess'})] += 1
+        n += 1
+
+
+def run_phase(args, with_storm):
+    stop = threading.Event()
+    latencies, statuses = [], Counter()
+    threads = [
+        threading.Thread(target=sample_catalog, args=(args.url + args.catalog_path, stop, latencies))
+        for _ in range(args.samplers)
+    ]
+    if with_storm:
+        threads += [
+            threading.Thread(target=storm, args=(args.url + args.login_path, stop, statuses, i))
+            for i in range(args.storm)
+        ]
+    for thread in threads:
+        thread.start()
+    time.sleep(args.duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    latencies.sort()
+    return {
+        'requests': len(latencies),
+        'p50': statistics.median(latencies) if latencies else float('nan'),
+        'p99': latencies[min(len(latencies) - 1, int(0.99 * len(latencies)))] if latencies else float('nan'),
+        'logins': dict(statuses),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default='http://127.0.0.1:8000')
+    parser.add_argument('--catalog-path', default='/api/products/')
+    parser.add_argument('--login-path', default='/api/async/login/')
+    parser.add_argument('--samplers', type=int, default=2)
+    parser.add_argument('--storm', type=int, default=32, help='Concurrent login threads')
+    parser.add_argument('--duration', type=float, default=15.0, help='Seconds per phase')
+    args = parser.parse_args()
+
+    baseline = run_phase(args, with_storm=False)
+    loaded = run_phase(args, with_storm=True)
+
+    print("\n" + "=" * 78)
+    print(f"{'phase':<28} | {'catalog reqs':>12} | {'p50 ms':>8} | {'p99 ms':>8} | login statuses")
+    print("-" * 78)
+    for name, result in (('catalog only', baseline), (f'storm on {args.login_path}', loaded)):
+        print(f"{name:<28} | {result['requests']:>12} | {result['p50']:>8.1f} | {result['p99']:>8.1f} | "
+              f"{result['logins'] or '-'}")
+    print("=" * 78)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+#!/usr/bin/env python
+"""
+Before/after latency of partial matching in search_products:
+leading-wildcard clauses (`*q*` on pdt_name / ct.ct_name) versus term lookups
+on the `.ngram` subfields now defined in ProductDocument.
+
+Builds a throwaway index with the ProductDocument settings and mapping, fills
+it with generated products, then runs the same queries both ways.
+
+Usage:
+    python benchmark_ngram_search.py                    # 1,000,000 docs
+    python benchmark_ngram_search.py --docs 100000 --keep
+"""
+
+import argparse
+import os
+import random
+import statistics
+import time
+
+import django
+
+# Setup Django environment
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ecommerce_backend.settings')
+django.setup()
+
+from elasticsearch.helpers import bulk
+
+from api.documents import ProductDocument
+
+INDEX = 'products-ngram-benchmark'
+
+CATEGORIES = ["Electronics", "Fashion", "Home & Kitchen", "Books", "Sports & Fitness", "Toys & Games"]
+NOUNS = [
+    "Smartphone", "Laptop", "Tablet", "Headphones", "Smart Watch", "Camera", "Speaker", "Monitor",
+    "T-Shirt", "Jeans", "Jacket", "Sneakers", "Boots", "Handbag", "Wallet", "Sunglasses",
+    "Coffee Maker", "Blender", "Toaster", "Lamp", "Novel", "Cookbook", "Yoga Mat", "Dumbbell",
+    "Puzzle", "Board Game", "Doll", "Robot Toy",
+]
+ADJECTIVES = ["Pro", "Plus", "Max", "Elite", "Premium", "Standard", "Basic", "Deluxe", "Wireless", "Portable"]
+BRANDS = ["Acme", "Zenith", "Nova", "Orbit", "Vertex", "Pulse", "Aurora", "Summit"]
+
+QUERIES = ["lap", "laptop", "phone", "head", "watch", "jean", "sneak", "coffee", "elect", "fash", "toy", "mat"]
+
+
+def generate_docs(count):
+    for i in range(1, count + 1):
+        price = random.randint(50, 50000)
+        yield {
+            '_index': INDEX,
+            '_id': i,
+            '_source': {
+                'pdt_id': i,
+                'pdt_name': f"{random.choice(BRANDS)} {random.choice(NOUNS)} {random.choice(ADJECTIVES)} {i}",
+                'pdt_mrp': price,
+                'pdt_dis_price': price * 0.9,
+                'pdt_qty': random.randint(0, 100),
+                'ct': {'ct_id': 1, 'ct_name': random.choice(CATEGORIES), 'ct_description': ''},
+            },
+        }
+
+
+def create_index(client, docs):
+    if client.indices.exists(index=INDEX):
+        client.indices.delete(index=INDEX)
+    index_body = ProductDocument._index.to_dict()
+    index_body['settings']['refresh_interval'] = '-1'
+    client.indices.create(index=INDEX, settings=index_body['settings'], mappings=index_body['mappings'])
+
+    print(f"Indexing {docs} generated products into {INDEX}...")
+    start = time.perf_counter()
+    bulk(client, generate_docs(docs), chunk_size=5000, request_timeout=120)
+    client.indices.put_settings(index=INDEX, settings={'refresh_interval': '1s'})
+    client.indices.refresh(index=INDEX)
+    client.indices.forcemerge(index=INDEX, max_num_segments=1, request_timeout=600)
+    print(f"Indexed in {time.perf_counter() - start:.1f}s")
+
+
+def wildcard_query(q):
+    return {'bool': {'should': [
+        {'wildcard': {'pdt_name': {'value': f'*{q}*', 'boost': 1.5}}},
+        {'wildcard': {'ct.ct_name': {'value': f'*{q}*', 'boost': 2.0}}},
+    ], 'minimum_should_match': 1}}
+
+
+def ngram_query(q):
+    return {'bool': {'should': [
+        {'match': {'pdt_name.ngram': {'query': q, 'operator': 'and', 'boost': 1.5}}},
+        {'match': {'ct.ct_name.ngram': {'query': q, 'operator': 'and', 'boost': 2.0}}},
+    ], 'minimum_should_match': 1}}
+
+
+def measure(client, build_query, repeat):
+    """Server-side `took` in ms for each query, repeated; caches disabled."""
+    timings = []
+    for _ in range(repeat):
+        for q in QUERIES:
+            response = client.search(index=INDEX, query=build_query(q), size=20, request_cache=False)
+            timings.append(response['took'])
+    timings.sort()
+    return {
+        'p50': statistics.median(timings),
+        'p95': timings[int(len(timings) * 0.95) - 1],
+        'p99': timings[int(len(timings) * 0.99) - 1],
+        'max': timings[-1],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--docs', type=int, default=1000000)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--reuse', action='store_true', help='Reuse an existing benchmark index')
+    parser.add_argument('--keep', action='store_true', help='Keep the benchmark index afterwards')
+    args = parser.parse_args()
+
+    client = ProductDocument._get_connection()
+    if not (args.reuse and client.indices.exists(index=INDEX)):
+        create_index(client, args.docs)
+
+    # Warm up both query shapes so the comparison is not about cold caches
+    measure(client, wildcard_query, 1)
+    measure(client, ngram_query, 1)
+
+    before = measure(client, wildcard_query, args.repeat)
+    after = measure(client, ngram_query, args.repeat)
+
+    print("\n" + "=" * 60)
+    print(f"{'took (ms)':<12} | {'wildcard (before)':>18} | {'ngram (after)':>14}")
+    print("-" * 60)
+    for key in ('p50', 'p95', 'p99', 'max'):
+        print(f"{key:<12} | {before[key]:>18} | {after[key]:>14}")
+    print("=" * 60)
+
+    if not args.keep:
+        client.indices.delete(index=INDEX)
+
+
+if __name__ == "__main__":
+    main()
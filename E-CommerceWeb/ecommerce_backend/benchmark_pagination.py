@@ -0,0 +1,132 @@
+#!/usr/bin/env python
+"""
+Benchmark page-number vs cursor (keyset) pagination on /api/products/.
+
+Walks the cursor chain from page 1 to --pages and samples the latency of
+selected pages, then requests the same pages with ?page=N for comparison.
+Cursor latency should stay flat; page-number latency grows with the OFFSET.
+
+Usage:
+    python benchmark_pagination.py --seed 200000 --pages 10000
+    python benchmark_pagination.py --pages 1000 --page-size 20
+
+--seed inserts synthetic products (into a "Benchmark" category) first so the
+table is large enough for the requested depth.
+"""
+
+import argparse
+import os
+import statistics
+import time
+from decimal import Decimal
+
+import django
+
+# Setup Django environment
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ecommerce_backend.settings')
+django.setup()
+
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+
+from api.models import Category, Product
+
+CHECKPOINTS = [1, 10, 100, 1000, 10000, 100000]
+
+
+def seed_products(count, batch_size=5000):
+    """Bulk insert `count` synthetic products into a benchmark category."""
+    category, _ = Category.objects.get_or_create(
+        ct_name='Benchmark', defaults={'ct_description': 'Synthetic benchmark rows'}
+    )
+    print(f"Seeding {count} products into category {category.ct_id}...")
+    with transaction.atomic():
+        for offset in range(0, count, batch_size):
+            Product.objects.bulk_create([
+                Product(
+                    pdt_name=f"Benchmark Product {offset + i}",
+                    pdt_mrp=Decimal('999.00'),
+                    pdt_dis_price=Decimal('899.00'),
+                    pdt_qty=10,
+                    ct=category,
+                )
+                for i in range(min(batch_size, count - offset))
+            ])
+
+
+def timed_get(client, url):
+    start = time.perf_counter()
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get(url)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    assert response.status_code == 200, f"{url} -> {response.status_code}"
+    return response, elapsed_ms, queries.captured_queries
+
+
+def benchmark_cursor(client, pages, page_size):
+    """Follow `next` links page by page and record the sampled latencies."""
+    samples = {}
+    count_queries = 0
+    url = f"/api/products/?pagination=cursor&page_size={page_size}"
+    for page in range(1, pages + 1):
+        response, elapsed_ms, queries = timed_get(client, url)
+        count_queries += sum('COUNT(' in q['sql'].upper() for q in queries)
+        if page in CHECKPOINTS or page == pages:
+            samples[page] = elapsed_ms
+        url = response.json().get('next')
+        if not url:
+            break
+    return samples, count_queries
+
+
+def benchmark_page_number(client, pages, repeat=5):
+    """Time ?page=N directly for each checkpoint (median of `repeat` runs)."""
+    samples = {}
+    for page in CHECKPOINTS + [pages]:
+        if page > pages or page in samples:
+            continue
+        timings = []
+        for _ in range(repeat):
+            response, elapsed_ms, _ = timed_get(client, f"/api/products/?page={page}")
+            timings.append(elapsed_ms)
+        samples[page] = statistics.median(timings)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--pages', type=int, default=10000)
+    parser.add_argument('--page-size', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=0, help='Insert this many synthetic products first')
+    args = parser.parse_args()
+
+    if args.seed:
+        seed_products(args.seed)
+
+    total = Product.objects.count()
+    print(f"Products in table: {total}")
+    if total < args.pages * args.page_size:
+        print(f"⚠️  Only {total // args.page_size} pages available; use --seed to go deeper")
+
+    client = Client(HTTP_HOST='localhost')
+
+    print("\nCursor pagination (following next links)...")
+    cursor_samples, count_queries = benchmark_cursor(client, args.pages, args.page_size)
+
+    print("Page-number pagination (?page=N)...")
+    page_samples = benchmark_page_number(client, min(args.pages, max(cursor_samples)))
+
+    print("\n" + "=" * 60)
+    print(f"{'page':>10} | {'cursor (ms)':>12} | {'page number (ms)':>16}")
+    print("-" * 60)
+    for page in sorted(cursor_samples):
+        page_ms = page_samples.get(page)
+        page_col = f"{page_ms:16.2f}" if page_ms is not None else f"{'-':>16}"
+        print(f"{page:>10} | {cursor_samples[page]:12.2f} | {page_col}")
+    print("=" * 60)
+    print(f"COUNT queries issued in cursor mode: {count_queries}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python
+"""
+Microbenchmark for api.query_parser against the inline parsing that
+search_products used to do on every request.
+
+Usage:
+    python benchmark_query_parser.py
+    python benchmark_query_parser.py --rounds 200
+"""
+
+import argparse
+import os
+import re
+import time
+
+import django
+
+# Setup Django environment
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ecommerce_backend.settings')
+django.setup()
+
+from api.query_parser import _parse_normalized, normalize_query, parse_query
+
+# Real-looking search box input: filters, colors, typos, mixed case, noise
+CORPUS = [
+    "laptop", "laptop under 2000", "Laptop  Under 50000", "black laptop under 45000",
+    "gaming laptop with rtx", "shoes", "running shoes under 3000", "red sneakers",
+    "white shoes above 1500", "wireless headphones", "wireless earbuds under 2000",
+    "bluetooth headset", "smart tv 55 inch", "tv above 30000", "samsung phone",
+    "iphone 15 pro", "phones under 15000", "mobile below 10000", "smartwatch",
+    "fitness tracker", "yoga mat", "dumbbell set 10kg", "protein powder",
+    "t-shirt", "blue jeans", "black jacket", "hoodie for men", "dress under 999",
+    "handbag", "leather wallet", "belt", "coffee maker", "blender under 2500",
+    "microwave oven", "air purifier", "office chair", "desk lamp", "notebook",
+    "fiction novel", "cookbook", "lego set", "board game", "puzzle 1000 pieces",
+    "dog food", "cat litter box", "guitar", "piano keyboard", "suitcase",
+    "travel pillow", "paint set", "sketchbook", "camera", "dslr camera above 40000",
+    "power bank 20000", "usb cable", "keyboard and mouse", "monitor 27 inch",
+    "router", "hard drive 1tb", "grey sofa", "pink lipstick", "face cream",
+    "sunscreen spf 50", "car charger", "dash cam", "tool kit", "shredder",
+    "greater than 500 headphones", "more than 1000 books", "up to 700 toys",
+]
+
+
+def legacy_parse(q):
+    """The parsing previously inlined in search_products (kept for comparison)."""
+    q_lower = q.lower()
+    price_filter = None
+    color_filter = None
+    price_match = re.search(r'(\d{3,7})', q_lower)
+    if price_match:
+        amount = float(price_match.group(1))
+        if any(word in q_lower for word in ["under", "below", "less", "upto", "up to"]):
+            price_filter = ("lte", amount)
+        elif any(word in q_lower for word in ["over", "above", "greater", "more than"]):
+            price_filter = ("gte", amount)
+    colors = ["black", "white", "red", "blue", "green", "yellow", "pink", "grey", "gray", "brown", "purple", "orange"]
+    for color in colors:
+        if color in q_lower:
+            color_filter = color
+            break
+    search_query = re.sub(r'\b(under|below|less|over|above|greater|than|upto|up to|more than|more|in|with|\d{3,7})\b', '', q_lower).strip()
+    if color_filter:
+        search_query = search_query.replace(color_filter, '').strip()
+    search_query = ' '.join(search_query.split())
+    if not search_query:
+        search_query = q_lower
+    return search_query, price_filter, color_filter
+
+
+def uncached_parse(q):
+    return _parse_normalized.__wrapped__(normalize_query(q))
+
+
+def bench(name, fn, rounds):
+    fn(CORPUS[0])  # warm up
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for q in CORPUS:
+            fn(q)
+    elapsed = time.perf_counter() - start
+    per_query_us = elapsed / (rounds * len(CORPUS)) * 1e6
+    print(f"{name:<28} {per_query_us:8.2f} µs/query")
+    return per_query_us
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rounds', type=int, default=500)
+    args = parser.parse_args()
+
+    print(f"Corpus: {len(CORPUS)} queries x {args.rounds} rounds\n")
+    legacy = bench("legacy inline parsing", legacy_parse, args.rounds)
+    uncached = bench("query_parser (no memo)", uncached_parse, args.rounds)
+    cached = bench("query_parser (memoized)", parse_query, args.rounds)
+    print(f"\nSpeedup vs legacy: {legacy / uncached:.1f}x uncached, {legacy / cached:.1f}x memoized")
+
+    print("\nQueries whose interpretation changed (legacy -> parser):")
+    for q in CORPUS:
+        old = legacy_parse(q)
+        parsed = parse_query(q)
+        new = (parsed.text, parsed.price_filter, parsed.color)
+        if old != new:
+            print(f"  {q!r}: {old} -> {new}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python
+"""
+Benchmark the orjson renderer (api/renderers.py) against DRF's stock
+JSONRenderer, endpoint by endpoint.
+
+Each endpoint is requested once through the test client to capture the
+response data the view hands to the renderer; that data is then rendered
+--repeat times by both renderers and the bytes are checked to be identical.
+A synthetic Elasticsearch-style result (raw floats, Decimals, datetimes) is
+included to cover values that do not come through serializers.
+
+Usage:
+    python benchmark_renderers.py
+    python benchmark_renderers.py --repeat 500
+"""
+
+import argparse
+import os
+import statistics
+import time
+from datetime import datetime, timezone
+from decimal import Decimal
+
+import django
+
+# Setup Django environment
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ecommerce_backend.settings')
+django.setup()
+
+from django.test import Client
+from django.test.utils import setup_test_environment
+from rest_framework.renderers import JSONRenderer
+
+from api.renderers import ORJSONRenderer
+
+ENDPOINTS = [
+    '/api/products/',
+    '/api/products/?pagination=cursor&page_size=1000',
+    '/api/categories/',
+    '/api/categories/stats/',
+    '/api/search/?q=phone',
+    '/api/products/0/',
+    '/api/metrics/',
+]
+
+
+def synthetic_search_result(size=1000):
+    stamp = datetime(2024, 1, 2, 3, 4, 5, 678901, tzinfo=timezone.utc)
+    return {
+        'count': size,
+        'results': [
+            {
+                'pdt_id': i,
+                'pdt_name': f'Product {i} ñ',
+                'pdt_mrp': 999.0 + i,
+                'pdt_dis_price': Decimal('899.50'),
+                'ct': {'ct_id': i % 7, 'ct_name': 'Electronics', 'ct_date': stamp},
+                'score': 1.25,
+            }
+            for i in range(size)
+        ],
+    }
+
+
+def capture(client, path):
+    response = client.get(path)
+    return f"{path} [{response.status_code}]", getattr(response, 'data', None)
+
+
+def measure(renderer, data, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        body = renderer.render(data)
+        timings.append((time.perf_counter() - start) * 1000)
+    return body, statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    setup_test_environment()  # exposes response.data on test client responses
+    client = Client()
+    payloads = [capture(client, path) for path in ENDPOINTS]
+    payloads.append(('synthetic search result (1000 hits)', synthetic_search_result()))
+
+    stock, fast = JSONRenderer(), ORJSONRenderer()
+    rows = []
+    for name, data in payloads:
+        if data is None:
+            continue
+        stock_body, stock_ms = measure(stock, data, args.repeat)
+        fast_body, fast_ms = measure(fast, data, args.repeat)
+        assert stock_body == fast_body, f"output differs for {name}"
+        rows.append((name, len(stock_body), stock_ms, fast_ms))
+
+    print("\n" + "=" * 100)
+    print(f"{'endpoint':<56} | {'bytes':>8} | {'stock ms':>9} | {'orjson ms':>9} | {'speedup':>7}")
+    print("-" * 100)
+    for name, size, stock_ms, fast_ms in rows:
+        print(f"{name:<56} | {size:>8} | {stock_ms:>9.3f} | {fast_ms:>9.3f} | {stock_ms / fast_ms:>6.1f}x")
+    print("=" * 100)
+    print("Outputs identical for every endpoint.")
+
+
+if __name__ == "__main__":
+    main()
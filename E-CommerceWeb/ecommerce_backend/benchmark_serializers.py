@@ -0,0 +1,109 @@
+#!/usr/bin/env python
+"""
+Benchmark ProductSerializer (model instances) vs the values() fast path
+(api/fast_serializers.py) for one page of /api/products/.
+
+For each page size the same page is built both ways - query, serialize and
+render to JSON bytes - and the outputs are checked to be identical.
+Reported times are medians over --repeat runs; "serialize" excludes the
+database read.
+
+Usage:
+    python benchmark_serializers.py
+    python benchmark_serializers.py --seed 1000 --repeat 50
+"""
+
+import argparse
+import os
+import statistics
+import time
+from decimal import Decimal
+
+import django
+
+# Setup Django environment
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ecommerce_backend.settings')
+django.setup()
+
+from rest_framework.renderers import JSONRenderer
+
+from api.fast_serializers import product_fast_serializer
+from api.models import Category, Product
+from api.serializers import ProductSerializer
+
+PAGE_SIZES = [20, 100, 1000]
+
+
+def seed_products(count):
+    category, _ = Category.objects.get_or_create(
+        ct_name='Benchmark', defaults={'ct_description': 'Synthetic benchmark rows'}
+    )
+    print(f"Seeding {count} products into category {category.ct_id}...")
+    Product.objects.bulk_create([
+        Product(
+            pdt_name=f"Benchmark Product {i}",
+            pdt_mrp=Decimal('999.00'),
+            pdt_dis_price=Decimal('899.50'),
+            pdt_qty=10,
+            ct=category,
+        )
+        for i in range(count)
+    ], batch_size=5000)
+
+
+def model_serializer_page(size):
+    start = time.perf_counter()
+    page = list(Product.objects.select_related('ct').order_by('pdt_id')[:size])
+    read = time.perf_counter()
+    body = JSONRenderer().render(ProductSerializer(page, many=True).data)
+    return body, time.perf_counter() - start, time.perf_counter() - read
+
+
+def fast_page(size):
+    start = time.perf_counter()
+    page = list(product_fast_serializer.values(Product.objects.order_by('pdt_id'))[:size])
+    read = time.perf_counter()
+    body = JSONRenderer().render(product_fast_serializer.many(page))
+    return body, time.perf_counter() - start, time.perf_counter() - read
+
+
+def measure(build, size, repeat):
+    totals, serialize = [], []
+    for _ in range(repeat):
+        body, total, ser = build(size)
+        totals.append(total * 1000)
+        serialize.append(ser * 1000)
+    return body, statistics.median(totals), statistics.median(serialize)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--seed', type=int, default=0, help='Insert this many synthetic products first')
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    if args.seed:
+        seed_products(args.seed)
+    available = Product.objects.count()
+    if available < max(PAGE_SIZES):
+        print(f"Note: only {available} products; larger pages are capped (use --seed).")
+
+    rows = []
+    for size in PAGE_SIZES:
+        model_body, model_total, model_ser = measure(model_serializer_page, size, args.repeat)
+        fast_body, fast_total, fast_ser = measure(fast_page, size, args.repeat)
+        assert model_body == fast_body, f"output differs at page size {size}"
+        rows.append((size, model_total, fast_total, model_ser, fast_ser))
+
+    print("\n" + "=" * 84)
+    print(f"{'page size':>9} | {'model total ms':>14} | {'fast total ms':>13} | "
+          f"{'model serialize ms':>18} | {'fast serialize ms':>17}")
+    print("-" * 84)
+    for size, model_total, fast_total, model_ser, fast_ser in rows:
+        print(f"{size:>9} | {model_total:>14.2f} | {fast_total:>13.2f} | {model_ser:>18.2f} | {fast_ser:>17.2f}")
+    print("=" * 84)
+    print("Outputs identical at every page size.")
+
+
+if __name__ == "__main__":
+    main()
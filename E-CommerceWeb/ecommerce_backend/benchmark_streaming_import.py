@@ -0,0 +1,96 @@
+#!/usr/bin/env python
+"""
+Peak RSS of the streaming catalog import versus feed size.
+
+Generates NDJSON feeds of increasing size, imports each one with
+`manage.py import_products` in a fresh process and prints that process's
+peak RSS. With a streaming reader and fixed-size batches the peak should
+stay flat as the feed grows.
+
+Imported rows use pdt_ids from --first-id upwards in the first category and
+are deleted afterwards.
+
+Usage:
+    python benchmark_streaming_import.py
+    python benchmark_streaming_import.py --rows 10000 100000 1000000 --batch-size 2000
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import django
+
+# Setup Django environment
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ecommerce_backend.settings')
+django.setup()
+
+from api.models import Category, Product
+
+CHILD = """
+import resource, sys
+import django
+django.setup()
+from django.core.management import call_command
+call_command('import_products', sys.argv[1], '--batch-size', sys.argv[2], '--max-errors', '0', stdout=open('/dev/null', 'w'))
+print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+"""
+
+
+def write_feed(path, rows, first_id, ct_id):
+    with open(path, 'w') as feed:
+        for i in range(rows):
+            feed.write(json.dumps({
+                "pdt_id": first_id + i,
+                "pdt_name": f"Feed Product {i}",
+                "pdt_mrp": "499.00",
+                "pdt_dis_price": "449.00",
+                "pdt_qty": i % 100,
+                "ct_id": ct_id,
+            }) + "\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, nargs='+', default=[10000, 100000, 500000])
+    parser.add_argument('--batch-size', type=int, default=1000)
+    parser.add_argument('--first-id', type=int, default=50000000)
+    args = parser.parse_args()
+
+    category = Category.objects.order_by('ct_id').first()
+    if category is None:
+        sys.exit("No categories; run `python manage.py populate_data` first")
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for rows in args.rows:
+            path = os.path.join(tmp, f'feed-{rows}.ndjson')
+            write_feed(path, rows, args.first_id, category.ct_id)
+            size_mb = os.path.getsize(path) / 1024 / 1024
+
+            start = time.perf_counter()
+            output = subprocess.run(
+                [sys.executable, '-c', CHILD, path, str(args.batch_size)],
+                check=True, capture_output=True, text=True, env=os.environ.copy(),
+            ).stdout
+            seconds = time.perf_counter() - start
+            peak_mb = int(output.strip().splitlines()[-1]) / 1024  # ru_maxrss is in KiB on Linux
+
+            results.append((rows, size_mb, seconds, peak_mb))
+            print(f"  {rows} rows: {peak_mb:.1f} MiB peak RSS")
+            Product.objects.filter(pdt_id__gte=args.first_id).delete()
+
+    print("\n" + "=" * 64)
+    print(f"{'rows':>10} | {'feed (MiB)':>10} | {'seconds':>8} | {'rows/s':>9} | {'peak RSS (MiB)':>14}")
+    print("-" * 64)
+    for rows, size_mb, seconds, peak_mb in results:
+        print(f"{rows:>10} | {size_mb:>10.1f} | {seconds:>8.1f} | {rows / seconds:>9.0f} | {peak_mb:>14.1f}")
+    print("=" * 64)
+
+
+if __name__ == "__main__":
+    main()
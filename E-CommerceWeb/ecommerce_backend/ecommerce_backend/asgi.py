@@ -2,6 +2,9 @@
 ASGI config for ecommerce_backend project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Serve it with an ASGI server, e.g. ``uvicorn ecommerce_backend.asgi:application
+--workers 4``; the /api/async/ auth views then run on the event loop and hash
+passwords in a process pool (api/password_pool.py).
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
@@ -14,3 +17,13 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ecommerce_backend.settings')
 
 application = get_asgi_application()
+
+# Build the in-process search fallback index for this worker
+from api.inverted_index import warm_fallback_index  # noqa: E402
+
+warm_fallback_index()
+
+# Start the password hashing workers before the first login
+from api.password_pool import password_pool  # noqa: E402
+
+password_pool.warm_up()
@@ -12,7 +12,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
 from pathlib import Path
-from decouple import config
+from decouple import Csv, config
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -114,10 +114,40 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Email + password login (api/backends.py) from one indexed lookup; username login
+# (admin, GetTokenView) still goes through ModelBackend
+AUTHENTICATION_BACKENDS = [
+    'api.backends.EmailBackend',
+    'django.contrib.auth.backends.ModelBackend',
+]
+
 # Password Security Configuration
 # Pepper key for additional password security (stored in .env file)
 PASSWORD_PEPPER = config('PASSWORD_PEPPER', default='default-pepper-key-change-in-production')
 
+# Pepper keyring (api/hashers.py): every hash records the id of its pepper. The legacy
+# PASSWORD_PEPPER has id ''. To rotate, add "id:pepper" to PASSWORD_PEPPERS and point
+# PASSWORD_PEPPER_ID at it; users are re-hashed on their next login. Keep old entries
+# until no hash uses them (manage.py calibrate_hashers --distribution-only lists them).
+PASSWORD_PEPPERS = {
+    '': PASSWORD_PEPPER,
+    **dict(entry.split(':', 1) for entry in config('PASSWORD_PEPPERS', default='', cast=Csv())),
+}
+PASSWORD_PEPPER_ID = config('PASSWORD_PEPPER_ID', default='')
+
+# bcrypt work factor of the peppered hasher (each +1 doubles the cost). Pick it with
+# `python manage.py calibrate_hashers --target-ms 250`; changed values apply to new
+# hashes and existing users are re-hashed on their next login.
+PASSWORD_BCRYPT_ROUNDS = config('PASSWORD_BCRYPT_ROUNDS', default=12, cast=int)
+
+# Process pool for the async auth views (api/password_pool.py), per web process.
+# WORKERS None = half the CPU cores; MAX_PENDING None = 8 per worker; beyond it: 503.
+PASSWORD_POOL = {
+    'WORKERS': config('PASSWORD_POOL_WORKERS', default=0, cast=int) or None,
+    'MAX_PENDING': None,
+    'TIMEOUT': 10.0,
+}
+
 # Use custom peppered bcrypt for password hashing
 PASSWORD_HASHERS = [
     'api.hashers.PepperedBCryptSHA256PasswordHasher',  # Custom hasher with pepper
@@ -157,6 +187,16 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 20,
+    # orjson-backed JSON (api/renderers.py, api/parsers.py); output matches the stock classes
+    'DEFAULT_RENDERER_CLASSES': (
+        'api.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'api.parsers.ORJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ),
 }
 
 CORS_ALLOWED_ORIGINS = [
@@ -172,6 +212,49 @@ SIMPLE_JWT = {
     'ROTATE_REFRESH_TOKENS': True,
 }
 
+# Cache configuration
+# Point CACHE_BACKEND/CACHE_LOCATION at a shared backend (e.g. Redis) in production
+# so all workers share cached payloads and invalidations.
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default='ecommerce-cache'),
+    }
+}
+
+# Token buckets checked before every password verification on the login
+# endpoints (api/throttling.py): (burst, refills per minute) per client IP and
+# per target email/username. GLOBAL, e.g. (200, 6000), caps password checks
+# across all workers; None disables a bucket.
+LOGIN_THROTTLE = {
+    'ENABLED': config('LOGIN_THROTTLE_ENABLED', default=True, cast=bool),
+    'CACHE_ALIAS': 'default',  # must be shared by all workers in production (check api.W002)
+    'IP': (20, 10),
+    'ACCOUNT': (5, 5),
+    'GLOBAL': None,
+}
+
+# Read-through cache for product/category detail payloads (api/cache.py)
+OBJECT_CACHE = {
+    'CACHE_ALIAS': 'default',
+    'TIMEOUT': config('OBJECT_CACHE_TIMEOUT', default=300, cast=int),   # shared tier, seconds
+    'LRU_SIZE': config('OBJECT_CACHE_LRU_SIZE', default=10000, cast=int),  # in-process entries
+    'LOCAL_TTL': config('OBJECT_CACHE_LOCAL_TTL', default=5, cast=int),  # in-process staleness bound, seconds
+}
+
+# Search result cache (api/cache.py). Entries are keyed by the parsed query and
+# the catalog generation, which every product/category write bumps.
+SEARCH_CACHE = {
+    'CACHE_ALIAS': 'default',  # must be shared by all workers in production (check api.W001)
+    'TTL': config('SEARCH_CACHE_TTL', default=60, cast=int),  # seconds
+    'LRU_SIZE': config('SEARCH_CACHE_LRU_SIZE', default=2048, cast=int),
+    'GENERATION_CHECK_INTERVAL': 1.0,  # seconds between shared generation reads
+    'CHANGES_TIMEOUT': 3600,  # seconds each generation's changed ids are kept for catch-up
+}
+
+# Memoized parsed queries kept by api/query_parser.py
+QUERY_PARSER_CACHE_SIZE = 4096
+
 # Elasticsearch configuration
 ELASTICSEARCH_DSL = {
     'default': {
@@ -179,4 +262,62 @@ ELASTICSEARCH_DSL = {
     },
 }
 
+# Index model changes from a background queue instead of inside the request
+# (api/signal_processors.py)
+ELASTICSEARCH_DSL_SIGNAL_PROCESSOR = 'api.signal_processors.QueuedSignalProcessor'
+ELASTICSEARCH_SIGNAL_QUEUE = {
+    'COALESCE_SECONDS': 0.5,   # wait after the first change so repeated saves collapse
+    'MAX_PENDING': 10000,      # distinct rows queued before writers block
+    'BLOCK_SECONDS': 1.0,      # writer wait when full, then it indexes synchronously
+    'BATCH_SIZE': 500,         # rows per flush / bulk request
+    'DRAIN_TIMEOUT': 10.0,     # seconds to flush the queue at shutdown
+    'RETRY_BACKOFF': 1.0,      # first wait after a failed flush; doubles per failure
+    'MAX_BACKOFF': 60.0,       # longest wait between retries
+    'MAX_RETRIES': None,       # attempts before a row is logged for reindex_search; None = keep retrying
+}
+
+# Exact hit counting limit for /api/elasticsearch-search/; larger totals are
+# reported as a lower bound (total_relation "gte"). True counts every hit.
+SEARCH_TRACK_TOTAL_HITS = 10000
+
+# How search_products answers when Elasticsearch is unavailable:
+# 'inverted_index' (in-process index, api/inverted_index.py), 'fulltext' (MySQL
+# FULLTEXT index on pdt_name, api/fulltext.py) or 'icontains' (database LIKE scan)
+SEARCH_FALLBACK_MODE = config('SEARCH_FALLBACK_MODE', default='inverted_index')
+
+# Must match the server's innodb_ft_min_token_size (shorter terms are not indexed)
+FULLTEXT_SEARCH = {
+    'MIN_TOKEN_SIZE': 3,
+}
 
+# Product imports (api/catalog_import.py): rows validated and written per batch
+CATALOG_IMPORT = {
+    'BATCH_SIZE': 1000,
+}
+
+# Catalog export (api/catalog_export.py): rows per keyset-paginated read
+CATALOG_EXPORT = {
+    'CHUNK_SIZE': 2000,
+    'MAX_CHUNK_SIZE': 20000,   # upper bound for ?chunk_size=
+    'THROTTLE_RATE': '10/hour',  # exports per admin user (api/throttling.py); None disables
+}
+
+# Chunked parallel bulk indexing (api/search_indexing.py)
+SEARCH_BULK_INDEXING = {
+    'CHUNK_SIZE': 500,          # documents per bulk request
+    'THREADS': 4,               # bulk requests in flight
+    'LARGE_LOAD_DOCS': 5000,    # loads this big run with refresh_interval -1
+    'REQUEST_TIMEOUT': 60,      # seconds per bulk request
+    'RELATED_UPDATE_TIMEOUT': 300,  # seconds for a category's update-by-query over its products
+}
+
+# Circuit breaker around Elasticsearch search calls (api/circuit_breaker.py)
+ELASTICSEARCH_CIRCUIT_BREAKER = {
+    'REQUEST_TIMEOUT': 2.0,          # per-request ES time budget, seconds
+    'FAILURE_RATE_THRESHOLD': 0.5,   # open when this share of recent calls failed or was slow
+    'SLOW_CALL_SECONDS': 1.0,        # calls slower than this count as failures
+    'WINDOW_SIZE': 20,               # recent calls considered
+    'MINIMUM_CALLS': 5,              # calls needed before the rate is evaluated
+    'OPEN_SECONDS': 10.0,            # wait before the background probe runs
+    'PROBE_TIMEOUT': 1.0,
+}
@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ecommerce_backend.settings')
 
 application = get_wsgi_application()
+
+# Build the in-process search fallback index for this worker
+from api.inverted_index import warm_fallback_index  # noqa: E402
+
+warm_fallback_index()